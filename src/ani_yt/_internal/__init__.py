@@ -1,2 +1,11 @@
 # The code in here depends on what imported it
-from . import _query as _query
+from . import _query_py as _query_py
+
+try:
+    from . import _query as _query
+
+    QUERY_BACKEND = "compiled"
+except ImportError:
+    # Source checkouts and platforms without a prebuilt wheel have no compiled extension
+    _query = _query_py
+    QUERY_BACKEND = "python"
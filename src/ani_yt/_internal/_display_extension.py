@@ -1,92 +1,98 @@
-from datetime import datetime
+import sys
 from typing import Any
 
 from ..bookmarking_handler import BookmarkingHandler
 from ..command_history import CommandHistory
-from ..common import HistoryData, Video
+from ..common import HistoryData, VideoRecord
 from ..exceptions import CategoryNotExist, PauseableException
 from ..history_handler import HistoryHandler
 from ..input_handler import InputHandler, ReturnCode
 from ..os_manager import OSManager
 from ..player import Player
-from ..yt_dlp_handler import YT_DLP, YT_DLP_Options
+from ..thumbnail_handler import ThumbnailHandler
+from ..url_normalizer import UrlNormalizer
+from ..yt_dlp_handler import YT_DLP_Options
 
 
 class HistoryExtension:
     history_handler: Any
     data: Any
     history_map: dict[str, str]
+    history_session: Any
+    # Seconds without a new toggle before pending viewed changes are written
+    history_flush_delay = 1.0
 
     def _init_history(self):
         self.history_map = {}
+        self.history_session = None
         self._load_history_map()
 
+    def _get_history_session(self):
+        if self.history_session is None:
+            self.history_session = self.history_handler.session(flush_delay=self.history_flush_delay)
+        return self.history_session
+
+    def flush_history(self):
+        """Write the viewed changes made from the menu, if any."""
+        if self.history_session is not None:
+            self.history_session.commit()
+            self.history_session.close()
+            self.history_session = None
+
     def _load_history_map(self):
         if not hasattr(self, "history_handler") or not self.history_handler or not self.history_handler.is_history():
             return
 
         try:
             history: HistoryData = self.history_handler.load()
-            # Build video_url -> status map
+            # Build video id -> status map, see `UrlNormalizer.key`
             self.history_map = {
-                video["video_url"]: video.get("status", "")
+                sys.intern(UrlNormalizer.key(video["video_url"])): video.get("status", "")
                 for playlist in history.get("playlists", [])
                 for video in playlist.get("videos", [])
             }
         except Exception:
             self.history_map = {}
 
-    def mark_viewed(self, url: str):
+    def mark_viewed(self, url: str, session=None):
         """
         Mark the video as viewed in both history file and local map, and update last_viewed timestamp.
+        With a history session, the change is written when the session commits.
         """
-        history: HistoryData = self.history_handler.load()
-
-        p_idx, v_idx = self.history_handler.search(url, history)
-        if p_idx != -1 and v_idx != -1:
-            history["playlists"][p_idx]["videos"][v_idx]["status"] = "viewed"
-
-            now = datetime.now().astimezone().isoformat()
-            history["playlists"][p_idx]["videos"][v_idx]["last_viewed"] = now
-
-            # persist
-            self.history_handler.update(curr=history.get("current"), playlists=history.get("playlists"))
+        target = session if session is not None else self.history_handler
+        if target.set_video_status(url, "viewed"):
             # update local map
-            self.history_map[url] = "viewed"
+            self.history_map[UrlNormalizer.key(url)] = "viewed"
 
-    def remove_viewed_status(self, url: str):
+    def remove_viewed_status(self, url: str, session=None):
         """
         Remove the 'viewed' status from a video.
         """
-        history: HistoryData = self.history_handler.load()
-        p_idx, v_idx = self.history_handler.search(url, history)
-        if p_idx != -1 and v_idx != -1:
-            video = history["playlists"][p_idx]["videos"][v_idx]
-            if "status" in video:
-                video["status"] = ""
-            if "last_viewed" in video:
-                del video["last_viewed"]
-
-            self.history_handler.update(curr=history.get("current"), playlists=history.get("playlists"))
-            self.history_map[url] = ""
+        target = session if session is not None else self.history_handler
+        if target.set_video_status(url, ""):
+            self.history_map[UrlNormalizer.key(url)] = ""
 
     def toggle_viewed_status(self, url: str):
         """
         Toggle the 'viewed' status of a video.
         If it's viewed, un-view it. If it's not viewed, mark it as viewed.
         """
-        current_status = self.history_map.get(url, "").lower()
-        if current_status == "viewed":
-            self.remove_viewed_status(url)
+        # Toggles are batched, they are written once the user stops toggling or leaves the menu
+        session = self._get_history_session()
+        if self.is_viewed(url):
+            self.remove_viewed_status(url, session=session)
         else:
-            self.mark_viewed(url)
+            self.mark_viewed(url, session=session)
+
+    def is_viewed(self, url: str) -> bool:
+        return self.history_map.get(UrlNormalizer.key(url), "").lower() == "viewed"
 
     def find_first_unviewed_index(self):
         if not hasattr(self, "data") or not self.data:
             return 0
 
         for idx, video in enumerate(self.data):
-            if self.history_map.get(video["video_url"], "").lower() != "viewed":
+            if not self.is_viewed(video["video_url"]):
                 return idx
         return 0
 
@@ -94,11 +100,11 @@ class HistoryExtension:
         if not self.data:
             return 0
         for idx in range(start_idx, len(self.data)):
-            if self.history_map.get(self.data[idx]["video_url"], "").lower() != "viewed":
+            if not self.is_viewed(self.data[idx]["video_url"]):
                 return idx
 
         for idx in range(0, start_idx):
-            if self.history_map.get(self.data[idx]["video_url"], "").lower() != "viewed":
+            if not self.is_viewed(self.data[idx]["video_url"]):
                 return idx
         return 0
 
@@ -111,8 +117,8 @@ class InputExtension:
         self.command_history = CommandHistory()
         self.input_handler = InputHandler(self.command_history)
 
-    def map_user_input(self, prompt=None):
-        user_input = self.input_handler.get_input(prompt).strip()
+    def map_user_input(self, prompt=None, idle=None):
+        user_input = self.input_handler.get_input(prompt, idle=idle).strip()
 
         input_map = {
             ReturnCode.NEXT_PAGE: "N",
@@ -120,20 +126,119 @@ class InputExtension:
             ReturnCode.LINE_UP: "U",
             ReturnCode.LINE_DOWN: "D",
             ReturnCode.DEL_KEY: "R",
+            ReturnCode.FILTER: "/",
         }
 
         return input_map.get(user_input, user_input)
 
-    def get_user_input(self):
+    def get_user_input(self, idle=None):
         try:
-            self.user_input = self.map_user_input()
+            self.user_input = self.map_user_input(idle=idle)
         except KeyboardInterrupt:
             OSManager.exit(0)
 
+    def read_key(self) -> str:
+        try:
+            return self.input_handler.read_key()
+        except KeyboardInterrupt:
+            OSManager.exit(0)
+            raise  # Not reached, OSManager.exit leaves through SystemExit
+
 
-class DisplayExtension(HistoryExtension, InputExtension):
+class FilterExtension:
+    """
+    The `/` filter of the menu, narrows `data` to the videos whose title contains every typed word.
+
+    Each typed character refines the previous result instead of scanning all videos again,
+    and the result of every shorter query is kept on a stack, so backspace restores it as is.
+    """
+
+    data: Any
+    choosed_item: Any
+    filter_query: str
+    filter_editing: bool
+
+    def _init_filter(self):
+        self.filter_query = ""
+        self.filter_editing = False
+        self._filter_base: list | None = None
+        self._filter_titles: list[str] = []
+        # Rows of `_filter_base` matching each prefix of the query, one level per character
+        self._filter_stack: list[list[int]] = []
+
+    @property
+    def filter_active(self) -> bool:
+        return self._filter_base is not None
+
+    def filter_base(self) -> list:
+        """The videos before filtering."""
+        return self._filter_base if self._filter_base is not None else self.data
+
+    def start_filter(self):
+        if self._filter_base is None:
+            self.set_filter_base(self.data)
+        self.filter_editing = True
+
+    def set_filter_base(self, videos: list):
+        """Filter `videos` with the current query, used when the unfiltered list changes."""
+        self._filter_base = videos
+        self._filter_titles = [video["video_title"].casefold() for video in videos]
+        self._filter_stack = [list(range(len(videos)))]
+
+        query, self.filter_query = self.filter_query, ""
+        for char in query:
+            self._refine(char)
+        self._apply_filter()
+
+    def _refine(self, char: str):
+        self.filter_query += char
+        previous = self._filter_stack[-1]
+        words = self.filter_query.casefold().split()
+
+        if char.isspace() or not words:
+            # A space starts a new word but matches nothing new yet
+            self._filter_stack.append(previous)
+            return
+
+        # Earlier words are already matched by the previous result, only the last one changed
+        word = words[-1]
+        titles = self._filter_titles
+        self._filter_stack.append([row for row in previous if word in titles[row]])
+
+    def filter_push(self, char: str):
+        self._refine(char)
+        self._apply_filter()
+
+    def filter_pop(self) -> bool:
+        """Remove the last character of the query, False if it is already empty."""
+        if not self.filter_query:
+            return False
+        self.filter_query = self.filter_query[:-1]
+        self._filter_stack.pop()
+        self._apply_filter()
+        return True
+
+    def _apply_filter(self):
+        base = self._filter_base or []
+        self.data = [base[row] for row in self._filter_stack[-1]]
+
+    def clear_filter(self):
+        """Show every video again, the selected video stays selected."""
+        if self._filter_base is None:
+            return
+
+        rows = self._filter_stack[-1]
+        if self.choosed_item is not False and 0 <= self.choosed_item < len(rows):
+            self.choosed_item = rows[self.choosed_item]
+
+        self.data = self._filter_base
+        self._init_filter()
+
+
+class DisplayExtension(HistoryExtension, InputExtension, FilterExtension):
     bookmarking_handler: Any
     yt_dlp_opts: Any
+    thumbnail_handler: Any
     extra_opts: Any
     user_input: str
 
@@ -155,10 +260,17 @@ class DisplayExtension(HistoryExtension, InputExtension):
             "history",
             HistoryHandler,
         )
+
+        self.thumbnail_handler = self._get_dependencies(
+            "thumbnail",
+            ThumbnailHandler,
+        )
         self._init_history()
 
         self._init_input_handler()
 
+        self._init_filter()
+
     def _init_extra_opts(self, extra_opts):
         self.extra_opts = extra_opts
 
@@ -183,7 +295,7 @@ class DisplayExtension(HistoryExtension, InputExtension):
 
     def mark_bookmark(self, user_int, category, create_new=False):
         try:
-            item: Video = self.data[user_int - 1]
+            item: VideoRecord = self.data[user_int - 1]
             video_url = item["video_url"]
 
             if self.bookmarking_handler.is_item_exist(video_url, category=category):
@@ -198,15 +310,21 @@ class DisplayExtension(HistoryExtension, InputExtension):
     def is_item_bookmarked(self, item_url, category):
         return self.bookmarking_handler.is_item_exist(item_url, category=category)
 
+    def item_bookmark_categories(self, item_url) -> set[str]:
+        return self.bookmarking_handler.get_categories(item_url)
+
     def open_image_with_mpv(self, url):
         Player.start_with_mode(url=url, opts=self.extra_opts.get("mode", "auto"))
 
     def show_thumbnail(self, user_int):
         try:
-            item: Video = self.data[user_int - 1]
-            url = item["video_url"]
+            item: VideoRecord = self.data[user_int - 1]
 
-            thumbnail_url = YT_DLP.standalone_get_thumbnail(url, self.yt_dlp_opts.ydl_opts)
-            self.open_image_with_mpv(thumbnail_url)
+            thumbnail = self.thumbnail_handler.get(item)
+            self.open_image_with_mpv(thumbnail)
         except IndexError as e:
             PauseableException(f"IndexError: {e}", delay=-1)
+
+    def prefetch_thumbnails(self, items):
+        if self.extra_opts.get("prefetch_thumbnails", False):
+            self.thumbnail_handler.prefetch(items)
@@ -12,7 +12,7 @@ class DisplayRendering:
     opts: Any
     bookmark: bool
     show_link: bool
-    history_map: Any
+    is_viewed: Any
     index_item: int
     len_data: int
     total_items: int
@@ -20,10 +20,13 @@ class DisplayRendering:
     choosed_item: Any
     cursor_in_page: int
     cursor_moved: bool
+    loading: bool
     splited_data: Any
     splited_data_items: Any
     _get_page_start_index: Any
-    is_item_bookmarked: Any
+    item_bookmark_categories: Any
+    filter_query: str
+    filter_editing: bool
 
     def _generate_color_palette(self) -> str:
         max_len = max(len(desc) for desc in DisplayColor.COLOR_MAP.values()) + 2
@@ -60,6 +63,7 @@ class DisplayRendering:
             "P",
             "P_int",
             "J",
+            "/",
             "U",
             "D",
             "L",
@@ -144,7 +148,16 @@ class DisplayRendering:
             f"({showed_item}/{DisplayColor.BRIGHT_BLUE}{DisplayColor.BOLD}{self.total_items}{DisplayColor.RESET})"
         )
 
-        print_page_indicator_buffer = [f"{page_colored} {page_indicator_colored} {total_item_colored}\n"]
+        loading_colored = f" {DisplayColor.YELLOW}Loading...{DisplayColor.RESET}" if self.loading else ""
+        filter_colored = (
+            f" {DisplayColor.BRIGHT_BLUE}{DisplayColor.BOLD}Filter:{DisplayColor.RESET} {self.filter_query}"
+            if self.filter_query and not self.filter_editing
+            else ""
+        )
+
+        print_page_indicator_buffer = [
+            f"{page_colored} {page_indicator_colored} {total_item_colored}{loading_colored}{filter_colored}\n"
+        ]
         return print_page_indicator_buffer
 
     def text_wrap(self, text: str, width: int, indent: int = 0) -> str:
@@ -188,13 +201,14 @@ class DisplayRendering:
 
             item_number = self._get_page_start_index() + index + 1
 
-            color_viewed = DisplayColor.LIGHT_GRAY if self.history_map.get(item_url, "").lower() == "viewed" else ""
+            color_viewed = DisplayColor.LIGHT_GRAY if self.is_viewed(item_url) else ""
 
             color_bookmarked = ""
             if getattr(self, "bookmark", True):
-                if self.is_item_bookmarked(item_url, "bookmark"):
+                categories = self.item_bookmark_categories(item_url)
+                if "bookmark" in categories:
                     color_bookmarked = DisplayColor.YELLOW
-                elif self.is_item_bookmarked(item_url, "completed"):
+                elif "completed" in categories:
                     color_bookmarked = DisplayColor.GREEN
 
             link_colored = f"\n\t{DisplayColor.LINK_COLOR}{item_url}{DisplayColor.RESET}" if self.show_link else ""
@@ -240,6 +254,9 @@ class DisplayRendering:
         return print_menu_buffer
 
     def print_user_input(self):
+        if self.filter_editing:
+            return [f"{DisplayColor.BRIGHT_BLUE}{DisplayColor.BOLD}Filter: {DisplayColor.RESET}/{self.filter_query}"]
+
         current_index = (
             self._get_page_start_index() + self.cursor_in_page + 1
             if self.splited_data and self.splited_data_items
@@ -1 +1,4 @@
 def calculate_match_score(title: str, query: set[str], min_length: int = 3) -> float: ...
+def score_titles(
+    titles: list[str] | list[list[str]], query: set[str], min_length: int = 3
+) -> list[tuple[int, float]]: ...
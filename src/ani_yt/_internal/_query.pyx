@@ -32,3 +32,49 @@ cpdef float calculate_match_score(str title, set query, int min_length=3):
     for word in query:
         score += calculate_word_score(word, title_words, min_length, longest_word)
     return score
+
+
+cpdef list score_titles(list titles, set query, int min_length=3):
+    """
+    Score every title against `query` in one call, like `calculate_match_score`.
+    A title is a string or a pre-split list of its words, empty titles score 0.
+    Returns (index, score) of the titles scoring above 0, best first, ties in title order.
+    """
+    cdef list words = list(query)
+    cdef Py_ssize_t count = len(titles)
+    cdef Py_ssize_t n_words = len(words)
+    cdef Py_ssize_t i, j
+    cdef list title_words
+    cdef list result = []
+    cdef object title
+    cdef str word
+    cdef int longest_word, length
+    cdef float score
+
+    if not words:
+        raise ValueError(f'{score_titles.__name__}: query is empty.')
+
+    for i in range(count):
+        title = titles[i]
+        title_words = title if type(title) is list else (<str>title).split()
+        if not title_words:
+            continue
+
+        longest_word = 0
+        for word in title_words:
+            length = len(word)
+            if length > longest_word:
+                longest_word = length
+
+        score = 0.0
+        for j in range(n_words):
+            score += calculate_word_score(<str>words[j], title_words, min_length, longest_word)
+        if score > 0:
+            result.append((i, score))
+
+    result.sort(key=_by_score, reverse=True)
+    return result
+
+
+cdef object _by_score(tuple item):
+    return item[1]
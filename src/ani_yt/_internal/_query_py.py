@@ -0,0 +1,66 @@
+"""
+Pure-Python `_query`, used when the compiled extension is not available.
+
+Scores are identical to `_query.pyx`: it computes in C floats, so every partial
+score and every sum is rounded to single precision here as well.
+"""
+
+import struct
+
+_FLOAT = struct.Struct("f")
+
+
+def _float(value: float) -> float:
+    return _FLOAT.unpack(_FLOAT.pack(value))[0]
+
+
+def calculate_word_score(word: str, title_words: list[str], min_length: int, longest_word: int) -> float:
+    score = 0.0
+    for title_word in title_words:
+        if len(word) >= min_length:
+            if word == title_word:
+                return 1.0
+        if longest_word > 0 and word in title_word:
+            score = _float(score + _float(len(word) / longest_word))
+    return score
+
+
+def calculate_match_score(title: str, query: set[str], min_length: int = 3) -> float:
+    if not query:
+        raise ValueError(f"{calculate_match_score.__name__}: query is empty.")
+    title_words = title.split()
+    if not title_words:
+        raise ValueError(f"{calculate_match_score.__name__}: title is empty.")
+
+    longest_word = max(map(len, title_words))
+    score = 0.0
+    for word in query:
+        score = _float(score + calculate_word_score(word, title_words, min_length, longest_word))
+    return score
+
+
+def score_titles(titles: list, query: set[str], min_length: int = 3) -> list[tuple[int, float]]:
+    """
+    Score every title against `query` in one call, like `calculate_match_score`.
+    A title is a string or a pre-split list of its words, empty titles score 0.
+    Returns (index, score) of the titles scoring above 0, best first, ties in title order.
+    """
+    words = list(query)
+    if not words:
+        raise ValueError(f"{score_titles.__name__}: query is empty.")
+
+    result = []
+    for idx, title in enumerate(titles):
+        title_words = title if type(title) is list else title.split()
+        if not title_words:
+            continue
+
+        longest_word = max(map(len, title_words))
+        score = 0.0
+        for word in words:
+            score = _float(score + calculate_word_score(word, title_words, min_length, longest_word))
+        if score > 0:
+            result.append((idx, score))
+
+    result.sort(key=lambda item: item[1], reverse=True)
+    return result
@@ -1,8 +1,10 @@
 import argparse
+import atexit
 import sys
 
 from . import __version__
 from .ani_tracker_handler import TrackerWrapper
+from .cache_handler import ExtractionCache
 from .exceptions import PauseableException
 from .extension import Extension
 from .file_handler import Initialize
@@ -11,6 +13,8 @@ from .input_handler import InputHandler
 from .main import Main
 from .os_manager import OSManager
 from .player import PlayerConfig, TermuxPlayerConfig
+from .thumbnail_handler import ThumbnailHandler
+from .yt_dlp_handler import YT_DLP_FetchOptions, YT_DLP_Options
 
 
 class ArgsHandler:
@@ -49,6 +53,13 @@ class ArgsHandler:
             const="store_true",
             help="Disable extension update.",
         )
+        self.group_env.add_argument(
+            "--update-check-interval",
+            type=float,
+            default=24,
+            metavar="HOURS",
+            help="Hours between two yt-dlp update checks, the last result is reused in between (default: 24).",
+        )
 
         self.group_update = self.parser.add_argument_group("Source Update Options")
         self.group_update.add_argument(
@@ -65,6 +76,46 @@ class ArgsHandler:
             const="source_rebuild",
             help="Quick update command for `source rebuild`",
         )
+        self.group_update.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=YT_DLP_FetchOptions().jobs,
+            help=(
+                "Number of channels fetched at the same time by `source update`, `source rebuild`"
+                " and -mc/--merge-channels, also used for playlist ranges with --split-fetch"
+                f" (default: {YT_DLP_FetchOptions().jobs})."
+            ),
+        )
+        self.group_update.add_argument(
+            "-inc",
+            "--incremental",
+            action="store_true",
+            help=(
+                "Refresh the current playlist by fetching only until already known videos are reached."
+                " Playlists that list the oldest videos first are still read to the end."
+            ),
+        )
+        self.group_update.add_argument(
+            "--split-fetch",
+            action="store_true",
+            help="Fetch long playlists in ranges of --chunk-size videos in parallel, when the site supports it.",
+        )
+        self.group_update.add_argument(
+            "--chunk-size",
+            type=int,
+            default=YT_DLP_FetchOptions().chunk_size,
+            help=f"Number of videos per range with --split-fetch (default: {YT_DLP_FetchOptions().chunk_size}).",
+        )
+        self.group_update.add_argument(
+            "--fetch-timeout",
+            type=int,
+            default=YT_DLP_FetchOptions().timeout,
+            help=(
+                "Seconds to wait for all channels with -mc/--merge-channels,"
+                f" the ones not fetched by then are skipped (default: {YT_DLP_FetchOptions().timeout})."
+            ),
+        )
 
         self.group_playlist = self.parser.add_argument_group("Playlist and Channel Options")
         self.group_playlist.add_argument(
@@ -93,6 +144,14 @@ class ArgsHandler:
             nargs=argparse.REMAINDER,
             help="Pass args to MPV, or show current default args if none are provided. Must be the LAST option.",
         )
+        self.group_mpv.add_argument(
+            "--prefetch-next",
+            action="store_true",
+            help=(
+                "Extract the next unviewed video while the current one plays, so it starts faster."
+                " Not used with the android and ssh modes."
+            ),
+        )
         self.group_mpv.add_argument(
             "--show-mpv-args",
             action="store_true",
@@ -199,12 +258,69 @@ class ArgsHandler:
             default=1,
             help="Number of recent playlists to keep when clearing history.",
         )
+        self.group_cache.add_argument(
+            "--history-backend",
+            type=str,
+            choices=["json", "sqlite", "sharded"],
+            default="json",
+            help=(
+                "History storage: 'json' keeps data/history.json,"
+                " 'sqlite' uses data/history.sqlite3,"
+                " 'sharded' uses data/history/ with one file per playlist."
+                " Both import the JSON history on first use (default: json)."
+            ),
+        )
+        self.group_cache.add_argument(
+            "--export-history",
+            type=str,
+            metavar="FILE",
+            help="Export history to FILE in the JSON format.",
+        )
+        self.group_cache.add_argument(
+            "--export-cache",
+            type=str,
+            metavar="FILE",
+            help="Export the cached playlist list to FILE in the JSON format.",
+        )
         self.group_cache.add_argument(
             "--delete-bookmark",
             action="store_const",
             const="delete_bookmark",
             help="Delete bookmark.",
         )
+        self.group_cache.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Do not read or write cached playlist extraction results.",
+        )
+        self.group_cache.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Ignore cached playlist extraction results and fetch them again.",
+        )
+        self.group_cache.add_argument(
+            "--cache-ttl",
+            type=int,
+            default=ExtractionCache().ttl,
+            help=f"Seconds a cached playlist extraction result stays valid (default: {ExtractionCache().ttl}).",
+        )
+        self.group_cache.add_argument(
+            "--cache-size",
+            type=int,
+            default=ExtractionCache().max_entries,
+            help=f"Maximum number of cached playlist extraction results (default: {ExtractionCache().max_entries}).",
+        )
+        self.group_cache.add_argument(
+            "--thumbnail-cache-size",
+            type=int,
+            default=50,
+            help="Maximum size in MB of the local thumbnail store (default: 50).",
+        )
+        self.group_cache.add_argument(
+            "--cache-stats",
+            action="store_true",
+            help="Show cache hit/miss counts on exit.",
+        )
 
         self.group_browse = self.parser.add_argument_group("Browse and View Options")
         self.group_browse.add_argument(
@@ -242,6 +358,11 @@ class ArgsHandler:
             const="resume",
             help="View last viewed video.",
         )
+        self.group_browse.add_argument(
+            "--prefetch-thumbnails",
+            action="store_true",
+            help="Download the thumbnails of the visible page in the background.",
+        )
 
         self.subparsers = self.parser.add_subparsers(
             dest="command",
@@ -259,13 +380,23 @@ class ArgsHandler:
 
         self.sources_subparsers.add_parser("template", help="Create placeholder source file.")
 
-        self.sources_subparsers.add_parser("update", help="Update playlist from all saved sources.")
+        update_parser = self.sources_subparsers.add_parser("update", help="Update playlist from all saved sources.")
 
-        self.sources_subparsers.add_parser(
+        rebuild_parser = self.sources_subparsers.add_parser(
             "rebuild",
             help="Rebuild playlist from all saved sources (clear then update).",
         )
 
+        for parser in (update_parser, rebuild_parser):
+            # SUPPRESS keeps the value given to the main parser unless overridden here
+            parser.add_argument(
+                "-j",
+                "--jobs",
+                type=int,
+                default=argparse.SUPPRESS,
+                help="Number of channels fetched at the same time.",
+            )
+
         self.download_parsers = self.subparsers.add_parser(
             "download", help="Download video and skip sponsors using SponsorBlock."
         )
@@ -308,6 +439,20 @@ class ArgsHandler:
 
         self.playlist_parsers.add_argument("url", type=str)
 
+        self.bench_parsers = self.subparsers.add_parser("bench", help="Measure performance on this machine.")
+        self.bench_subparsers = self.bench_parsers.add_subparsers(
+            dest="bench_command", metavar="benchmark", required=True
+        )
+        bench_search_parser = self.bench_subparsers.add_parser(
+            "search", help="Time the search backends on the cached playlists and show the active one."
+        )
+        bench_search_parser.add_argument(
+            "query", type=str, nargs="?", help="Search content (default: the start of the first cached title)."
+        )
+        bench_search_parser.add_argument(
+            "-r", "--repeat", type=int, default=5, help="Runs per backend, the fastest is reported."
+        )
+
         self._args_wrapping()
 
         self.args = self.parser.parse_args()
@@ -371,6 +516,13 @@ class ArgsHandler:
         if self.args.no_extension_update:
             Extension.check_update_enabled = False
 
+        if self.args.update_check_interval < 0:
+            print("Error: Update check interval must be >= 0")
+            OSManager.exit(1)
+
+        Extension.check_interval = self.args.update_check_interval * 60 * 60
+        Extension.start_update_check()
+
         active_player_config = TermuxPlayerConfig if self.args.mpv_player == "termux-x11" else PlayerConfig
 
         if self.args.mpv_args:
@@ -416,11 +568,53 @@ class ArgsHandler:
                     print("No default args configured.")
                 InputHandler.press_any_key()
 
+        if self.args.jobs < 1:
+            print("Error: Number of jobs must be >= 1")
+            OSManager.exit(1)
+
+        if self.args.chunk_size < 1:
+            print("Error: Chunk size must be >= 1")
+            OSManager.exit(1)
+
+        if self.args.fetch_timeout < 1:
+            print("Error: Fetch timeout must be >= 1")
+            OSManager.exit(1)
+
+        if self.args.cache_size < 1:
+            print("Error: Cache size must be >= 1")
+            OSManager.exit(1)
+
+        if self.args.thumbnail_cache_size < 1:
+            print("Error: Thumbnail cache size must be >= 1")
+            OSManager.exit(1)
+
         self.main = Main(
             channel_url=self.args.channel,
             opts=self.args.mpv_player,
+            fetch_opts=YT_DLP_FetchOptions(
+                jobs=self.args.jobs,
+                timeout=self.args.fetch_timeout,
+                split=self.args.split_fetch,
+                chunk_size=self.args.chunk_size,
+            ),
+            extraction_cache=ExtractionCache(
+                ttl=self.args.cache_ttl,
+                max_entries=self.args.cache_size,
+                enabled=not self.args.no_cache,
+                refresh=self.args.refresh,
+            ),
+            incremental=self.args.incremental,
+            thumbnail_handler=ThumbnailHandler(
+                YT_DLP_Options(), max_bytes=self.args.thumbnail_cache_size * 1024 * 1024
+            ),
+            prefetch_thumbnails=self.args.prefetch_thumbnails,
+            prefetch_next=self.args.prefetch_next,
+            history_backend=self.args.history_backend,
         )
 
+        if self.args.cache_stats:
+            atexit.register(self.main.print_cache_stats)
+
         if self.args.channel:
             self.main.update()
 
@@ -430,6 +624,12 @@ class ArgsHandler:
         if self.args.clear_history:
             self.main.clear_history(mode=self.args.clear_history, keep_recent=self.args.keep_recent)
 
+        if self.args.export_history:
+            self.main.export_history(self.args.export_history)
+
+        if self.args.export_cache:
+            self.main.export_cache(self.args.export_cache)
+
         self.actions = {
             "clear_cache": self.main.clear_cache,
             "delete_history": self.main.delete_history,
@@ -505,4 +705,7 @@ class ArgsHandler:
         if self.args.command == "playlist":
             self.main.playlist_from_url(self.args.url)
 
+        if self.args.command == "bench" and self.args.bench_command == "search":
+            self.main.bench_search(self.args.query, self.args.repeat)
+
         OSManager.exit(0)
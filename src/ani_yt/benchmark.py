@@ -0,0 +1,334 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import cast
+
+from ._internal import QUERY_BACKEND, _query, _query_py
+from .common import HistoryData
+from .file_handler import FileHandler
+from .query import Query
+from .serializer import Serializer
+
+
+class Benchmark:
+    """Micro-benchmarks of the hot paths, run with `python -m ani_yt.benchmark`."""
+
+    @staticmethod
+    def sample_history(playlists: int = 50, videos: int = 200) -> HistoryData:
+        """A history shaped like a real one: long titles, canonical urls, about half the videos viewed."""
+        start = datetime(2024, 1, 1)
+        # Videos only carry `last_viewed` once viewed, which the literal can't express to the type checker
+        return cast(
+            HistoryData,
+            {
+                "current": {
+                    "playlist_url": "https://www.youtube.com/playlist?list=PL0000",
+                    "video_url": "https://www.youtube.com/watch?v=00000000000",
+                },
+                "playlists": [
+                    {
+                        "playlist_title": f"Anime Series {p} - Official Full Episodes [Eng Sub]",
+                        "playlist_url": f"https://www.youtube.com/playlist?list=PL{p:04d}",
+                        "last_updated": (start + timedelta(days=p)).isoformat(),
+                        "last_viewed": (start + timedelta(days=p, hours=1)).isoformat(),
+                        "videos": [
+                            {
+                                "video_title": f"Anime Series {p} Episode {v} - The Title Of This Episode",
+                                "video_url": f"https://www.youtube.com/watch?v={p:05d}{v:06d}",
+                                "status": "viewed" if v % 2 else "",
+                                **(
+                                    {"last_viewed": (start + timedelta(days=p, minutes=v)).isoformat()} if v % 2 else {}
+                                ),
+                            }
+                            for v in range(videos)
+                        ],
+                    }
+                    for p in range(playlists)
+                ],
+            },
+        )
+
+    @staticmethod
+    def best_of(func: Callable[[], object], repeat: int) -> float:
+        """Fastest of `repeat` runs of `func`, in seconds."""
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    @staticmethod
+    def serializers(data: HistoryData, repeat: int = 5) -> list[tuple[str, int, float, float]]:
+        """(backend, size in bytes, dump seconds, load seconds) of `data` for every installed backend."""
+        results = []
+        previous = Serializer.backend
+        try:
+            for backend in Serializer.BACKENDS:
+                Serializer.use(backend)
+                for pretty in (False, True):
+                    encoded = Serializer.dumps(data, pretty=pretty).encode("utf-8")
+                    results.append(
+                        (
+                            f"{backend} ({'pretty' if pretty else 'compact'})",
+                            len(encoded),
+                            Benchmark.best_of(lambda: Serializer.dumps(data, pretty=pretty), repeat),
+                            Benchmark.best_of(lambda: Serializer.loads(encoded), repeat),
+                        )
+                    )
+        finally:
+            Serializer.backend = previous
+
+        if Serializer.has_msgpack():
+            packed = Serializer.packb(data)
+            results.append(
+                (
+                    "msgpack",
+                    len(packed),
+                    Benchmark.best_of(lambda: Serializer.packb(data), repeat),
+                    Benchmark.best_of(lambda: Serializer.unpackb(packed), repeat),
+                )
+            )
+        return results
+
+    @staticmethod
+    def sample_titles(count: int, seed: int = 0) -> list[tuple[str, str]]:
+        """`count` playlist cache rows with titles drawn from a small vocabulary, so many share words."""
+        words = (
+            "anime series season episode official full sub dub eng vietsub movie special part "
+            "one piece naruto bleach hunter dragon ball attack titan slayer hero academia spy family"
+        ).split()
+        rng = random.Random(seed)
+        return [
+            (
+                " ".join(rng.choices(words, k=rng.randint(3, 8))) + f" {i}",
+                f"https://www.youtube.com/playlist?list=PL{i:08d}",
+            )
+            for i in range(count)
+        ]
+
+    @staticmethod
+    def legacy_fuzzysearch(data, query: str, score: int = 50) -> list[tuple[str, str]]:
+        """The fuzzysearch before it used match indices: one scan of `data` per match, O(n^2)."""
+        from rapidfuzz import process
+
+        query = query.lower()
+        result = process.extract(query, [item[0].lower() for item in data], limit=None)
+        matched = []
+        for name, matched_score, _ in result:
+            item = next((item for item in data if item[0].lower() == name and matched_score > score), None)
+            if item:
+                matched.append((item[0], item[1], matched_score))
+        return [(title, url) for title, url, _ in sorted(matched, key=lambda x: x[2], reverse=True)]
+
+    @staticmethod
+    def fuzzysearch(
+        sizes: tuple[int, ...] = (1_000, 10_000, 100_000),
+        repeat: int = 3,
+        legacy_max: int = 10_000,
+    ) -> list[tuple[int, float | None, float, float]]:
+        """
+        (titles, legacy seconds, seconds, top-10 seconds) of a fuzzy search at each size.
+        The legacy path is quadratic, it is skipped (None) above `legacy_max` titles.
+        """
+        query = Query()
+        results = []
+        for size in sizes:
+            data = Benchmark.sample_titles(size)
+            legacy = None
+            if size <= legacy_max:
+                legacy = Benchmark.best_of(lambda: Benchmark.legacy_fuzzysearch(data, "one piece"), repeat)
+            results.append(
+                (
+                    size,
+                    legacy,
+                    Benchmark.best_of(lambda: query.fuzzysearch(data, "one piece"), repeat),
+                    Benchmark.best_of(lambda: query.fuzzysearch(data, "one piece", limit=10), repeat),
+                )
+            )
+        return results
+
+    @staticmethod
+    def search_index(
+        sizes: tuple[int, ...] = (1_000, 10_000, 100_000),
+        queries: tuple[str, ...] = ("777", "one piece"),
+        repeat: int = 3,
+    ) -> list[tuple[int, str, int, float, float]]:
+        """
+        (titles, query, matches, scan seconds, indexed seconds) of `Query.search` on a playlist cache.
+        The default queries are a rare word and two words found in a large share of the titles.
+        """
+        query = Query()
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            file_handler = FileHandler()
+            file_handler.filename = os.path.join(directory, "playlists.bin")
+            file_handler.index_filename = os.path.join(directory, "playlists.idx")
+            for size in sizes:
+                file_handler.dump(Benchmark.sample_titles(size))
+                with file_handler.load() as view:
+                    index = view.index
+                    for text in queries:
+                        view.index = None
+                        scan = Benchmark.best_of(lambda: query.search(view, text), repeat)
+                        view.index = index
+                        indexed = Benchmark.best_of(lambda: query.search(view, text), repeat)
+                        results.append((size, text, len(query.search(view, text)), scan, indexed))
+        return results
+
+    @staticmethod
+    def scoring(
+        sizes: tuple[int, ...] = (1_000, 10_000, 100_000),
+        text: str = "one piece",
+        repeat: int = 3,
+    ) -> list[tuple[int, float, float, float]]:
+        """
+        (titles, loop seconds, batch seconds, pre-split batch seconds) of scoring every title against `text`.
+        The loop calls `calculate_match_score` once per title, the batch passes every title to `score_titles`.
+        """
+        query = set(text.split())
+
+        def loop(titles):
+            scored = [
+                (idx, _query.calculate_match_score(title, query, min_length=3)) for idx, title in enumerate(titles)
+            ]
+            return sorted([item for item in scored if item[1] > 0], key=lambda x: x[1], reverse=True)
+
+        results = []
+        for size in sizes:
+            titles = [title.lower() for title, _ in Benchmark.sample_titles(size)]
+            split = [title.split() for title in titles]
+            results.append(
+                (
+                    size,
+                    Benchmark.best_of(lambda: loop(titles), repeat),
+                    Benchmark.best_of(lambda: _query.score_titles(titles, query), repeat),
+                    Benchmark.best_of(lambda: _query.score_titles(split, query), repeat),
+                )
+            )
+        return results
+
+    @staticmethod
+    def search_backends(titles: list[str], text: str, repeat: int = 5) -> list[tuple[str, int, float]]:
+        """(backend, matches, seconds) of scoring `titles` against `text` with every available `_query`."""
+        backends = {"compiled": _query} if QUERY_BACKEND == "compiled" else {}
+        backends["python"] = _query_py
+
+        titles = [title.lower() for title in titles]
+        query = set(text.lower().split())
+        return [
+            (
+                name,
+                len(module.score_titles(titles, query)),
+                Benchmark.best_of(lambda: module.score_titles(titles, query), repeat),
+            )
+            for name, module in backends.items()
+        ]
+
+    @staticmethod
+    def report_search_backends(titles: list[str], text: str | None = None, repeat: int = 5) -> None:
+        """Print the timings of `search_backends` and which backend `Query.search` uses."""
+        if titles and not text:
+            # The first words of a cached title, a query that matches at least one playlist
+            text = " ".join(titles[0].split()[:2])
+        if not titles or not text or not text.split():
+            print("Nothing to search: the playlist cache or the query is empty.")
+            return
+
+        print(f"Scoring {len(titles)} cached titles against '{text}', best of {repeat}\n")
+        Benchmark.print_table(
+            ("backend", "matches", "time", ""),
+            [
+                (name, matches, f"{seconds * 1000:.2f} ms", "active" if name == QUERY_BACKEND else "")
+                for name, matches, seconds in Benchmark.search_backends(titles, text, repeat)
+            ],
+        )
+        if QUERY_BACKEND == "python":
+            print("\nThe compiled _query extension is not available, reinstall AniYT with Cython to build it.")
+
+    @staticmethod
+    def print_table(headers: tuple[str, ...], rows: list[tuple]) -> None:
+        rows_text = [tuple(str(cell) for cell in row) for row in rows]
+        widths = [max(len(row[i]) for row in [headers, *rows_text]) for i in range(len(headers))]
+        for row in [headers, *rows_text]:
+            print("  ".join(cell.ljust(width) for cell, width in zip(row, widths, strict=True)))
+
+    @staticmethod
+    def main(argv: list[str] | None = None) -> None:
+        parser = argparse.ArgumentParser(prog="python -m ani_yt.benchmark", description="AniYT micro-benchmarks")
+        parser.add_argument(
+            "suite",
+            nargs="?",
+            choices=("serializer", "fuzzysearch", "index", "scoring"),
+            default="serializer",
+            help="What to measure (default: serializer)",
+        )
+        parser.add_argument("--playlists", type=int, default=50, help="Playlists in the sample history")
+        parser.add_argument("--videos", type=int, default=200, help="Videos per playlist")
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000, 100_000],
+            help="Title counts of the fuzzysearch, index and scoring benchmarks",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, the fastest is kept")
+        args = parser.parse_args(argv)
+
+        if args.suite == "fuzzysearch":
+            print(f"Fuzzy search of 'one piece', best of {args.repeat}\n")
+            Benchmark.print_table(
+                ("titles", "legacy", "indexed", "top 10"),
+                [
+                    (
+                        size,
+                        "skipped" if legacy is None else f"{legacy * 1000:.1f} ms",
+                        f"{indexed * 1000:.1f} ms",
+                        f"{top * 1000:.1f} ms",
+                    )
+                    for size, legacy, indexed, top in Benchmark.fuzzysearch(tuple(args.sizes), args.repeat)
+                ],
+            )
+            return
+
+        if args.suite == "scoring":
+            print(f"Match scoring of 'one piece', best of {args.repeat}\n")
+            Benchmark.print_table(
+                ("titles", "loop", "batch", "batch (pre-split)"),
+                [
+                    (size, f"{loop * 1000:.2f} ms", f"{batch * 1000:.2f} ms", f"{split * 1000:.2f} ms")
+                    for size, loop, batch, split in Benchmark.scoring(tuple(args.sizes), repeat=args.repeat)
+                ],
+            )
+            return
+
+        if args.suite == "index":
+            print(f"Playlist search with and without the search index, best of {args.repeat}\n")
+            Benchmark.print_table(
+                ("titles", "query", "matches", "scan", "indexed"),
+                [
+                    (size, text, matches, f"{scan * 1000:.2f} ms", f"{indexed * 1000:.2f} ms")
+                    for size, text, matches, scan, indexed in Benchmark.search_index(
+                        tuple(args.sizes), repeat=args.repeat
+                    )
+                ],
+            )
+            return
+
+        data = Benchmark.sample_history(args.playlists, args.videos)
+        print(f"History of {args.playlists} playlists x {args.videos} videos, best of {args.repeat}\n")
+        Benchmark.print_table(
+            ("backend", "size", "dump", "load"),
+            [
+                (name, f"{size / 1024:.0f} KiB", f"{dump * 1000:.2f} ms", f"{load * 1000:.2f} ms")
+                for name, size, dump, load in Benchmark.serializers(data, args.repeat)
+            ],
+        )
+
+
+if __name__ == "__main__":
+    Benchmark.main()
@@ -1,22 +1,60 @@
 import functools
+import os
+import sys
+import time
 from typing import cast
 
-import ujson as json
-
-from .common import BookmarkData, Video
+from .common import BookmarkData, Video, VideoRecord
 from .exceptions import CategoryNotExist, InvalidBookmarkFile
 from .os_manager import OSManager
+from .serializer import Serializer
+from .url_normalizer import UrlNormalizer
 
 
 class BookmarkingHandler:
-    def __init__(self):
+    """
+    Bookmarks are loaded once and kept in memory with a video id -> categories index,
+    so the menu can check every visible item without touching the disk.
+    The file is read again only when its modification time changes, checked at
+    most once every `stat_interval` seconds.
+    """
+
+    def __init__(self, stat_interval=1.0):
         self.filename = "./data/bookmark.json"
         self.encoding = "utf-8"
         self.required_categories = ["bookmark", "completed"]
+        self.stat_interval = stat_interval
+
+        self._data: BookmarkData | None = None
+        # Keyed by `UrlNormalizer.key`, every form of a video url finds its bookmarks
+        self._index: dict[str, set[str]] = {}
+        self._mtime: int | None = None
+        self._checked_at = 0.0
+
+    def _file_mtime(self) -> int | None:
+        try:
+            return os.stat(self.filename).st_mtime_ns
+        except OSError:
+            return None
+
+    def _set_cache(self, data: BookmarkData) -> None:
+        self._data = data
+        self._index = {}
+        for category, items in cast(dict[str, dict[str, str]], data).items():
+            for title, url in items.items():
+                # Interned like `VideoRecord` urls, the menu and the history share one copy
+                items[title] = url = sys.intern(url)
+                self._index.setdefault(UrlNormalizer.key(url), set()).add(category)
+        self._mtime = self._file_mtime()
+        self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._data = None
 
     def _save_full_data(self, data: BookmarkData) -> None:
-        with open(self.filename, "w", encoding=self.encoding) as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        # Edited by hand, kept indented
+        Serializer.dump_file(self.filename, data, pretty=True)
+        self._set_cache(data)
 
     def _init_default_data(self) -> BookmarkData:
         # Return default valid structure.
@@ -46,22 +84,47 @@ class BookmarkingHandler:
         return wrapper
 
     @validate_structure
-    def load_full_data(self) -> BookmarkData:
+    def _read_full_data(self) -> BookmarkData:
         if not OSManager.exists(self.filename):
             return self._init_default_data()
         try:
             with open(self.filename, encoding=self.encoding) as f:
                 content = f.read()
-                return cast(BookmarkData, json.loads(content)) if content else cast(BookmarkData, {})
-        except (OSError, json.JSONDecodeError):
+                return cast(BookmarkData, Serializer.loads(content)) if content else cast(BookmarkData, {})
+        except (OSError, Serializer.DecodeError):
             return self._init_default_data()
 
+    def load_full_data(self, force_check: bool = False) -> BookmarkData:
+        if not force_check and self._data is not None and time.monotonic() - self._checked_at < self.stat_interval:
+            return self._data
+
+        mtime = self._file_mtime()
+        if self._data is None or mtime is None or mtime != self._mtime:
+            self._set_cache(self._read_full_data())
+        else:
+            self._checked_at = time.monotonic()
+        return cast(BookmarkData, self._data)
+
+    def get_categories(self, url: str) -> set[str]:
+        """Return the categories containing `url`."""
+        self.load_full_data()
+        return self._index.get(UrlNormalizer.key(url), set())
+
     def get_category(self, category: str) -> dict[str, str]:
         full_data: BookmarkData = self.load_full_data()
         return full_data.get(category, {})
 
-    def update_item(self, data: Video | list, category: str, create_new: bool = False) -> None:
-        full_data: BookmarkData = self.load_full_data()
+    def update_item(self, data: Video | VideoRecord | list, category: str, create_new: bool = False) -> None:
+        if isinstance(data, (dict, VideoRecord)):
+            key, value = data.get("video_title"), data.get("video_url")
+        else:
+            key, value = data[0], data[1]
+
+        if key is None or value is None:
+            raise ValueError("Data must contain title and url")
+
+        # Writes always check the file, so changes made outside are not overwritten
+        full_data: BookmarkData = self.load_full_data(force_check=True)
 
         if category not in full_data:
             if create_new:
@@ -73,33 +136,24 @@ class BookmarkingHandler:
                 )
 
         bookmarks: dict[str, str] = full_data[category]
-
-        if isinstance(data, dict):
-            key, value = data.get("video_title"), data.get("video_url")
-        else:
-            key, value = data[0], data[1]
-
-        if key is None or value is None:
-            raise ValueError("Data must contain title and url")
-
-        bookmarks[key] = value
+        bookmarks[key] = UrlNormalizer.canonical(value)
         self._save_full_data(full_data)
 
     def is_item_exist(self, url: str, category: str) -> bool:
-        items: dict[str, str] = self.get_category(category)
-        return url in items.values()
+        return category in self.get_categories(url)
 
     def remove_item(self, url: str, category: str) -> None:
-        full_data: BookmarkData = self.load_full_data()
+        full_data: BookmarkData = self.load_full_data(force_check=True)
 
         if category not in full_data:
             return
 
         items: dict[str, str] = full_data[category]
 
+        url_key = UrlNormalizer.key(url)
         key_to_delete = None
         for key, value in items.items():
-            if value == url:
+            if UrlNormalizer.key(value) == url_key:
                 key_to_delete = key
                 break
 
@@ -109,3 +163,4 @@ class BookmarkingHandler:
 
     def delete_file(self):
         OSManager.delete_file(self.filename)
+        self.invalidate()
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import time
+
+from .os_manager import OSManager
+from .serializer import Serializer
+
+
+class ExtractionCache:
+    """
+    On-disk cache of flat yt-dlp extraction results, keyed by url and options.
+
+    Each entry is stored in its own file so a lookup only reads what it needs.
+    The file modification time doubles as the last access time for LRU eviction.
+    Entries are msgpack when it is installed, else compact JSON.
+    """
+
+    SUFFIXES = (".msgpack", ".json")
+
+    def __init__(self, ttl=3600, max_entries=64, enabled=True, refresh=False):
+        self.directory = "./data/cache"
+        self.encoding = "utf-8"
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.refresh = refresh
+        self.binary = Serializer.has_msgpack()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(url: str, opts: dict) -> str:
+        return hashlib.sha1(f"{url}\n{sorted(opts.items())!r}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.SUFFIXES[0] if self.binary else self.SUFFIXES[1]}")
+
+    def get(self, url: str, opts: dict) -> dict | None:
+        if not self.enabled or self.refresh:
+            self.misses += 1
+            return None
+
+        path = self._path(self.make_key(url, opts))
+        try:
+            entry = Serializer.load_file(path, binary=self.binary)
+        except (OSError, Serializer.DecodeError):
+            self.misses += 1
+            return None
+
+        if time.time() - entry.get("cached_at", 0) > self.ttl:
+            OSManager.delete_file(path)
+            self.misses += 1
+            return None
+
+        # Mark as recently used
+        os.utime(path)
+        self.hits += 1
+        return entry.get("info")
+
+    def set(self, url: str, opts: dict, info: dict) -> None:
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(self.make_key(url, opts))
+        Serializer.dump_file(path, {"url": url, "cached_at": time.time(), "info": info}, binary=self.binary)
+
+        self._evict()
+
+    def _entries(self) -> list[os.DirEntry]:
+        if not OSManager.isdir(self.directory):
+            return []
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.SUFFIXES)]
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_entries]:
+            OSManager.delete_file(entry.path)
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            OSManager.delete_file(entry.path)
+
+    def stats(self) -> str:
+        return f"[Cache] hits: {self.hits}, misses: {self.misses}"
@@ -1,4 +1,6 @@
-from typing import NotRequired, TypedDict
+import sys
+from collections.abc import Iterator, Mapping
+from typing import Any, NotRequired, TypedDict, cast
 
 
 class Current(TypedDict):
@@ -13,6 +15,93 @@ class Video(TypedDict):
     video_url: str
     status: str
     last_viewed: NotRequired[str]
+    thumbnail_url: NotRequired[str]
+
+
+class VideoRecord:
+    """
+    Compact in-memory form of a `Video`, a slotted object instead of a dict.
+
+    Reads like a `Video` dict (`record["video_url"]`, `get`, `in`, `dict(record)`),
+    so code written for either works on both. Urls and statuses are interned,
+    the history map and the menu share one copy of each string.
+    History handlers load videos as records, `Serializer` writes them back as `Video` dicts.
+    """
+
+    __slots__ = ("video_title", "video_url", "status", "last_viewed", "thumbnail_url")
+
+    def __init__(
+        self,
+        video_title: str,
+        video_url: str,
+        status: str = "",
+        last_viewed: str | None = None,
+        thumbnail_url: str | None = None,
+    ):
+        self.video_title = video_title
+        self.video_url = sys.intern(video_url)
+        self.status = sys.intern(status)
+        self.last_viewed = last_viewed
+        self.thumbnail_url = thumbnail_url
+
+    @classmethod
+    def from_video(cls, video: "Mapping[str, Any] | VideoRecord") -> "VideoRecord":
+        if isinstance(video, VideoRecord):
+            return video
+        return cls(
+            video["video_title"],
+            video["video_url"],
+            video.get("status") or "",
+            video.get("last_viewed"),
+            video.get("thumbnail_url"),
+        )
+
+    def to_video(self) -> Video:
+        return cast(Video, dict(self))
+
+    def keys(self) -> Iterator[str]:
+        return (key for key in self.__slots__ if getattr(self, key) is not None)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def __getitem__(self, key: str) -> str:
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        if key in ("video_url", "status"):
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        """Remove `last_viewed` or `thumbnail_url`, the other fields are required."""
+        if key not in ("last_viewed", "thumbnail_url"):
+            raise KeyError(key)
+        value = self.get(key, default)
+        setattr(self, key, None)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__ and getattr(self, cast(str, key)) is not None
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (VideoRecord, Mapping)):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"VideoRecord({dict(self)!r})"
 
 
 class Playlist(TypedDict):
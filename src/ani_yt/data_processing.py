@@ -1,22 +1,55 @@
+from collections.abc import Iterator
 from typing import Any
 
 from .common import Video
+from .url_normalizer import UrlNormalizer
 
 
 class DataProcessing:
     @staticmethod
-    def omit(data: dict | Any, status: str = "") -> list[Video]:
-        videos: list[Video] = []
-
-        for entry in data.get("entries", []):
+    def iter_omit(entries, status: str = "") -> Iterator[Video]:
+        for entry in entries:
             if entry.get("_type") == "url":
                 video_item: Video = {
                     "video_title": entry["title"],
-                    "video_url": entry["url"],
+                    "video_url": UrlNormalizer.canonical(entry["url"]),
                     "status": status,
                 }
 
-                videos.append(video_item)
+                # Flat entries already carry thumbnails, keep the largest one
+                if entry.get("thumbnails"):
+                    video_item["thumbnail_url"] = entry["thumbnails"][-1]["url"]
+
+                yield video_item
+
+    @staticmethod
+    def omit(data: dict | Any, status: str = "") -> list[Video]:
+        return list(DataProcessing.iter_omit(data.get("entries", []), status))
+
+    @staticmethod
+    def omit_until_known(entries, known_urls: list[str], known_run: int = 3, status: str = "") -> list[Video]:
+        # Consume entries lazily and stop once `known_run` already known videos appear in a row,
+        # so the remaining pages of the playlist are never requested.
+        # `known_urls` is in stored order (sorted by title, oldest episodes first). A run at the very
+        # head made of the oldest stored videos means the playlist lists the oldest videos first and
+        # the new ones are at the end, so it is read to the end instead.
+        videos: list[Video] = []
+        known = {UrlNormalizer.key(url): pos for pos, url in enumerate(known_urls)}
+        middle = (len(known_urls) - 1) / 2
+        run: list[int] = []  # stored positions of the current run of known videos
+        oldest_first = False
+
+        for video in DataProcessing.iter_omit(entries, status):
+            videos.append(video)
+            if oldest_first:
+                continue
+
+            pos = known.get(UrlNormalizer.key(video["video_url"]))
+            run = run + [pos] if pos is not None else []
+            if len(run) >= known_run:
+                if len(run) < len(videos) or sum(run) / len(run) >= middle:
+                    break
+                oldest_first = True
 
         return videos
 
@@ -30,30 +63,37 @@ class DataProcessing:
 
     @staticmethod
     def merge_list(old_videos: list[Video], new_videos: list[Video], truncate: bool = True) -> list[Video]:
-        new_urls = {v["video_url"] for v in new_videos}
+        # Videos are matched by video id, so a video stored under another url form is not duplicated
+        key = UrlNormalizer.key
+        new_keys = {key(v["video_url"]) for v in new_videos}
 
         if truncate:
-            old_videos = [v for v in old_videos if v["video_url"] in new_urls]
+            old_videos = [v for v in old_videos if key(v["video_url"]) in new_keys]
 
-        existing = {v["video_url"]: v for v in old_videos}
+        existing = {key(v["video_url"]): v for v in old_videos}
 
         for v in new_videos:
-            url = v["video_url"]
-            if url in existing:
-                # Update video_title, keep status
-                existing[url]["video_title"] = v["video_title"]
+            video = existing.get(key(v["video_url"]))
+            if video is not None:
+                # Update video_title, video_url and thumbnail_url, keep status
+                video["video_title"] = v["video_title"]
+                video["video_url"] = v["video_url"]
+                if "thumbnail_url" in v:
+                    video["thumbnail_url"] = v["thumbnail_url"]
             else:
                 old_videos.append(v)
+                existing[key(v["video_url"])] = v
 
         return DataProcessing.sort(old_videos, key=lambda x: x["video_title"])
 
     @staticmethod
     def merge_list_preserve_order(old_list: list, new_list: list) -> list:
-        existing_urls = {item[1] for item in old_list}
+        existing_keys = {UrlNormalizer.key(item[1]) for item in old_list}
         for item in new_list:
-            if item[1] not in existing_urls:
+            item_key = UrlNormalizer.key(item[1])
+            if item_key not in existing_keys:
                 old_list.append(item)
-                existing_urls.add(item[1])
+                existing_keys.add(item_key)
         return old_list
 
     @staticmethod
@@ -4,11 +4,13 @@ import sys
 from ._internal._display_color import DisplayColor
 from ._internal._display_extension import DisplayExtension
 from ._internal._display_rendering import DisplayRendering
-from .common import Video
+from .common import VideoRecord
 from .data_processing import DataProcessing
 from .exceptions import PauseableException
-from .helper import IOHelper, LegacyCompatibility
+from .helper import IOHelper, LegacyCompatibility, MenuItems
+from .input_handler import InputMap, ReturnCode
 from .os_manager import OSManager
+from .yt_dlp_handler import YT_DLP_Stream
 
 BACK_SENTINEL = ("__BACK__", "")
 BACK_SENTINEL_TITLE = "__BACK__"
@@ -48,12 +50,14 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
         # These values are always created new each time the class is called or are always overwritten.
         self.opts = opts
         self.user_input = ""
-        self.data: list[Video] | list[dict[str, str]] = []
+        self.data: list[VideoRecord] = []
         self.splited_data = []
         self.len_data = 0
         self.len_last_item = 0
         self.total_items = 0
         self.len_data_items = 0
+        self.stream: YT_DLP_Stream | None = None
+        self.loading = False
 
         # Variable
         # These are variables that are manually cleared for caching purposes.
@@ -85,6 +89,7 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
             "P": {"key": "(P/←)", "desc": "Previous page"},
             "P_int": {"key": "(P:<id>)", "desc": "Jump to page"},
             "J": {"key": "(J)", "desc": "Jump to next unviewed"},
+            "/": {"key": "(/)", "desc": "Filter by title as you type"},
             "U": {"key": "(U/↑)", "desc": "Move cursor up"},
             "D": {"key": "(D/↓)", "desc": "Move cursor down"},
             "B_int": {
@@ -188,6 +193,97 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
         if self.choosed_item is not False:
             self.sync_cursor_with_item()
 
+    def sync_stream(self):
+        if self.stream is None:
+            self.loading = False
+            return
+
+        self.loading = not self.stream.done.is_set()
+        if len(self.stream.videos) == len(self.filter_base()):
+            return
+
+        # New videos are inserted in title order, keep the highlighted video selected
+        choosed_url = None
+        if self.choosed_item is not False and self.choosed_item < len(self.data):
+            choosed_url = self.data[self.choosed_item]["video_url"]
+
+        videos = LegacyCompatibility.normalize_playlist(self.stream.snapshot())
+        if self.filter_active:
+            self.set_filter_base(videos)
+        else:
+            self.data = videos  # type: ignore
+
+        if choosed_url is not None:
+            self.choosed_item = next(
+                (idx for idx, video in enumerate(self.data) if video["video_url"] == choosed_url),
+                self.choosed_item,
+            )
+        self.pagination()
+
+    def stream_changed(self) -> bool:
+        """Whether the streamed playlist grew or finished since it was last drawn."""
+        if self.stream is None:
+            return False
+        return self.loading == self.stream.done.is_set() or len(self.stream.videos) != len(self.filter_base())
+
+    def predict_next_video(self, current_url: str):
+        # After an item is chosen, choosed_item already points to the next unviewed video
+        if self.choosed_item is False or not 0 <= self.choosed_item < len(self.data):
+            return None
+
+        video = self.data[self.choosed_item]
+        if video["video_url"] == current_url or self.is_viewed(video["video_url"]):
+            return None
+        return video
+
+    def _filter_view_changed(self):
+        # Pages and the unviewed cursor are computed over the filtered videos only
+        self.index_item = 0
+        self.pagination()
+        self.choosed_item = self.find_first_unviewed_index()
+        self.index_item = self.choosed_item // self.opts.items_per_list
+        self.sync_cursor_with_item()
+        self.cursor_moved = False
+
+    def _filter_cleared(self):
+        self.pagination()
+        if self.choosed_item is not False:
+            self.index_item = self.choosed_item // self.opts.items_per_list
+            self.sync_cursor_with_item()
+        self.cursor_moved = False
+
+    def filter_menu(self):
+        """
+        Narrow the menu while the filter is typed. Enter keeps the filtered videos,
+        backspace on an empty filter, or Enter when nothing matches, shows all videos again.
+        """
+        self.start_filter()
+        self._filter_view_changed()
+        try:
+            while True:
+                self.len_data_items = len(self.splited_data_items)
+                self.clscr()
+                print(self.get_print_buffer(), end="")
+
+                key = self.read_key()
+                if key in InputMap.enter:
+                    if not self.data:
+                        self.clear_filter()
+                        self._filter_cleared()
+                    return
+                if key in InputMap.backspace:
+                    if not self.filter_pop():
+                        self.clear_filter()
+                        self._filter_cleared()
+                        return
+                elif len(key) == 1 and key.isprintable():
+                    self.filter_push(key)
+                else:
+                    continue
+                self._filter_view_changed()
+        finally:
+            self.filter_editing = False
+
     def toggle_viewed_processing(self, item_number: int | str):
         """Gets item number, finds the URL, and calls the toggle handler."""
         index = int(item_number) - 1
@@ -277,7 +373,7 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
                 if (
                     hasattr(self, "_last_played")
                     and self._last_played == self.choosed_item
-                    and any(self.history_map.get(v["video_url"], "").lower() == "viewed" for v in self.data)
+                    and any(self.is_viewed(v["video_url"]) for v in self.data)
                 ):
                     if self._last_played != 0:
                         self.choosed_item += 1
@@ -342,6 +438,8 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
                 self.choosed_item = self.find_next_unviewed_index(start_idx)
                 self.sync_cursor_with_item()
                 self.cursor_moved = False
+            case "/":
+                self.filter_menu()
             case "J":
                 self.choosed_item = self.find_next_unviewed_index(self.choosed_item)
                 self.valid_index_item()
@@ -378,14 +476,18 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
 
         return handled
 
-    def choose_menu(
-        self,
-        playlists: list[tuple[str, str]] | list[dict[str, str]] | list[list[str]],
-        clear_choosed_item=False,
-    ):
-        playlists = LegacyCompatibility.normalize_playlist(playlists)
+    def choose_menu(self, playlists: MenuItems | YT_DLP_Stream, clear_choosed_item=False):
+        items: MenuItems
+        if isinstance(playlists, YT_DLP_Stream):
+            # Render as soon as the first page is available, the rest is added while browsing
+            self.stream = playlists
+            self.stream.wait_for(self.opts.items_per_list)
+            items = self.stream.snapshot()
+        else:
+            self.stream = None
+            items = playlists
 
-        self.data = playlists
+        self.data = LegacyCompatibility.normalize_playlist(items)
         self.clear_choosed_item = clear_choosed_item
         self.pagination()
 
@@ -400,17 +502,22 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
 
         try:
             while True:
+                self.sync_stream()
                 self.valid_index_item()
 
                 self.splited_data_items = self.splited_data[self.index_item]
                 self.len_data_items = len(self.splited_data_items)
+                self.prefetch_thumbnails(self.splited_data_items)
 
                 print_buffer = self.get_print_buffer()
 
                 self.clscr()
                 print(print_buffer, end="")
 
-                self.get_user_input()
+                # While the playlist is still streaming, redraw as soon as it changes instead of on the next key
+                self.get_user_input(idle=self.stream_changed if self.loading else None)
+                if self.user_input == ReturnCode.REDRAW:
+                    continue
 
                 if self.advanced_options():
                     continue
@@ -425,4 +532,7 @@ class DisplayMenu(Display, DisplayRendering, DisplayExtension):
                 if ans := self.choose_item_option():
                     return ans
         finally:
+            self.flush_history()
+            # The filter applies to this menu only, the selection is kept for the next one
+            self.clear_filter()
             self._init_loop_values_()
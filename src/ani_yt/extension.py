@@ -1,30 +1,95 @@
-import subprocess
+import threading
+import time
+from importlib.metadata import PackageNotFoundError, version
 
-import requests
-
-from .helper import SubprocessHelper
+from .serializer import Serializer
 
 
 class Extension:
     check_update_enabled = True
+    # Seconds between two PyPI lookups, the result is reused in between
+    check_interval = 24 * 60 * 60
+    cache_filename = "./data/update_check.json"
+
+    _update_info: tuple | None = None
+    _thread: threading.Thread | None = None
 
     class CheckModuleUpdate:
         @staticmethod
-        def check_yt_dlp(name="yt-dlp"):
-            print("\n[Extension] Checking for yt-dlp update...")
+        def normalize_version(ver):
+            try:
+                return ".".join(str(int(part)) for part in ver.split("."))
+            except ValueError:
+                return ver
+
+        @staticmethod
+        def is_up_to_date(old_ver, new_ver):
+            try:
+                return tuple(map(int, old_ver.split("."))) >= tuple(map(int, new_ver.split(".")))
+            except ValueError:
+                return old_ver == new_ver
+
+        @staticmethod
+        def installed_version(name="yt-dlp"):
+            try:
+                return Extension.CheckModuleUpdate.normalize_version(version(name))
+            except PackageNotFoundError:
+                return None
+
+        @staticmethod
+        def fetch_latest_version(name="yt-dlp"):
+            import requests
+
+            try:
+                return requests.get(f"https://pypi.org/pypi/{name}/json", timeout=10).json()["info"]["version"]
+            except (requests.exceptions.RequestException, ValueError, KeyError):
+                return None
+
+        @staticmethod
+        def read_cache():
+            try:
+                data = Serializer.load_file(Extension.cache_filename)
+            except (OSError, ValueError):
+                return {}
 
-            if not SubprocessHelper.app_subprocess_help("yt-dlp", check_only=True):
-                return (False, "yt-dlp", "", "")
+            # Any other payload, a list or null, is as unusable as a file that does not decode
+            return data if isinstance(data, dict) else {}
+
+        @staticmethod
+        def load_cache(name):
+            entry = Extension.CheckModuleUpdate.read_cache().get(name)
+            if not isinstance(entry, dict):
+                return None
 
-            old_ver = subprocess.check_output(["yt-dlp", "--version"]).decode("utf-8").strip()
-            old_ver = ".".join(str(int(part)) for part in old_ver.split("."))
+            if time.time() - entry.get("checked_at", 0) > Extension.check_interval:
+                return None
+            return entry.get("latest")
 
+        @staticmethod
+        def save_cache(name, latest):
+            data = Extension.CheckModuleUpdate.read_cache()
+            data[name] = {"checked_at": time.time(), "latest": latest}
             try:
-                new_ver = requests.get("https://pypi.org/pypi/yt-dlp/json", timeout=10).json()["info"]["version"]
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-                new_ver = old_ver
-                print("Update check request timed out.")
-            return (old_ver == new_ver, name, old_ver, new_ver)
+                Serializer.dump_file(Extension.cache_filename, data)
+            except OSError:
+                pass
+
+        @staticmethod
+        def check_yt_dlp(name="yt-dlp"):
+            old_ver = Extension.CheckModuleUpdate.installed_version(name)
+            if old_ver is None:
+                return (True, name, "", "")
+
+            new_ver = Extension.CheckModuleUpdate.load_cache(name)
+            if new_ver is None:
+                new_ver = Extension.CheckModuleUpdate.fetch_latest_version(name)
+                if new_ver is None:
+                    # Unreachable, try again on the next launch
+                    return (True, name, old_ver, old_ver)
+                Extension.CheckModuleUpdate.save_cache(name, new_ver)
+
+            new_ver = Extension.CheckModuleUpdate.normalize_version(new_ver)
+            return (Extension.CheckModuleUpdate.is_up_to_date(old_ver, new_ver), name, old_ver, new_ver)
 
         @staticmethod
         def print_notice(update_info):
@@ -39,17 +104,25 @@ class Extension:
                     f" \033[32mpython -m pip install --upgrade {update_info[1]}\033[0m"
                 )
 
+    @staticmethod
+    def _run_update_check():
+        Extension._update_info = Extension.CheckModuleUpdate.check_yt_dlp()
+
+    @staticmethod
+    def start_update_check():
+        """Check for updates on a daemon thread, the result is shown on exit if it is ready by then."""
+        if not Extension.check_update_enabled or Extension._thread is not None:
+            return
+
+        Extension._thread = threading.Thread(target=Extension._run_update_check, daemon=True)
+        Extension._thread.start()
+
     @staticmethod
     def check_module_update(func):
         def wrapper(*args, **kwargs):
-            check_update = Extension.check_update_enabled
-
-            if check_update:
-                try:
-                    yt_dlp_update_info = Extension.CheckModuleUpdate.check_yt_dlp()
-                    Extension.CheckModuleUpdate.print_notice(yt_dlp_update_info)
-                except KeyboardInterrupt:
-                    print("Canceled update check.")
+            # Never wait for the check, exit must stay instant
+            if Extension.check_update_enabled and Extension._update_info is not None:
+                Extension.CheckModuleUpdate.print_notice(Extension._update_info)
 
             return func(*args, **kwargs)
 
@@ -1,6 +1,11 @@
-import ujson as json
+import itertools
+import mmap
+import os
+import struct
+from collections.abc import Iterable, Iterator
 
 from .os_manager import OSManager
+from .serializer import Serializer
 
 
 class InitializeOPTS:
@@ -19,21 +24,318 @@ class Initialize:
         OSManager.initialize_directory(InitializeOPTS.dirs)
 
 
+class PlaylistCacheView:
+    """
+    Read-only (title, url) pairs of a binary playlist cache, read through mmap.
+
+    Titles and urls are decoded only when an item is accessed, `titles` decodes
+    the title column alone, so searching never builds the urls it does not return.
+    """
+
+    def __init__(self, filename: str):
+        self.index: PlaylistSearchIndex | None = None
+        with open(filename, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, self._count = FileHandler.HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            magic, version = b"", 0
+        if magic != FileHandler.MAGIC or version != FileHandler.VERSION:
+            self.close()
+            raise ValueError(f"Not a playlist cache: {filename}")
+
+        # Offset tables of the title and url columns, `count + 1` entries each
+        self._title_offsets = FileHandler.HEADER.size
+        self._url_offsets = self._title_offsets + 4 * (self._count + 1)
+        self._titles_start = self._url_offsets + 4 * (self._count + 1)
+        self.titles_size = self._offset(self._title_offsets, self._count)
+        self._urls_start = self._titles_start + self.titles_size
+
+    def _offset(self, table: int, index: int) -> int:
+        return FileHandler.OFFSET.unpack_from(self._mm, table + 4 * index)[0]
+
+    def _column(self, table: int, start: int, index: int) -> str:
+        begin, end = FileHandler.OFFSET_PAIR.unpack_from(self._mm, table + 4 * index)
+        return self._mm[start + begin : start + end].decode("utf-8")
+
+    def title(self, index: int) -> str:
+        return self._column(self._title_offsets, self._titles_start, index)
+
+    def url(self, index: int) -> str:
+        return self._column(self._url_offsets, self._urls_start, index)
+
+    def titles(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self.title(index)
+
+    def candidates(self, words) -> list[int] | None:
+        """Sorted rows whose title has a word containing one of `words`, None when there is no index."""
+        return None if self.index is None else self.index.rows(words)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> tuple[str, str]:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return (self.title(index), self.url(index))
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        for index in range(self._count):
+            yield (self.title(index), self.url(index))
+
+    def close(self) -> None:
+        if self.index is not None:
+            self.index.close()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PostingTable:
+    """
+    Sorted string keys, each with a list of ids, inside a mmap.
+
+    Layout: key count, key offsets, posting offsets (`count + 1` entries each),
+    the UTF-8 keys, then the postings as uint32. Keys are found by binary search.
+    """
+
+    COUNT = struct.Struct("<I")
+
+    def __init__(self, mm: mmap.mmap, start: int):
+        self._mm = mm
+        (self.count,) = self.COUNT.unpack_from(mm, start)
+        self._key_offsets = start + self.COUNT.size
+        self._posting_offsets = self._key_offsets + 4 * (self.count + 1)
+        self._keys_start = self._posting_offsets + 4 * (self.count + 1)
+        self._postings_start = self._keys_start + self._offset(self._key_offsets, self.count)
+        self.end = self._postings_start + 4 * self._offset(self._posting_offsets, self.count)
+
+    @staticmethod
+    def pack(entries: list[tuple[str, list[int]]]) -> bytes:
+        """Bytes of a table of `entries`, which must be sorted by key."""
+        keys = [key.encode("utf-8") for key, _ in entries]
+        postings = [ids for _, ids in entries]
+        count = len(entries)
+        return b"".join(
+            [
+                PostingTable.COUNT.pack(count),
+                struct.pack(f"<{count + 1}I", 0, *itertools.accumulate(map(len, keys))),
+                struct.pack(f"<{count + 1}I", 0, *itertools.accumulate(map(len, postings))),
+                *keys,
+                struct.pack(f"<{sum(map(len, postings))}I", *itertools.chain.from_iterable(postings)),
+            ]
+        )
+
+    def _offset(self, table: int, index: int) -> int:
+        return FileHandler.OFFSET.unpack_from(self._mm, table + 4 * index)[0]
+
+    def key(self, index: int) -> bytes:
+        begin, end = FileHandler.OFFSET_PAIR.unpack_from(self._mm, self._key_offsets + 4 * index)
+        return self._mm[self._keys_start + begin : self._keys_start + end]
+
+    def find(self, key: bytes) -> int:
+        """Index of `key`, -1 if it is not in the table."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.count and self.key(low) == key else -1
+
+    def postings(self, index: int) -> tuple[int, ...]:
+        begin, end = FileHandler.OFFSET_PAIR.unpack_from(self._mm, self._posting_offsets + 4 * index)
+        return struct.unpack_from(f"<{end - begin}I", self._mm, self._postings_start + 4 * begin)
+
+
+class PlaylistSearchIndex:
+    """
+    Inverted index of the playlist cache titles, stored next to the cache.
+
+    `tokens` maps every title word to the rows it appears in, `grams` maps every
+    substring of up to 3 characters of those words to the words containing it.
+    A query word of up to 3 characters is a gram itself, a longer one is matched
+    against the words sharing all its 3-character grams, so `Query.search` scores
+    only rows with a word containing a query word, the rows it would score above 0.
+    Words are case-folded, which keeps a case-sensitive match a match in the index.
+    """
+
+    MAGIC = b"AYTI"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHII")  # magic, version, rows, title column size
+    GRAM = 3
+
+    def __init__(self, filename: str):
+        with open(filename, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, self.count, self.titles_size = self.HEADER.unpack_from(self._mm, 0)
+            self.tokens = PostingTable(self._mm, self.HEADER.size)
+            self.grams = PostingTable(self._mm, self.tokens.end)
+        except struct.error:
+            magic, version = b"", 0
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError(f"Not a playlist search index: {filename}")
+
+    @staticmethod
+    def grams_of(word: str, sizes: Iterable[int] = range(1, GRAM + 1)) -> set[str]:
+        return {word[i : i + size] for size in sizes for i in range(len(word) - size + 1)}
+
+    @staticmethod
+    def pack(titles, titles_size: int) -> bytes:
+        tokens: dict[str, list[int]] = {}
+        count = 0
+        for row, title in enumerate(titles):
+            for token in {word.casefold() for word in title.split()}:
+                tokens.setdefault(token, []).append(row)
+            count = row + 1
+
+        vocabulary = sorted(tokens)
+        grams: dict[str, list[int]] = {}
+        for token_id, token in enumerate(vocabulary):
+            for gram in PlaylistSearchIndex.grams_of(token):
+                grams.setdefault(gram, []).append(token_id)
+
+        return b"".join(
+            [
+                PlaylistSearchIndex.HEADER.pack(
+                    PlaylistSearchIndex.MAGIC, PlaylistSearchIndex.VERSION, count, titles_size
+                ),
+                PostingTable.pack([(token, tokens[token]) for token in vocabulary]),
+                PostingTable.pack(sorted(grams.items())),
+            ]
+        )
+
+    def matches(self, view: PlaylistCacheView) -> bool:
+        """Whether this index was built from the cache `view` reads."""
+        return self.count == len(view) and self.titles_size == view.titles_size
+
+    def _tokens_containing(self, word: str) -> list[int]:
+        if len(word) <= self.GRAM:
+            index = self.grams.find(word.encode("utf-8"))
+            return list(self.grams.postings(index)) if index != -1 else []
+
+        found: set[int] = set()
+        for n, gram in enumerate(self.grams_of(word, sizes=(self.GRAM,))):
+            index = self.grams.find(gram.encode("utf-8"))
+            if index == -1:
+                return []
+            found = set(self.grams.postings(index)) if n == 0 else found.intersection(self.grams.postings(index))
+            if not found:
+                return []
+        needle = word.encode("utf-8")
+        return [token_id for token_id in found if needle in self.tokens.key(token_id)]
+
+    def rows(self, words) -> list[int]:
+        """Sorted rows with a title word containing one of `words`."""
+        rows: set[int] = set()
+        for word in words:
+            for token_id in self._tokens_containing(word.casefold()):
+                rows.update(self.tokens.postings(token_id))
+        return sorted(rows)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class FileHandler:
+    """
+    Cache of the channel playlists as (title, url) pairs.
+
+    Stored in a binary columnar file: a header, two offset tables and the packed
+    UTF-8 title and url columns, read back through `PlaylistCacheView`.
+    `PlaylistSearchIndex` of the titles is written next to it, and rebuilt on load
+    when it is missing or does not match the cache.
+    A cache left in the former `playlists.json` is converted on first load.
+    """
+
+    MAGIC = b"AYTP"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHI")  # magic, version, count
+    OFFSET = struct.Struct("<I")
+    OFFSET_PAIR = struct.Struct("<2I")
+
     def __init__(self):
-        self.filename = "./data/playlists.json"
+        self.filename = "./data/playlists.bin"
+        self.json_filename = "./data/playlists.json"
+        self.index_filename = "./data/playlists.idx"
         self.encoding = "utf-8"
 
+    def _dump_index(self, titles, titles_size: int) -> None:
+        temp_path = f"{self.index_filename}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(PlaylistSearchIndex.pack(titles, titles_size))
+        os.replace(temp_path, self.index_filename)
+
     def dump(self, video_list):
-        with open(self.filename, "w", encoding=self.encoding) as f:
-            json.dump(video_list, f, indent=4, ensure_ascii=False)
+        titles = [item[0].encode(self.encoding) for item in video_list]
+        urls = [item[1].encode(self.encoding) for item in video_list]
+        count = len(video_list)
 
-    def load(self):
-        with open(self.filename, encoding=self.encoding) as f:
-            return json.load(f)
+        self._dump_index((item[0] for item in video_list), sum(map(len, titles)))
+
+        temp_path = f"{self.filename}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, count))
+            for column in (titles, urls):
+                f.write(struct.pack(f"<{count + 1}I", 0, *itertools.accumulate(map(len, column))))
+            f.writelines(titles)
+            f.writelines(urls)
+        os.replace(temp_path, self.filename)
+
+    def load(self) -> PlaylistCacheView:
+        if not OSManager.exists(self.filename) and OSManager.exists(self.json_filename):
+            self._migrate_json()
+        try:
+            view = PlaylistCacheView(self.filename)
+        except ValueError:
+            # Unreadable cache, let the caller fetch the playlists again
+            OSManager.delete_file(self.filename)
+            raise FileNotFoundError(self.filename)
+        view.index = self._load_index(view)
+        return view
+
+    def _load_index(self, view: PlaylistCacheView) -> PlaylistSearchIndex:
+        try:
+            index = PlaylistSearchIndex(self.index_filename)
+            if index.matches(view):
+                return index
+            index.close()
+        except (OSError, ValueError):
+            pass
+        self._dump_index(view.titles(), view.titles_size)
+        return PlaylistSearchIndex(self.index_filename)
+
+    def _migrate_json(self):
+        self.dump(Serializer.load_file(self.json_filename))
+        OSManager.delete_file(self.json_filename)
+        print(f"[Cache] Converted {self.json_filename} to {self.filename}")
+
+    def export_json(self, filename: str):
+        with self.load() as playlists:
+            Serializer.dump_file(filename, [list(item) for item in playlists], pretty=True)
 
     def clear_cache(self):
         OSManager.delete_file(self.filename)
+        OSManager.delete_file(self.json_filename)
+        OSManager.delete_file(self.index_filename)
 
 
 class FileSourceHandler:
@@ -1,16 +1,45 @@
 import functools
+import importlib
 import os.path
 import shutil
 import subprocess
 import sys
+from collections.abc import Sequence
+from typing import cast
 
-import ujson as json
+from .common import Video, VideoRecord
+from .file_handler import PlaylistCacheView
+from .serializer import Serializer
 
 
 def get_script_name():
     return os.path.basename(sys.argv[0])
 
 
+class LazyModule:
+    """
+    Stand-in for a heavy module that is imported on first attribute access.
+
+    Keeps commands that never touch the network from paying its import time.
+    With `member`, stands in for that attribute of the module instead, like a class.
+    """
+
+    def __init__(self, name: str, member: str | None = None):
+        self._name = name
+        self._member = member
+
+    def __getattr__(self, attr):
+        target = importlib.import_module(self._name)
+        if self._member is not None:
+            target = getattr(target, self._member)
+        return getattr(target, attr)
+
+    def __repr__(self):
+        if self._member is not None:
+            return f"<LazyModule {self._name!r}.{self._member}>"
+        return f"<LazyModule {self._name!r}>"
+
+
 class IOHelper:
     @staticmethod
     def gracefully_terminate(func):
@@ -76,28 +105,30 @@ class SubprocessHelper:
             return False
 
 
+# Every shape of menu items: legacy (title, url) pairs, video dicts or records, or the playlist cache
+MenuItems = (
+    Sequence[tuple[str, str]]
+    | Sequence[list[str]]
+    | Sequence[dict[str, str]]
+    | Sequence[Video]
+    | Sequence[VideoRecord]
+    | PlaylistCacheView
+)
+
+
 class LegacyCompatibility:
     @staticmethod
-    def normalize_playlist(
-        playlist: list[tuple[str, str]] | list[dict[str, str]] | list[list[str]],
-    ) -> list[dict[str, str]]:
+    def normalize_playlist(playlist: MenuItems) -> list[VideoRecord]:
         if not playlist:
             return []
 
         # Legacy: list[tuple[str, str]]
         if isinstance(playlist[0], (tuple, list)):
-            return [{"video_title": t, "video_url": u, "status": ""} for t, u in playlist]
-
-        # New: list[dict]
-        if isinstance(playlist[0], dict):
-            normalized = []
-            for v in playlist:
-                assert isinstance(v, dict)
-                v_copy = dict(v)
-                if "status" not in v_copy:
-                    v_copy["status"] = ""
-                normalized.append(v_copy)
-            return normalized
+            return [VideoRecord(t, u) for t, u in playlist]
+
+        # New: list[dict], kept as records instead of a dict copy per video
+        if isinstance(playlist[0], (dict, VideoRecord)):
+            return [VideoRecord.from_video(cast(dict, v)) for v in playlist]
 
         raise TypeError("Unsupported playlist format")
 
@@ -105,4 +136,4 @@ class LegacyCompatibility:
 class FormatHelper:
     @staticmethod
     def beautify_json(json_str):
-        return json.dumps(json_str, indent=4, ensure_ascii=False)
+        return Serializer.dumps(json_str, pretty=True)
@@ -1,20 +1,295 @@
+import atexit
+import os
+import threading
 from datetime import datetime
 from typing import Literal, cast
 
-import ujson as json
-
-from .common import Current, HistoryData, Playlist, Video
+from .common import Current, HistoryData, Playlist, Video, VideoRecord
 from .data_processing import DataProcessing
 from .exceptions import InvalidHistoryFile
 from .os_manager import OSManager
+from .serializer import Serializer
+from .url_normalizer import UrlNormalizer
+
+
+class HistorySession:
+    """
+    Parsed history held in memory for a batch of changes, written once on commit.
+
+    Only changes that modify the document mark it dirty, so a commit without
+    any real change does not touch the file. A commit made only of status
+    changes is appended to the handler's journal instead of rewriting the history.
+    With `flush_delay`, pending changes are also written after that many
+    seconds without a new change.
+    Used as a context manager, it commits on success and drops the changes on error.
+    """
+
+    def __init__(self, handler: "HistoryHandler", flush_delay: float | None = None):
+        self.handler = handler
+        self.flush_delay = flush_delay
+        self.dirty = False
+
+        self._content: HistoryData | None = None
+        self._lock = threading.RLock()
+        self._timer: threading.Timer | None = None
+        # Whether the commit must rewrite the history, else only `_events` are journaled
+        self._rewrite = False
+        self._events: list[dict] = []
+        # url -> position indexes of the loaded document, built on first lookup and kept up to date by `update`
+        self._playlist_index: dict[str, int] | None = None
+        self._video_index: dict[str, dict[int, int]] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+
+    @property
+    def history(self) -> HistoryData:
+        """The whole history, every playlist with its videos."""
+        with self._lock:
+            if self._content is None:
+                if self.handler.is_history():
+                    self._content = self.handler.load()
+                else:
+                    self._content = {"current": {}, "playlists": []}
+            return self._content
+
+    def _document(self) -> HistoryData:
+        """
+        The history as far as the session needs it. Backends that load playlists
+        on demand return only what is loaded, `get_playlist` and `search` load the rest.
+        """
+        return self.history
+
+    @property
+    def current(self) -> Current:
+        return self._document().get("current", cast(Current, {}))
+
+    def _changed(self, playlist_url: str | None = None) -> None:
+        """Record a change, to the videos of `playlist_url` if given, else to the rest of the history."""
+        self.dirty = True
+        if self.flush_delay is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.flush_delay, self.commit)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _structure_changed(self, playlist_url: str | None = None) -> None:
+        self._rewrite = True
+        self._changed(playlist_url)
+
+    # Indexes
+
+    def _indexes(self) -> dict[str, int]:
+        if self._playlist_index is None:
+            self._playlist_index = {}
+            self._video_index = {}
+            for p_idx, playlist in enumerate(self._document()["playlists"]):
+                self._playlist_index.setdefault(UrlNormalizer.playlist_key(playlist["playlist_url"]), p_idx)
+                self._index_videos(p_idx, playlist.get("videos", []))
+        return self._playlist_index
+
+    def _index_videos(self, p_idx: int, videos: list[Video]) -> None:
+        for v_idx, video in enumerate(videos):
+            self._video_index.setdefault(UrlNormalizer.key(video["video_url"]), {}).setdefault(p_idx, v_idx)
+
+    def _unindex_videos(self, p_idx: int, video_urls: list[str]) -> None:
+        for url in video_urls:
+            key = UrlNormalizer.key(url)
+            positions = self._video_index.get(key)
+            if positions is not None:
+                positions.pop(p_idx, None)
+                if not positions:
+                    del self._video_index[key]
+
+    def playlist_index(self, playlist_url: str) -> int:
+        """Position of the playlist with `playlist_url` in the history, -1 if it is not there."""
+        with self._lock:
+            return self._indexes().get(UrlNormalizer.playlist_key(playlist_url), -1)
+
+    def video_position(self, video_url: str) -> tuple[int, int]:
+        """(playlist_index, video_index) of the first video with `video_url`, (-1, -1) if it is not there."""
+        with self._lock:
+            self._indexes()
+            positions = self._video_index.get(UrlNormalizer.key(video_url))
+            if not positions:
+                return (-1, -1)
+            p_idx = min(positions)
+            return (p_idx, positions[p_idx])
+
+    @staticmethod
+    def _videos_key(videos: list[Video]) -> list[tuple]:
+        return [(v["video_url"], v.get("video_title"), v.get("thumbnail_url")) for v in videos]
+
+    def update(
+        self,
+        curr: Current | dict | None = None,
+        playlists: list[Playlist] | None = None,
+        videos: list[Video] | None = None,
+        viewed: bool = False,
+        truncate: bool = True,
+    ) -> None:
+        """Apply the changes described in `HistoryHandler.update` to the in-memory history."""
+        with self._lock:
+            content = self._document()
+            now = datetime.now().astimezone().isoformat()  # system timezone timestamp
+            if videos:
+                videos = HistoryHandler.to_records(videos)
+
+            # Replace playlists if provided
+            if playlists is not None:
+                content["playlists"] = playlists
+                self._playlist_index = None
+                self._structure_changed()
+                for playlist in playlists:
+                    self._structure_changed(playlist["playlist_url"])
+
+            if not curr:
+                return
+
+            # Update current playlist info
+            if content.get("current") != curr:
+                content["current"] = cast(Current, curr)
+                self._structure_changed()
+
+            playlist_url = curr.get("playlist_url")
+            if not playlist_url:
+                return
+
+            # Find the current playlist in history
+            playlist = self.get_playlist(playlist_url)
+
+            if playlist is None:
+                # Playlist does not exist → create new entry
+                new_playlist: Playlist = {
+                    "playlist_title": curr.get("playlist_title", ""),
+                    "playlist_url": playlist_url,
+                    "videos": videos if videos else [],
+                }
+                if videos:
+                    new_playlist["last_updated"] = now
+                if viewed:
+                    new_playlist["last_viewed"] = now
+                content["playlists"].append(new_playlist)
+                if self._playlist_index is not None:
+                    p_idx = len(content["playlists"]) - 1
+                    self._playlist_index.setdefault(UrlNormalizer.playlist_key(playlist_url), p_idx)
+                    self._index_videos(p_idx, new_playlist["videos"])
+                self._structure_changed()
+                self._structure_changed(playlist_url)
+                return
+
+            # Playlist exists → merge videos if provided
+            if videos:
+                old_videos = playlist.get("videos", [])
+                before = self._videos_key(old_videos)
+                merged = DataProcessing.merge_list(old_videos, videos, truncate=truncate)
+                if self._videos_key(merged) != before:
+                    playlist["videos"] = merged
+                    if self._playlist_index is not None:
+                        p_idx = self.playlist_index(playlist_url)
+                        self._unindex_videos(p_idx, [key[0] for key in before])
+                        self._index_videos(p_idx, merged)
+                    playlist["last_updated"] = now  # only when the merge changed something
+                    self._structure_changed()
+                    self._structure_changed(playlist["playlist_url"])
+
+            # Update last_viewed if user is currently watching
+            if viewed:
+                playlist["last_viewed"] = now
+                self._structure_changed()
+
+    def set_video_status(self, url: str, status: str) -> bool:
+        """Same as `HistoryHandler.set_video_status`, on the in-memory history."""
+        with self._lock:
+            p_idx, v_idx = self.search(url)
+            if p_idx == -1 or v_idx == -1:
+                return False
+
+            playlist = self._document()["playlists"][p_idx]
+            video = playlist["videos"][v_idx]
+            if status != "viewed" and video.get("status") == status and "last_viewed" not in video:
+                return True
+
+            event = {
+                "playlist_url": playlist["playlist_url"],
+                "video_url": video["video_url"],
+                "status": status,
+                "timestamp": datetime.now().astimezone().isoformat(),
+            }
+            HistoryHandler.apply_events([video], [event])
+            self._events.append(event)
+            self._changed(playlist["playlist_url"])
+            return True
+
+    def get_playlist(self, playlist_url: str) -> Playlist | None:
+        with self._lock:
+            p_idx = self.playlist_index(playlist_url)
+            return self._document()["playlists"][p_idx] if p_idx != -1 else None
+
+    def search(self, curr_url: str) -> tuple[int, int]:
+        return self.video_position(curr_url)
+
+    def _flush(self) -> None:
+        """Write the whole in-memory history."""
+        self.handler._write(cast(HistoryData, self._content))
+
+    def _reset_changes(self) -> None:
+        self.dirty = False
+        self._rewrite = False
+        self._events = []
+
+    def commit(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self.dirty and self._content is not None:
+                if self._rewrite or not self.handler.journal_enabled:
+                    self._flush()
+                else:
+                    self.handler.append_journal(self._events)
+            self._reset_changes()
+
+    def rollback(self) -> None:
+        """Drop the pending changes, the next access reads the history again."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._content = None
+            self._playlist_index = None
+            self._reset_changes()
+
+    def close(self) -> None:
+        """Release what the backend holds for the session, pending changes must be committed first."""
 
 
 class HistoryHandler:
+    # Status changes are appended to a journal next to the history instead of
+    # rewriting it. Reads replay the journal, it is folded back into the history
+    # when it grows past `journal_max_bytes` and on exit.
+    journal_enabled = True
+    journal_max_bytes = 64 * 1024
+    _journal_lock = threading.RLock()
+
     def __init__(self):
         self.filename = "./data/history.json"
         self.encoding = "utf-8"
         self.required_keys = {"current", "playlists"}
 
+        self._journal_cache: tuple[tuple[int, int], dict[str, list[dict]]] | None = None
+        self._compactor: threading.Thread | None = None
+        self._exit_compaction = False
+
     @staticmethod
     def safe_history_load(func):
         def helper(self, *args, **kwargs):
@@ -26,7 +301,7 @@ class HistoryHandler:
                 if not all(key in result for key in self.required_keys):
                     raise InvalidHistoryFile(self.filename)
                 return result
-            except (FileNotFoundError, json.JSONDecodeError, OSError):
+            except (FileNotFoundError, Serializer.DecodeError, OSError):
                 raise InvalidHistoryFile(self.filename)
 
         return helper
@@ -35,9 +310,108 @@ class HistoryHandler:
         return OSManager.exists(self.filename)
 
     @safe_history_load
+    def _load_snapshot(self) -> HistoryData:
+        return Serializer.load_file(self.filename)
+
+    @staticmethod
+    def to_records(videos: list) -> list[Video]:
+        """Return `videos` as `VideoRecord`s, the form loaded history is held in."""
+        return cast(list[Video], [VideoRecord.from_video(video) for video in videos])
+
     def load(self) -> HistoryData:
-        with open(self.filename, encoding=self.encoding) as f:
-            return json.load(f)
+        with self._journal_lock:
+            content = self._load_snapshot()
+            events = self._read_journal()
+            for playlist in content["playlists"]:
+                playlist["videos"] = self.to_records(playlist.get("videos", []))
+                if playlist.get("playlist_url") in events:
+                    self.apply_events(playlist.get("videos", []), events[playlist["playlist_url"]])
+            return content
+
+    def _write(self, content: HistoryData) -> None:
+        with self._journal_lock:
+            Serializer.dump_file(self.filename, content)
+            # `content` was loaded with the journal replayed, it is part of the history now
+            self._clear_journal()
+
+    # Journal
+
+    @property
+    def journal_filename(self) -> str:
+        return f"{os.path.splitext(self.filename)[0]}.journal"
+
+    def _read_journal(self) -> dict[str, list[dict]]:
+        """Return the journaled status events grouped by playlist url, oldest first."""
+        try:
+            stat = os.stat(self.journal_filename)
+        except OSError:
+            return {}
+
+        key = (stat.st_size, stat.st_mtime_ns)
+        if self._journal_cache is not None and self._journal_cache[0] == key:
+            return self._journal_cache[1]
+
+        events: dict[str, list[dict]] = {}
+        with open(self.journal_filename, encoding=self.encoding) as f:
+            for line in f:
+                try:
+                    event = Serializer.loads(line)
+                except ValueError:
+                    # Last line cut short by a crash
+                    continue
+                events.setdefault(event.get("playlist_url"), []).append(event)
+
+        self._journal_cache = (key, events)
+        return events
+
+    @staticmethod
+    def apply_events(videos: list[Video], events: list[dict]) -> None:
+        """Apply status events to `videos`, each to the first video with its url."""
+        by_key: dict[str, Video] = {}
+        for video in videos:
+            by_key.setdefault(UrlNormalizer.key(video["video_url"]), video)
+
+        for event in events:
+            video = by_key.get(UrlNormalizer.key(event.get("video_url", "")))
+            if video is None:
+                continue
+            video["status"] = event.get("status", "")
+            if video["status"] == "viewed":
+                video["last_viewed"] = event["timestamp"]
+            else:
+                video.pop("last_viewed", None)
+
+    def append_journal(self, events: list[dict]) -> None:
+        with self._journal_lock:
+            with open(self.journal_filename, "a", encoding=self.encoding) as f:
+                f.writelines(f"{Serializer.dumps(event)}\n" for event in events)
+            size = os.path.getsize(self.journal_filename)
+
+        if not self._exit_compaction:
+            atexit.register(self.compact)
+            self._exit_compaction = True
+
+        if size > self.journal_max_bytes and (self._compactor is None or not self._compactor.is_alive()):
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def _clear_journal(self) -> None:
+        OSManager.delete_file(self.journal_filename)
+        self._journal_cache = None
+
+    def compact(self) -> None:
+        """Fold the journal into the history file."""
+        with self._journal_lock:
+            if OSManager.exists(self.journal_filename):
+                self._write(self.load())
+
+    def session(self, flush_delay: float | None = None) -> HistorySession:
+        """Return a session batching several changes into a single write."""
+        return HistorySession(self, flush_delay=flush_delay)
+
+    def export_json(self, filename: str) -> None:
+        """Write the history to `filename` in the JSON format, whatever the storage backend."""
+        Serializer.dump_file(filename, self.load(), pretty=True)
 
     def update(
         self,
@@ -61,72 +435,52 @@ class HistoryHandler:
         1. If 'playlists' is provided, replaces the existing playlists.
         2. If 'curr' is provided:
            - Finds or creates the playlist corresponding to curr['playlist_url'].
-           - If 'videos' is provided, merges them into the playlist and updates last_updated.
+           - If 'videos' is provided, merges them into the playlist and updates last_updated if the merge changed it.
            - If 'viewed' is True, updates last_viewed.
-        3. Saves the updated history file to disk.
+        3. Saves the updated history file to disk, only if something changed.
         """
 
-        # Load or initialize history
-        if self.is_history():
-            content: HistoryData = self.load()
-        else:
-            content: HistoryData = {"current": {}, "playlists": []}
-
-        now = datetime.now().astimezone().isoformat()  # system timezone timestamp
-
-        # Replace playlists if provided
-        if playlists is not None:
-            content["playlists"] = playlists
-
-        # Update current playlist info
-        if curr:
-            content["current"] = cast(Current, curr)
-            playlist_url = curr.get("playlist_url")
-            if playlist_url:
-                # Find the current playlist in history
-                playlist = next(
-                    (p for p in content["playlists"] if p.get("playlist_url") == playlist_url),
-                    None,
-                )
-
-                if playlist is None:
-                    # Playlist does not exist → create new entry
-                    new_playlist: Playlist = {
-                        "playlist_title": curr.get("playlist_title", ""),
-                        "playlist_url": playlist_url,
-                        "videos": videos if videos else [],
-                    }
-                    if videos:
-                        new_playlist["last_updated"] = now
-                    if viewed:
-                        new_playlist["last_viewed"] = now
-                    content["playlists"].append(new_playlist)
-                else:
-                    # Playlist exists → merge videos if provided
-                    if videos:
-                        old_videos = playlist.get("videos", [])
-                        playlist["videos"] = DataProcessing.merge_list(old_videos, videos, truncate=truncate)
-                        playlist["last_updated"] = now  # always update when videos are merged
+        with self.session() as session:
+            session.update(curr=curr, playlists=playlists, videos=videos, viewed=viewed, truncate=truncate)
 
-                    # Update last_viewed if user is currently watching
-                    if viewed:
-                        playlist["last_viewed"] = now
+    def get_playlist(self, playlist_url: str, history: HistoryData) -> Playlist | None:
+        key = UrlNormalizer.playlist_key(playlist_url)
+        return next(
+            (p for p in history.get("playlists", []) if UrlNormalizer.playlist_key(p.get("playlist_url", "")) == key),
+            None,
+        )
 
-        with open(self.filename, "w", encoding=self.encoding) as f:
-            json.dump(content, f, indent=4, ensure_ascii=False)
+    def set_video_status(self, url: str, status: str) -> bool:
+        """
+        Set the status of the first video matching `url`.
+        'viewed' also stamps last_viewed, any other status removes it.
+        Returns False if the video is not in history.
+        """
+        with self.session() as session:
+            return session.set_video_status(url, status)
 
     def search(self, curr_url: str, history: HistoryData) -> tuple[int, int]:  # -> (playlist_index, video_index)
         if not isinstance(history, dict) or "playlists" not in history:
             raise InvalidHistoryFile(self.filename)
 
+        key = UrlNormalizer.key(curr_url)
         for p_idx, playlist in enumerate(history["playlists"]):
             for v_idx, video in enumerate(playlist.get("videos", [])):
-                if video.get("video_url") == curr_url:
+                if UrlNormalizer.key(video.get("video_url", "")) == key:
                     return (p_idx, v_idx)
         return (-1, -1)
 
     def delete_history(self):
         OSManager.delete_file(self.filename)
+        self._clear_journal()
+
+    @staticmethod
+    def last_viewed_key(playlist) -> datetime:
+        ts = playlist.get("last_viewed") or ""
+        try:
+            return datetime.fromisoformat(ts)
+        except Exception:
+            return datetime.min
 
     def clear_history(
         self,
@@ -152,14 +506,7 @@ class HistoryHandler:
         playlists = content.get("playlists", [])
 
         # Sort playlists by last_viewed descending (most recent first)
-        def ts_key(p):
-            ts = p.get("last_viewed") or ""
-            try:
-                return datetime.fromisoformat(ts)
-            except Exception:
-                return datetime.min
-
-        sorted_playlists = sorted(playlists, key=ts_key, reverse=True)
+        sorted_playlists = sorted(playlists, key=self.last_viewed_key, reverse=True)
 
         # Keep most recent playlists
         keep = sorted_playlists[:keep_recent]
@@ -184,7 +531,6 @@ class HistoryHandler:
             content["playlists"] = keep + old
 
         # Persist
-        with open(self.filename, "w", encoding=self.encoding) as f:
-            json.dump(content, f, indent=4, ensure_ascii=False)
+        self._write(content)
 
         print(f"History cleared. Mode: {mode}\nKept {keep_recent} most recent playlists.")
@@ -1,11 +1,13 @@
 from sys import platform, stdout
 
 from .command_history import CommandHistory
+from .helper import LazyModule
 
+# Imported on the first key read, commands that never prompt skip the terminal setup modules
 if platform.startswith(("linux", "darwin", "freebsd", "openbsd", "android")):
-    from .readchar_posix import ReadChar as readchar
+    readchar = LazyModule(f"{__package__}.readchar_posix", "ReadChar")
 elif platform in ("win32", "cygwin"):
-    from .readchar_win import ReadChar as readchar
+    readchar = LazyModule(f"{__package__}.readchar_win", "ReadChar")
 else:
     raise NotImplementedError(f"The platform {platform} is not supported yet")
 
@@ -20,6 +22,7 @@ class InputMap:
     del_key = ("\x1b[3~",)
     page_up = ("\x1b[5~", "\xe0I", "\x00I")
     page_down = ("\x1b[6~", "\xe0Q", "\x00Q")
+    slash = ("/",)
 
 
 class ReturnCodeMeta(type):
@@ -33,6 +36,8 @@ class ReturnCodeMeta(type):
         "DEL_KEY",
         "HISTORY_PREV",
         "HISTORY_NEXT",
+        "FILTER",
+        "REDRAW",
     }
 
     def __getattr__(cls, name):
@@ -103,6 +108,12 @@ class OnPressed:
         _ = char
         return ReturnCode.HISTORY_NEXT
 
+    def slash(self, char):
+        # Only a leading slash starts the filter, elsewhere it is typed as is
+        if self.input_obj.state.buffer:
+            return self.default(char)
+        return ReturnCode.FILTER
+
 
 class InputState:
     def __init__(self):
@@ -129,6 +140,9 @@ class InputState:
 
 
 class InputHandler:
+    # Seconds between two `idle` checks while waiting for the first key
+    idle_interval = 0.25
+
     def __init__(self, command_history_manager: CommandHistory | None = None):
         self.state = InputState()
 
@@ -149,6 +163,7 @@ class InputHandler:
             "del_key",
             "page_up",
             "page_down",
+            "slash",
         )
 
         for name in keymap:
@@ -181,7 +196,12 @@ class InputHandler:
         self.state.set_str(new_text)
         print(new_text, end="", flush=True)
 
-    def get_input(self, prompt=None, *, flush_before_read=True, verbose=False):
+    def get_input(self, prompt=None, *, flush_before_read=True, verbose=False, idle=None):
+        """
+        Read a line of input, special keys return their `ReturnCode`.
+        While nothing is typed, `idle` is called every `idle_interval` seconds,
+        and `ReturnCode.REDRAW` is returned once it returns True.
+        """
         self.state.clear()
 
         stdout.flush()
@@ -193,6 +213,12 @@ class InputHandler:
             if flush_before_read:
                 readchar.flush_input()
 
+            # Only while the line is empty, a redraw would clear what is typed
+            if idle is not None and not self.state.buffer:
+                while not readchar.key_ready(self.idle_interval):
+                    if idle():
+                        return ReturnCode.REDRAW
+
             char = readchar.readkey()
 
             if verbose:
@@ -229,6 +255,12 @@ class InputHandler:
 
         return user_input
 
+    @staticmethod
+    def read_key() -> str:
+        """Wait for one keypress and return it, escape sequences of special keys are returned whole."""
+        stdout.flush()
+        return readchar.readkey()
+
     @staticmethod
     def press_any_key(prompt=None):
         if prompt is None:
@@ -2,30 +2,58 @@
 # To use, import as a module and implement the interface or use the available *_interface
 
 import builtins
+from typing import cast
 
 from .bookmarking_handler import BookmarkingHandler
-from .common import BookmarkData, Current, HistoryData, Video
+from .cache_handler import ExtractionCache
+from .common import BookmarkData, Current, Playlist, Video
 from .data_processing import DataProcessing
 from .display import BACK_SENTINEL_TITLE, Display_Options, DisplayColor, DisplayMenu
 from .exceptions import MissingChannelUrl, PauseableException
-from .file_handler import FileHandler, FileSourceHandler
+from .file_handler import FileHandler, FileSourceHandler, PlaylistCacheView
 from .helper import IOHelper, get_script_name
 from .history_handler import HistoryHandler
 from .os_manager import OSManager
 from .player import Player
 from .query import Query
-from .yt_dlp_handler import YT_DLP, YT_DLP_Options
+from .sharded_history_handler import ShardedHistoryHandler
+from .sqlite_history_handler import SQLiteHistoryHandler
+from .thumbnail_handler import ThumbnailHandler
+from .yt_dlp_handler import YT_DLP, YT_DLP_Fetcher, YT_DLP_FetchOptions, YT_DLP_Options, YT_DLP_Prefetcher
+
+HISTORY_BACKENDS: dict[str, type[HistoryHandler]] = {
+    "json": HistoryHandler,
+    "sqlite": SQLiteHistoryHandler,
+    "sharded": ShardedHistoryHandler,
+}
 
 
 class Main:
-    def __init__(self, channel_url: str, opts: str = "auto"):
+    def __init__(
+        self,
+        channel_url: str,
+        opts: str = "auto",
+        fetch_opts: YT_DLP_FetchOptions | None = None,
+        extraction_cache: ExtractionCache | None = None,
+        incremental: bool = False,
+        thumbnail_handler: ThumbnailHandler | None = None,
+        prefetch_thumbnails: bool = False,
+        prefetch_next: bool = False,
+        history_backend: str = "json",
+    ):
         self.channel_url = channel_url
         self.opts = opts.lower()
+        self.incremental = incremental
         self.ydl_options = YT_DLP_Options()
-        self.dlp = YT_DLP(channel_url, self.ydl_options)
+        self.fetch_opts = fetch_opts if fetch_opts is not None else YT_DLP_FetchOptions()
+        self.extraction_cache = extraction_cache if extraction_cache is not None else ExtractionCache()
+        self.dlp = YT_DLP(channel_url, self.ydl_options, cache=self.extraction_cache, fetch_options=self.fetch_opts)
         self.file_handler = FileHandler()
-        self.history_handler = HistoryHandler()
+        self.history_handler = HISTORY_BACKENDS[history_backend]()
         self.bookmarking_handler = BookmarkingHandler()
+        self.thumbnail_handler = (
+            thumbnail_handler if thumbnail_handler is not None else ThumbnailHandler(self.ydl_options)
+        )
         self.dp = DataProcessing
         self.display_opts = Display_Options()
         self.display_menu = DisplayMenu(
@@ -35,10 +63,17 @@ class Main:
                 "mode": self.opts,
                 "bookmark": self.bookmarking_handler,
                 "history": self.history_handler,
+                "thumbnail": self.thumbnail_handler,
+                "prefetch_thumbnails": prefetch_thumbnails,
             },
         )
         self.url = ""
 
+        # The prefetched info is a local file, it is useless to android apps and over ssh
+        self.prefetcher = (
+            YT_DLP_Prefetcher(self.ydl_options) if prefetch_next and self.opts not in ("android", "ssh") else None
+        )
+
     @IOHelper.gracefully_terminate
     def source_add(self, *urls: str) -> None:
         added = FileSourceHandler().add_sources(*urls)
@@ -112,46 +147,60 @@ class Main:
             return
 
         print("Update history playlist...")
-        history = self.history_handler.load()
-
-        # Only update the current list being viewed.
-        # For other lists in the history, the function will be
-        # automatically called when switching viewing history.
-        curr = history.get("current", {})
-        curr_playlist_url = curr.get("playlist_url")
-        if not curr_playlist_url:
-            print("No current playlist set in history. Skipping history update.")
-            return
+        with self.history_handler.session() as session:
+            # Only update the current list being viewed.
+            # For other lists in the history, the function will be
+            # automatically called when switching viewing history.
+            curr = session.current
+            curr_playlist_url = curr.get("playlist_url")
+            if not curr_playlist_url:
+                print("No current playlist set in history. Skipping history update.")
+                return
 
-        new_playlist_data = self.dlp.get_video(curr_playlist_url)
-        if new_playlist_data is None:
-            return
-        print("Saving...")
-        new_videos = self.dp.omit(new_playlist_data)  # List[Video]
+            playlist = session.get_playlist(curr_playlist_url)
+            fetched = self._fetch_current_videos(curr_playlist_url, playlist, refresh=True)
+            if fetched is None:
+                return
+            print("Saving...")
+            new_videos, truncate = fetched  # List[Video]
 
-        self.history_handler.update(curr=curr, videos=new_videos)
+            session.update(curr=curr, videos=new_videos, truncate=truncate)
 
         print("Done!")
         return
 
+    def _fetch_current_videos(
+        self, playlist_url: str, playlist: Playlist | None, refresh: bool = False
+    ) -> tuple[builtins.list[Video], bool] | None:
+        # -> (videos, truncate), `playlist` is the history entry of `playlist_url` if any
+        # In stored order, so the incremental fetch can tell which end of the playlist is the oldest
+        known_urls = [v["video_url"] for v in playlist.get("videos", [])] if playlist else []
+
+        if self.incremental and known_urls:
+            videos = self.dlp.get_video_incremental(playlist_url, known_urls)
+            # Only the newest part of the playlist is fetched, so videos missing from it must be kept
+            return (videos, False) if videos is not None else None
+
+        video_data = self.dlp.get_video(playlist_url, refresh=refresh)
+        if video_data is None:
+            return None
+        return self.dp.omit(video_data), True
+
     def _update_multiple(self, channel_urls: builtins.list[str], no_update_history: bool = False) -> None:
         print("Getting playlist from multiple channels...")
         merged_playlist_lists: list[tuple[str, str]] = []  # list of [title, url] for file_handler cache
 
-        for ch_url in channel_urls:
-            try:
-                dlp = YT_DLP(ch_url, self.ydl_options)
-                playlist_data = dlp.get_playlist()
-                if playlist_data is None:
-                    continue
-                playlist_videos = self.dp.omit(playlist_data)  # List[Video]
-
-                # For cache, operate on list-of-lists: map playlist_videos -> [[title,url],...]
-                playlist_list = [[v["video_title"], v["video_url"]] for v in playlist_videos]
-                merged_playlist_lists = self.dp.merge_list_preserve_order(merged_playlist_lists, playlist_list)
-            except MissingChannelUrl:
-                print(f"Channel not found: {ch_url}")
+        fetcher = YT_DLP_Fetcher(self.ydl_options, self.fetch_opts)
+
+        # Results come back in source order, so the merge is the same as a serial run
+        for playlist_data in fetcher.fetch_playlists(channel_urls):
+            if playlist_data is None:
                 continue
+            playlist_videos = self.dp.omit(playlist_data)  # List[Video]
+
+            # For cache, operate on list-of-lists: map playlist_videos -> [[title,url],...]
+            playlist_list = [[v["video_title"], v["video_url"]] for v in playlist_videos]
+            merged_playlist_lists = self.dp.merge_list_preserve_order(merged_playlist_lists, playlist_list)
 
         print("Saving merged playlist...")
         self.file_handler.dump(merged_playlist_lists)
@@ -162,24 +211,29 @@ class Main:
 
         # Update history playlist similarly to update()
         print("Update history playlist...")
-        history = self.history_handler.load()
-        curr = history.get("current", {})
-        curr_playlist_url = curr.get("playlist_url")
-        if not curr_playlist_url:
-            print("No current playlist set in history. Skipping history update.")
-            return
+        with self.history_handler.session() as session:
+            curr = session.current
+            curr_playlist_url = curr.get("playlist_url")
+            if not curr_playlist_url:
+                print("No current playlist set in history. Skipping history update.")
+                return
 
-        # get fresh videos for current history playlist
-        new_playlist_data = YT_DLP.standalone_get_video(curr_playlist_url, self.ydl_options.ydl_opts)
-        print("Saving...")
-        new_videos = self.dp.omit(new_playlist_data)
+            # get fresh videos for current history playlist
+            new_playlist_data = YT_DLP.standalone_get_video(curr_playlist_url, self.ydl_options.ydl_opts)
+            print("Saving...")
+            new_videos = self.dp.omit(new_playlist_data)
 
-        self.history_handler.update(curr=curr, videos=new_videos)
+            session.update(curr=curr, videos=new_videos)
         print("Done!")
 
     @IOHelper.gracefully_terminate
     def clear_cache(self):
         self.file_handler.clear_cache()
+        self.extraction_cache.clear()
+        self.thumbnail_handler.clear()
+
+    def print_cache_stats(self):
+        print(self.extraction_cache.stats())
 
     @IOHelper.gracefully_terminate
     def delete_history(self):
@@ -189,6 +243,35 @@ class Main:
     def clear_history(self, *args, **kwargs):
         self.history_handler.clear_history(*args, **kwargs)
 
+    @IOHelper.gracefully_terminate
+    def export_history(self, filename: str):
+        if not self.history_handler.is_history():
+            print("No history file found.")
+            return
+        self.history_handler.export_json(filename)
+        print(f"History exported to: {filename}")
+
+    @IOHelper.gracefully_terminate
+    def export_cache(self, filename: str):
+        try:
+            self.file_handler.export_json(filename)
+        except FileNotFoundError:
+            print("No cached playlists found.")
+            return
+        print(f"Playlist cache exported to: {filename}")
+
+    @IOHelper.gracefully_terminate
+    def bench_search(self, query: str | None = None, repeat: int = 5):
+        from .benchmark import Benchmark
+
+        try:
+            with self.file_handler.load() as playlist:
+                titles = list(playlist.titles())
+        except FileNotFoundError:
+            print("No cached playlists found.")
+            return
+        Benchmark.report_search_backends(titles, query, repeat)
+
     @IOHelper.gracefully_terminate
     def delete_bookmark(self):
         self.bookmarking_handler.delete_file()
@@ -202,14 +285,21 @@ class Main:
             playlist = self.file_handler.load()
         return playlist
 
-    def _videos_to_pairs(self, videos: builtins.list[Video]) -> builtins.list[builtins.tuple[str, str]]:
-        return [(v.get("video_title", ""), v.get("video_url", "")) for v in videos]
-
     @IOHelper.gracefully_terminate
-    def start_player(self, url: str | None = None) -> None:
+    def start_player(self, url: str | None = None, title: str | None = None) -> None:
         if url:
             self.url = url
-        Player.start_with_mode(url=self.url, opts=self.opts)
+        info_json = self.prefetcher.get(self.url) if self.prefetcher is not None else None
+        Player.start_with_mode(url=self.url, opts=self.opts, info_json=info_json, title=title)
+
+    def _prefetch_next(self) -> None:
+        # Resolve the video the menu will suggest next while the current one plays
+        if self.prefetcher is None or self.url is None:
+            return
+
+        next_video = self.display_menu.predict_next_video(self.url)
+        if next_video is not None:
+            self.prefetcher.prefetch(next_video["video_url"])
 
     def loop_refresh(self):
         self.loop(refresh=True)
@@ -217,58 +307,61 @@ class Main:
     @IOHelper.gracefully_terminate_exit
     def loop(self, refresh: bool = False) -> None:
         while True:
-            history: HistoryData = HistoryHandler().load()
-
-            curr: Current = history.get("current", {})
-
-            curr_playlist_url: str | None = curr.get("playlist_url")
-            if not curr_playlist_url:
-                print("No current playlist configured in history.")
-                return
-
-            p_idx = next(
-                (i for i, p in enumerate(history.get("playlists", [])) if p.get("playlist_url") == curr_playlist_url),
-                None,
-            )
-            if p_idx is None:
-                print("Current playlist not found in history.")
-                return
+            with self.history_handler.session() as session:
+                curr: Current = session.current
 
-            if refresh:
-                try:
-                    video_data = self.dlp.get_video(curr_playlist_url)
-                except MissingChannelUrl:
+                curr_playlist_url: str | None = curr.get("playlist_url")
+                if not curr_playlist_url:
+                    print("No current playlist configured in history.")
                     return
 
-                if video_data is None:
+                playlist = session.get_playlist(curr_playlist_url)
+                if playlist is None:
+                    print("Current playlist not found in history.")
                     return
 
-                videos = self.dp.omit(video_data)
-                videos = self.dp.sort(videos, key=lambda x: x["video_title"])
+                if refresh:
+                    try:
+                        fetched = self._fetch_current_videos(curr_playlist_url, playlist)
+                    except MissingChannelUrl:
+                        return
 
-                if not videos:
-                    PauseableException(
-                        "No videos found in this playlist. yt-dlp may be outdated or the URL may be invalid.",
-                        delay=-1,
-                    )
-                    return
+                    if fetched is None:
+                        return
+
+                    videos, truncate = fetched
+                    videos = self.dp.sort(videos, key=lambda x: x["video_title"])
 
-                self.history_handler.update(curr=curr, videos=videos)
-                history: HistoryData = self.history_handler.load()
+                    if not videos:
+                        PauseableException(
+                            "No videos found in this playlist. yt-dlp may be outdated or the URL may be invalid.",
+                            delay=-1,
+                        )
+                        return
 
-            videos: list[Video] = history["playlists"][p_idx].get("videos", [])
-            menu_items = self._videos_to_pairs(videos)
+                    session.update(curr=curr, videos=videos, truncate=truncate)
+                    playlist = cast(Playlist, session.get_playlist(curr_playlist_url))
 
-            title, self.url = self.display_menu.choose_menu(menu_items)
+            # Videos are passed whole so thumbnail urls stay available to the menu
+            videos: list[Video] = playlist.get("videos", [])
+
+            title, self.url = self.display_menu.choose_menu(videos)
             if title == BACK_SENTINEL_TITLE:
                 return
 
-            self.start_player()
-            self.history_handler.update(curr=curr, viewed=True)
-            self.display_menu.mark_viewed(self.url)
+            self._prefetch_next()
+            self.start_player(title=title)
+
+            # Both changes are written at once
+            with self.history_handler.session() as session:
+                session.update(curr=curr, viewed=True)
+                self.display_menu.mark_viewed(self.url, session=session)
 
     @IOHelper.gracefully_terminate_exit
-    def menu(self, playlist_list: builtins.list[builtins.list[str]] | builtins.list[builtins.tuple[str, str]]):
+    def menu(
+        self,
+        playlist_list: builtins.list[builtins.list[str]] | builtins.list[builtins.tuple[str, str]] | PlaylistCacheView,
+    ):
         if not playlist_list:
             print("No playlist provided.")
             return
@@ -279,26 +372,28 @@ class Main:
                 return
 
             try:
-                video_data = self.dlp.get_video(playlist_url)
+                stream = self.dlp.stream_video(playlist_url)
             except MissingChannelUrl:
                 return
 
-            if video_data is None:
-                continue
-
-            videos: list[Video] = self.dp.omit(video_data)
-            videos = self.dp.sort(videos, key=lambda x: x["video_title"])
-            menu_items = self._videos_to_pairs(videos)
+            # The menu is shown as soon as the first videos arrive, the rest keep loading in the background
+            stream.wait_for(1)
 
-            if not menu_items:
-                PauseableException(
-                    "No videos found in this playlist. yt-dlp may be outdated or the URL may be invalid.",
-                    delay=-1,
-                )
+            if not stream.videos:
+                if stream.error is not None:
+                    PauseableException(
+                        "Failed to fetch playlist videos. yt-dlp may be outdated or the URL may be invalid.",
+                        delay=-1,
+                    )
+                else:
+                    PauseableException(
+                        "No videos found in this playlist. yt-dlp may be outdated or the URL may be invalid.",
+                        delay=-1,
+                    )
                 continue
 
             while True:
-                title, self.url = self.display_menu.choose_menu(menu_items, clear_choosed_item=True)
+                title, self.url = self.display_menu.choose_menu(stream, clear_choosed_item=True)
                 if title == BACK_SENTINEL_TITLE:
                     break
 
@@ -309,10 +404,20 @@ class Main:
                     "playlist_url": playlist_url,
                 }
 
-                self.history_handler.update(curr=curr_obj, videos=videos, viewed=True)
+                # One session, at most two writes: the current video before playback, so it survives
+                # an interrupt, then its viewed status and the fully loaded playlist after it
+                with self.history_handler.session() as session:
+                    # Videos not loaded yet must not be treated as removed from the playlist
+                    session.update(curr=curr_obj, videos=stream.snapshot(), truncate=False)
+                    session.commit()
+
+                    self._prefetch_next()
+                    self.start_player(title=title)
 
-                self.start_player()
-                self.display_menu.mark_viewed(self.url)
+                    stream.join()
+                    videos: list[Video] = stream.snapshot()
+                    session.update(curr=curr_obj, videos=videos, viewed=True, truncate=stream.complete)
+                    self.display_menu.mark_viewed(self.url, session=session)
                 self.loop()
 
     @IOHelper.gracefully_terminate
@@ -331,16 +436,17 @@ class Main:
 
     @IOHelper.gracefully_terminate_exit
     def list(self):
-        playlist_list = self.load_playlist()  # should be list of [title,url]
-        if not playlist_list:
-            print("No cached playlists found.")
-            return
-        self.menu(playlist_list)
+        # The cache is memory-mapped, close it so playlists.bin can be rewritten afterwards
+        with self.load_playlist() as playlist_list:  # (title, url) pairs
+            if not playlist_list:
+                print("No cached playlists found.")
+                return
+            self.menu(playlist_list)
 
     @IOHelper.gracefully_terminate_exit
     def resume(self):
-        history: HistoryData = HistoryHandler().load()
-        curr: Current = history.get("current", {})
+        with self.history_handler.session() as session:
+            curr: Current = session.current
         self.url = curr.get("video_url")
 
         if not self.url:
@@ -363,11 +469,12 @@ class Main:
             OSManager.exit(0)
 
         query = Query(case_sensitive=case_sensitive)
-        playlist = self.load_playlist()
-        if fuzzy:
-            playlist = query.fuzzysearch(playlist, inp, score)
-        else:
-            playlist = query.search(playlist, inp)
+        # Matches are returned as (title, url) pairs, the memory-mapped cache is not needed afterwards
+        with self.load_playlist() as cache:
+            if fuzzy:
+                playlist = query.fuzzysearch(cache, inp, score)
+            else:
+                playlist = query.search(cache, inp)
 
         if not playlist:
             print("No matching playlist found.")
@@ -376,16 +483,18 @@ class Main:
 
     @IOHelper.gracefully_terminate_exit
     def playlist_from_url(self, url: str):
-        video_data = self.dlp.get_video(url)
-        if video_data is None:
-            return
-        videos: list[Video] = self.dp.omit(video_data)
-        videos = self.dp.sort(videos, key=lambda x: x["video_title"])
-        menu_items = self._videos_to_pairs(videos)
-        if not menu_items:
-            print("No videos found in this playlist.")
+        stream = self.dlp.stream_video(url)
+        stream.wait_for(1)
+        if not stream.videos:
+            if stream.error is not None:
+                PauseableException(
+                    "Failed to fetch playlist videos. yt-dlp may be outdated or the URL may be invalid.",
+                    delay=-1,
+                )
+            else:
+                print("No videos found in this playlist.")
             return
-        _, self.url = self.display_menu.choose_menu(menu_items)
+        _, self.url = self.display_menu.choose_menu(stream)
         self.start_player()
 
     @IOHelper.gracefully_terminate_exit
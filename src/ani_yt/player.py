@@ -47,7 +47,7 @@ class TermuxPlayerConfig(PlayerConfig):
 class Player:
     ANDROID_MPV_APPS = ["app.gyrolet.mpvrx", "is.xyz.mpv.ytdl"]
 
-    def __init__(self, url, args=None):
+    def __init__(self, url, args=None, info_json=None, title=None):
         self.url = url
 
         mpv_input_config_path = "./mpv-config/custom.conf"
@@ -67,7 +67,17 @@ class Player:
             mpv_args = []
 
         self.args = mpv_args + initial_args
-        self.command = ["mpv"] + self.args + [self.url]
+
+        # Video extracted in advance, mpv's yt-dlp hook loads it instead of extracting again.
+        # The watch url stays the target, so resume positions and scripts keyed by it keep working.
+        self.target = [self.url]
+        if info_json:
+            self.target = [f"--ytdl-raw-options-append=load-info-json={os.path.abspath(info_json)}"]
+            if title:
+                self.target.append(f"--force-media-title={title}")
+            self.target.append(self.url)
+
+        self.command = ["mpv"] + self.args + self.target
 
         self.android_command = [
             "am",
@@ -129,7 +139,7 @@ class Player:
                 if arg not in mpv_args:
                     mpv_args.append(arg)
 
-        mpv_command = ["mpv"] + mpv_args + [self.url]
+        mpv_command = ["mpv"] + mpv_args + self.target
 
         termux_x11_command = ["am", "start", "-n", "com.termux.x11/.MainActivity"]
         termux_command = [
@@ -154,10 +164,10 @@ class Player:
             self.run_mpv()
 
     @classmethod
-    def start_with_mode(cls, url, opts="auto"):
+    def start_with_mode(cls, url, opts="auto", info_json=None, title=None):
         print("Playing...")
 
-        player = cls(url)
+        player = cls(url, info_json=info_json, title=title)
 
         match opts:
             case "auto":
@@ -1,7 +1,4 @@
-from rapidfuzz import process
-
 from ._internal import _query
-from .data_processing import DataProcessing
 
 
 class Query:
@@ -20,43 +17,54 @@ class Query:
             f" please use {_query.calculate_match_score.__name__} instead."
         )
 
+    @staticmethod
+    def _titles(data):
+        # A playlist cache view decodes its title column alone, urls are read only for matches
+        return data.titles() if hasattr(data, "titles") else (item[0] for item in data)
+
+    @staticmethod
+    def _candidates(data, query):
+        # Rows worth scoring and their titles, with a search index only the rows sharing a word part with the query
+        rows = data.candidates(query) if hasattr(data, "candidates") else None
+        if rows is None:
+            return range(len(data)), list(Query._titles(data))
+        return rows, [data.title(idx) for idx in rows]
+
     def search(self, data, query):
         if not self.case:
             query = query.lower()
         query = set(query.split())
-        result = []
-        for title, url in data:
-            title_to_check = title if self.case else title.lower()
-            score = _query.calculate_match_score(title_to_check, query, min_length=3)
-            if score > 0:
-                result.append((title, url, score))
-        result = DataProcessing.sort(result, key=lambda x: x[2], reverse=True)
-        return [(title, url) for title, url, _ in result]
-
-    def fuzzysearch(self, data, query, score=50):
+        rows, titles = self._candidates(data, query)
+        # One call scores and sorts every title, best first
+        scored = _query.score_titles(titles if self.case else [title.lower() for title in titles], query, min_length=3)
+        return [(titles[idx], data[rows[idx]][1]) for idx, _ in scored]
+
+    def fuzzysearch(self, data, query, score=50, limit=None, workers=-1):
+        """
+        Titles scoring above `score` with WRatio, best first, at most `limit` of them.
+        Matches are taken by index, so duplicate titles each keep their own url.
+        `workers` is passed to rapidfuzz, -1 uses every core when numpy is installed.
+        """
+        import heapq
+
+        from rapidfuzz import fuzz, process
+
         if not self.case:
             query = query.lower()
-        result = process.extract(
-            query,
-            [item[0] if self.case else item[0].lower() for item in data],
-            limit=None,
-        )
+        titles = list(self._titles(data))
+        choices = titles if self.case else [title.lower() for title in titles]
+
+        # Matches below the cutoff are skipped inside rapidfuzz, only an exact tie is dropped here
+        try:
+            row = process.cdist([query], choices, scorer=fuzz.WRatio, score_cutoff=score, workers=workers)[0]
+            matches = ((idx, matched_score) for idx, matched_score in enumerate(row.tolist()) if matched_score > score)
+        except ImportError:
+            # cdist needs numpy, extract scores on one core
+            found = process.extract(query, choices, scorer=fuzz.WRatio, score_cutoff=score, limit=None)
+            matches = ((idx, matched_score) for _, matched_score, idx in found if matched_score > score)
 
-        results_with_data = []
-        for match in result:
-            matched_name = match[0]
-            matched_score = match[1]
-
-            matched_item = next(
-                (
-                    item
-                    for item in data
-                    if (item[0] if self.case else item[0].lower()) == matched_name and matched_score > score
-                ),
-                None,
-            )
-
-            if matched_item:
-                results_with_data.append((matched_item[0], matched_item[1], matched_score))
-        results_with_data = DataProcessing.sort(results_with_data, key=lambda x: x[2], reverse=True)
-        return [(title, url) for title, url, _ in results_with_data]
+        if limit is None:
+            ranked = sorted(matches, key=lambda x: x[1], reverse=True)
+        else:
+            ranked = heapq.nlargest(limit, matches, key=lambda x: x[1])
+        return [(titles[idx], data[idx][1]) for idx, _ in ranked]
@@ -1,6 +1,7 @@
 # Forked from https://github.com/magmax/python-readchar
 
 import os
+import select
 import sys
 import termios
 
@@ -18,7 +19,8 @@ class ReadChar:
         term = termios.tcgetattr(fd)
         try:
             term[3] &= ~(termios.ICANON | termios.ECHO | termios.IGNBRK | termios.BRKINT)
-            termios.tcsetattr(fd, termios.TCSAFLUSH, term)
+            # Keys typed while waiting in `key_ready` must not be discarded, `flush_input` flushes on purpose
+            termios.tcsetattr(fd, termios.TCSADRAIN, term)
 
             ch = sys.stdin.read(1)
         finally:
@@ -53,6 +55,26 @@ class ReadChar:
         c5 = ReadChar.readchar()
         return c1 + c2 + c3 + c4 + c5
 
+    @staticmethod
+    def key_ready(timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a keypress, without reading it."""
+
+        fd = sys.stdin.fileno()
+        if not os.isatty(fd):
+            return True
+
+        old_settings = termios.tcgetattr(fd)
+        term = termios.tcgetattr(fd)
+        try:
+            # A key is only readable before Enter outside of canonical mode
+            term[3] &= ~(termios.ICANON | termios.ECHO)
+            termios.tcsetattr(fd, termios.TCSANOW, term)
+
+            ready, _, _ = select.select([fd], [], [], timeout)
+        finally:
+            termios.tcsetattr(fd, termios.TCSANOW, old_settings)
+        return bool(ready)
+
     @staticmethod
     def flush_input():
         fd = sys.stdin.fileno()
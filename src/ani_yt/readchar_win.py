@@ -1,6 +1,7 @@
 # Forked from https://github.com/magmax/python-readchar
 
 import msvcrt
+import time
 
 
 class ReadChar:
@@ -44,6 +45,17 @@ class ReadChar:
 
         return ch
 
+    @staticmethod
+    def key_ready(timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a keypress, without reading it."""
+
+        deadline = time.monotonic() + timeout
+        while not msvcrt.kbhit():  # type: ignore
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
     @staticmethod
     def flush_input():
         while msvcrt.kbhit():  # type: ignore
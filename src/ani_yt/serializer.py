@@ -0,0 +1,100 @@
+import importlib
+import json
+import os
+from typing import Any
+
+from .common import VideoRecord
+
+
+def _optional(name: str) -> Any:
+    """Import an optional backend, None when it is not installed. Use it only once `BACKENDS` lists it."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+orjson = _optional("orjson")
+ujson = _optional("ujson")
+msgpack = _optional("msgpack")
+
+
+class Serializer:
+    """
+    JSON through the fastest installed backend: orjson, else ujson, else the json module.
+
+    Files read on every run are written compact, files people edit by hand are
+    written with `pretty=True`. msgpack, when installed, is available for data
+    files only this program reads, see `dump_file(binary=True)`.
+    """
+
+    BACKENDS = tuple(name for name, module in (("orjson", orjson), ("ujson", ujson), ("json", json)) if module)
+    backend = BACKENDS[0]
+
+    # Decode errors of every backend, and of msgpack, derive from ValueError
+    DecodeError = ValueError
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        # Objects the backends don't know, written in their JSON shape
+        if isinstance(obj, VideoRecord):
+            return obj.to_video()
+        raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+    @classmethod
+    def use(cls, backend: str) -> None:
+        if backend not in cls.BACKENDS:
+            raise ValueError(f"JSON backend '{backend}' is not installed, available: {', '.join(cls.BACKENDS)}")
+        cls.backend = backend
+
+    @staticmethod
+    def has_msgpack() -> bool:
+        return msgpack is not None
+
+    @classmethod
+    def dumps(cls, obj: Any, pretty: bool = False) -> str:
+        if pretty:
+            # Hand-edited files are not on a hot path, the json module keeps their layout the same on every backend
+            return json.dumps(obj, ensure_ascii=False, indent=4, default=cls._default)
+
+        if cls.backend == "orjson":
+            try:
+                return orjson.dumps(obj, default=cls._default).decode()
+            except TypeError:
+                # Values orjson refuses, like integers above 64 bits, go through the json module
+                pass
+        elif cls.backend == "ujson":
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, default=cls._default)
+
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=cls._default)
+
+    @classmethod
+    def loads(cls, data: str | bytes) -> Any:
+        if cls.backend == "orjson":
+            return orjson.loads(data)
+        if cls.backend == "ujson":
+            return ujson.loads(data)
+        return json.loads(data)
+
+    @classmethod
+    def packb(cls, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True, default=cls._default)
+
+    @staticmethod
+    def unpackb(data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+    @classmethod
+    def load_file(cls, path: str, binary: bool = False) -> Any:
+        with open(path, "rb") as f:
+            data = f.read()
+        return cls.unpackb(data) if binary else cls.loads(data)
+
+    @classmethod
+    def dump_file(cls, path: str, obj: Any, pretty: bool = False, binary: bool = False) -> None:
+        """Write `obj` to `path` through a temporary file, an interrupted write never truncates `path`."""
+        data = cls.packb(obj) if binary else cls.dumps(obj, pretty=pretty).encode("utf-8")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
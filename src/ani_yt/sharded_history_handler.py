@@ -0,0 +1,229 @@
+import hashlib
+import os
+from typing import Literal, cast
+
+from .common import Current, HistoryData, Playlist, Video
+from .exceptions import InvalidHistoryFile
+from .history_handler import HistoryHandler, HistorySession
+from .os_manager import OSManager
+from .serializer import Serializer
+
+
+class ShardedHistoryHandler(HistoryHandler):
+    """
+    History split into a manifest and one shard file per playlist.
+
+    The manifest holds `current` and the playlists without their videos, each
+    playlist's videos live in a shard named by a hash of its url. Sessions load
+    shards only when a playlist is used and write back only the shards that changed.
+    An existing `history.json` is imported once when the manifest is created.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.json_filename = self.filename
+        self.directory = "./data/history"
+        self.filename = os.path.join(self.directory, "manifest.json")
+
+    @staticmethod
+    def shard_name(playlist_url: str) -> str:
+        return f"{hashlib.sha1(playlist_url.encode()).hexdigest()}.json"
+
+    def _shard_path(self, playlist_url: str) -> str:
+        return os.path.join(self.directory, self.shard_name(playlist_url))
+
+    def _dump(self, path: str, data) -> None:
+        Serializer.dump_file(path, data)
+
+    def is_history(self):
+        return OSManager.exists(self.filename) or OSManager.exists(self.json_filename)
+
+    @HistoryHandler.safe_history_load
+    def load_manifest(self) -> HistoryData:
+        """Return the history without videos, every playlist's `videos` is left out."""
+        if not OSManager.exists(self.filename) and OSManager.exists(self.json_filename):
+            self._write(HistoryHandler().load())
+            print(f"[History] Imported {self.json_filename} into {self.directory}")
+
+        return Serializer.load_file(self.filename)
+
+    def load_videos(self, playlist_url: str) -> list[Video]:
+        with self._journal_lock:
+            try:
+                videos = Serializer.load_file(self._shard_path(playlist_url))
+            except FileNotFoundError:
+                videos = []
+            except (OSError, Serializer.DecodeError):
+                raise InvalidHistoryFile(self._shard_path(playlist_url))
+
+            videos = self.to_records(videos)
+            self.apply_events(videos, self._read_journal().get(playlist_url, []))
+            return videos
+
+    def load(self) -> HistoryData:
+        with self._journal_lock:
+            content = self.load_manifest()
+            for playlist in content["playlists"]:
+                playlist["videos"] = self.load_videos(playlist["playlist_url"])
+            return content
+
+    def _write(
+        self,
+        content: HistoryData,
+        playlist_urls: set[str] | None = None,
+        manifest: bool = True,
+    ) -> None:
+        """
+        Write the shards of `playlist_urls` (all loaded ones if None) and the manifest.
+        Playlists without a `videos` key are not loaded, their shard is left as is.
+        Shards with journaled changes are always written, the journal is cleared after.
+        """
+        with self._journal_lock:
+            os.makedirs(self.directory, exist_ok=True)
+
+            pending = self._read_journal()
+            for playlist in content["playlists"]:
+                url = playlist["playlist_url"]
+                if url in pending:
+                    if "videos" not in playlist:
+                        playlist["videos"] = self.load_videos(url)
+                elif "videos" not in playlist or (playlist_urls is not None and url not in playlist_urls):
+                    continue
+                self._dump(self._shard_path(url), playlist["videos"])
+
+            if manifest:
+                self._dump(
+                    self.filename,
+                    {
+                        "current": content.get("current", {}),
+                        "playlists": [{k: v for k, v in p.items() if k != "videos"} for p in content["playlists"]],
+                    },
+                )
+
+                # Shards of removed playlists are dropped without being read
+                kept = {self.shard_name(p["playlist_url"]) for p in content["playlists"]}
+                kept.add(os.path.basename(self.filename))
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".json") and entry.name not in kept:
+                        OSManager.delete_file(entry.path)
+
+            self._clear_journal()
+
+    def compact(self) -> None:
+        """Fold the journal into the shards it touches, the manifest is left as is."""
+        with self._journal_lock:
+            if OSManager.exists(self.journal_filename):
+                self._write(self.load_manifest(), playlist_urls=set(), manifest=False)
+
+    def session(self, flush_delay: float | None = None) -> "ShardedHistorySession":
+        return ShardedHistorySession(self, flush_delay=flush_delay)
+
+    def delete_history(self):
+        # The imported JSON file would otherwise be imported again on next use
+        HistoryHandler().delete_history()
+        if OSManager.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                OSManager.delete_file(entry.path)
+        self._journal_cache = None
+
+    def clear_history(
+        self,
+        mode: Literal["playlist", "videos", "unwatched"] = "playlist",
+        keep_recent: int = 1,
+    ):
+        """Same behavior as `HistoryHandler.clear_history`, only 'unwatched' reads the old shards."""
+        if not self.is_history():
+            print("No history file found.")
+            return
+
+        content = self.load_manifest()
+        sorted_playlists = sorted(content["playlists"], key=self.last_viewed_key, reverse=True)
+        keep = sorted_playlists[:keep_recent]
+        old = sorted_playlists[keep_recent:]
+
+        for p in old:
+            if mode == "videos":
+                p["videos"] = []
+                p.pop("last_updated", None)
+                p.pop("last_viewed", None)
+            elif mode == "unwatched":
+                p["videos"] = [v for v in self.load_videos(p["playlist_url"]) if v.get("status")]
+
+        content["playlists"] = keep if mode == "playlist" else keep + old
+        self._write(content)
+
+        print(f"History cleared. Mode: {mode}\nKept {keep_recent} most recent playlists.")
+
+
+class ShardedHistorySession(HistorySession):
+    """Session on the sharded layout, playlists are loaded on first use and only changed shards are written."""
+
+    handler: ShardedHistoryHandler
+
+    def __init__(self, handler: ShardedHistoryHandler, flush_delay: float | None = None):
+        super().__init__(handler, flush_delay=flush_delay)
+        self._dirty_shards: set[str] = set()
+        self._manifest_dirty = False
+
+    def _document(self) -> HistoryData:
+        with self._lock:
+            if self._content is None:
+                if self.handler.is_history():
+                    self._content = self.handler.load_manifest()
+                else:
+                    self._content = {"current": cast(Current, {}), "playlists": []}
+            return self._content
+
+    def _load_playlist(self, playlist: Playlist) -> Playlist:
+        if "videos" not in playlist:
+            playlist["videos"] = self.handler.load_videos(playlist["playlist_url"])
+            if self._playlist_index is not None:
+                p_idx = next(i for i, p in enumerate(self._document()["playlists"]) if p is playlist)
+                self._index_videos(p_idx, playlist["videos"])
+        return playlist
+
+    @property
+    def history(self) -> HistoryData:
+        with self._lock:
+            content = self._document()
+            for playlist in content["playlists"]:
+                self._load_playlist(playlist)
+            return content
+
+    def _changed(self, playlist_url: str | None = None) -> None:
+        if playlist_url is None:
+            self._manifest_dirty = True
+        else:
+            self._dirty_shards.add(playlist_url)
+        super()._changed(playlist_url)
+
+    def get_playlist(self, playlist_url: str) -> Playlist | None:
+        with self._lock:
+            playlist = super().get_playlist(playlist_url)
+            return self._load_playlist(playlist) if playlist is not None else None
+
+    def video_position(self, video_url: str) -> tuple[int, int]:
+        with self._lock:
+            # Loaded shards first, most lookups are for the playlist in use
+            position = super().video_position(video_url)
+            if position != (-1, -1):
+                return position
+            for playlist in self._document()["playlists"]:
+                if "videos" not in playlist:
+                    self._load_playlist(playlist)
+                    position = super().video_position(video_url)
+                    if position != (-1, -1):
+                        return position
+            return (-1, -1)
+
+    def _flush(self) -> None:
+        self.handler._write(
+            cast(HistoryData, self._content),
+            playlist_urls=self._dirty_shards,
+            manifest=self._manifest_dirty,
+        )
+
+    def _reset_changes(self) -> None:
+        super()._reset_changes()
+        self._dirty_shards = set()
+        self._manifest_dirty = False
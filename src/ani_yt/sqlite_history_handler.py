@@ -0,0 +1,470 @@
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime
+from typing import Literal, cast
+
+from .common import Current, HistoryData, Playlist, Video, VideoRecord
+from .data_processing import DataProcessing
+from .exceptions import InvalidHistoryFile
+from .history_handler import HistoryHandler, HistorySession
+from .os_manager import OSManager
+from .serializer import Serializer
+from .url_normalizer import UrlNormalizer
+
+
+class SQLiteHistoryHandler(HistoryHandler):
+    """
+    History stored in SQLite, one row per playlist and per video.
+
+    Status changes and playlist merges touch only the rows involved instead of
+    rewriting the whole history. Positions are kept contiguous so the indices
+    returned by `search` match the lists built by `load`.
+    An existing `history.json` is imported once when the database is created.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS playlists (
+            id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL,
+            playlist_url TEXT NOT NULL UNIQUE,
+            playlist_key TEXT NOT NULL DEFAULT '',
+            playlist_title TEXT NOT NULL DEFAULT '',
+            last_viewed TEXT,
+            last_updated TEXT
+        );
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY,
+            playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            video_title TEXT NOT NULL DEFAULT '',
+            video_url TEXT NOT NULL,
+            video_key TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL DEFAULT '',
+            last_viewed TEXT,
+            thumbnail_url TEXT
+        );
+    """
+    # Lookups go through the video and playlist ids of `UrlNormalizer`, not the full urls
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_videos_key ON videos(video_key);
+        CREATE INDEX IF NOT EXISTS idx_videos_playlist ON videos(playlist_id, position);
+        CREATE INDEX IF NOT EXISTS idx_playlists_key ON playlists(playlist_key);
+    """
+
+    # Status changes are already single-row updates
+    journal_enabled = False
+
+    def __init__(self):
+        super().__init__()
+        self.json_filename = self.filename
+        self.filename = "./data/history.sqlite3"
+
+    def _open(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        is_new = not OSManager.exists(self.filename)
+        try:
+            conn = sqlite3.connect(self.filename, check_same_thread=check_same_thread)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.executescript(self.SCHEMA)
+            self._migrate(conn)
+            conn.executescript(self.INDEXES)
+            if is_new and OSManager.exists(self.json_filename):
+                with conn:
+                    self._import(conn, HistoryHandler().load())
+                print(f"[History] Imported {self.json_filename} into {self.filename}")
+            return conn
+        except sqlite3.DatabaseError:
+            raise InvalidHistoryFile(self.filename)
+
+    @contextmanager
+    def _connect(self):
+        """Yield a connection inside a transaction, committed on success and rolled back on error."""
+        try:
+            with closing(self._open()) as conn:
+                with conn:
+                    yield conn
+        except sqlite3.DatabaseError:
+            raise InvalidHistoryFile(self.filename)
+
+    def is_history(self):
+        return OSManager.exists(self.filename) or OSManager.exists(self.json_filename)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Add the key columns to a database created before they existed."""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(videos)")}
+        if "video_key" in columns:
+            return
+
+        with conn:
+            conn.execute("ALTER TABLE playlists ADD COLUMN playlist_key TEXT NOT NULL DEFAULT ''")
+            conn.execute("ALTER TABLE videos ADD COLUMN video_key TEXT NOT NULL DEFAULT ''")
+            conn.execute("DROP INDEX IF EXISTS idx_videos_url")
+            conn.executemany(
+                "UPDATE playlists SET playlist_key = ? WHERE id = ?",
+                [
+                    (UrlNormalizer.playlist_key(row["playlist_url"]), row["id"])
+                    for row in conn.execute("SELECT id, playlist_url FROM playlists")
+                ],
+            )
+            conn.executemany(
+                "UPDATE videos SET video_key = ? WHERE id = ?",
+                [
+                    (UrlNormalizer.key(row["video_url"]), row["id"])
+                    for row in conn.execute("SELECT id, video_url FROM videos")
+                ],
+            )
+
+    # Conversion
+
+    @staticmethod
+    def _insert_videos(conn: sqlite3.Connection, playlist_id: int, videos: list[Video]) -> None:
+        conn.executemany(
+            "INSERT INTO videos"
+            " (playlist_id, position, video_title, video_url, video_key, status, last_viewed, thumbnail_url)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    playlist_id,
+                    position,
+                    video.get("video_title", ""),
+                    video["video_url"],
+                    UrlNormalizer.key(video["video_url"]),
+                    video.get("status", ""),
+                    video.get("last_viewed"),
+                    video.get("thumbnail_url"),
+                )
+                for position, video in enumerate(videos)
+            ),
+        )
+
+    @staticmethod
+    def _insert_playlist(conn: sqlite3.Connection, position: int, playlist: Playlist) -> None:
+        cursor = conn.execute(
+            "INSERT INTO playlists (position, playlist_url, playlist_key, playlist_title, last_viewed, last_updated)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                position,
+                playlist["playlist_url"],
+                UrlNormalizer.playlist_key(playlist["playlist_url"]),
+                playlist.get("playlist_title", ""),
+                playlist.get("last_viewed"),
+                playlist.get("last_updated"),
+            ),
+        )
+        SQLiteHistoryHandler._insert_videos(conn, cast(int, cursor.lastrowid), playlist.get("videos", []))
+
+    @staticmethod
+    def _set_current(conn: sqlite3.Connection, curr: Current | dict) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('current', ?)",
+            (Serializer.dumps(curr),),
+        )
+
+    @staticmethod
+    def _replace_playlists(conn: sqlite3.Connection, playlists: list[Playlist]) -> None:
+        conn.execute("DELETE FROM playlists")
+        for position, playlist in enumerate(playlists):
+            SQLiteHistoryHandler._insert_playlist(conn, position, playlist)
+
+    @staticmethod
+    def _import(conn: sqlite3.Connection, content: HistoryData) -> None:
+        SQLiteHistoryHandler._set_current(conn, content.get("current", {}))
+        SQLiteHistoryHandler._replace_playlists(conn, content.get("playlists", []))
+
+    @staticmethod
+    def _row_to_video(row: sqlite3.Row) -> Video:
+        return cast(
+            Video,
+            VideoRecord(row["video_title"], row["video_url"], row["status"], row["last_viewed"], row["thumbnail_url"]),
+        )
+
+    @staticmethod
+    def _row_to_playlist(row: sqlite3.Row, videos: list[Video]) -> Playlist:
+        playlist: Playlist = {
+            "playlist_title": row["playlist_title"],
+            "playlist_url": row["playlist_url"],
+            "videos": videos,
+        }
+        if row["last_viewed"] is not None:
+            playlist["last_viewed"] = row["last_viewed"]
+        if row["last_updated"] is not None:
+            playlist["last_updated"] = row["last_updated"]
+        return playlist
+
+    @staticmethod
+    def _load_videos(conn: sqlite3.Connection, playlist_id: int) -> list[Video]:
+        rows = conn.execute("SELECT * FROM videos WHERE playlist_id = ? ORDER BY position", (playlist_id,))
+        return [SQLiteHistoryHandler._row_to_video(row) for row in rows]
+
+    @staticmethod
+    def _load(conn: sqlite3.Connection) -> HistoryData:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'current'").fetchone()
+        current = cast(Current, Serializer.loads(row["value"]) if row else {})
+
+        videos_by_playlist: dict[int, list[Video]] = {}
+        for video_row in conn.execute("SELECT * FROM videos ORDER BY playlist_id, position"):
+            videos_by_playlist.setdefault(video_row["playlist_id"], []).append(
+                SQLiteHistoryHandler._row_to_video(video_row)
+            )
+
+        playlists = [
+            SQLiteHistoryHandler._row_to_playlist(row, videos_by_playlist.get(row["id"], []))
+            for row in conn.execute("SELECT * FROM playlists ORDER BY position")
+        ]
+        return {"current": current, "playlists": playlists}
+
+    @staticmethod
+    def _update(
+        conn: sqlite3.Connection,
+        curr: Current | dict | None,
+        playlists: list[Playlist] | None,
+        videos: list[Video] | None,
+        viewed: bool,
+        truncate: bool,
+    ) -> bool:
+        """Apply `HistoryHandler.update` to the database, return whether anything changed."""
+        now = datetime.now().astimezone().isoformat()
+        changed = False
+
+        if playlists is not None:
+            SQLiteHistoryHandler._replace_playlists(conn, playlists)
+            changed = True
+
+        if not curr:
+            return changed
+
+        row = conn.execute("SELECT value FROM meta WHERE key = 'current'").fetchone()
+        if row is None or Serializer.loads(row["value"]) != curr:
+            SQLiteHistoryHandler._set_current(conn, curr)
+            changed = True
+
+        playlist_url = curr.get("playlist_url")
+        if not playlist_url:
+            return changed
+
+        row = SQLiteHistoryHandler._playlist_row(conn, playlist_url)
+        if row is None:
+            new_playlist: Playlist = {
+                "playlist_title": curr.get("playlist_title", ""),
+                "playlist_url": playlist_url,
+                "videos": videos if videos else [],
+            }
+            if videos:
+                new_playlist["last_updated"] = now
+            if viewed:
+                new_playlist["last_viewed"] = now
+            (count,) = conn.execute("SELECT COUNT(*) FROM playlists").fetchone()
+            SQLiteHistoryHandler._insert_playlist(conn, count, new_playlist)
+            return True
+
+        if videos:
+            old_videos = SQLiteHistoryHandler._load_videos(conn, row["id"])
+            before = HistorySession._videos_key(old_videos)
+            merged = DataProcessing.merge_list(old_videos, videos, truncate=truncate)
+            if HistorySession._videos_key(merged) != before:
+                conn.execute("DELETE FROM videos WHERE playlist_id = ?", (row["id"],))
+                SQLiteHistoryHandler._insert_videos(conn, row["id"], merged)
+                conn.execute("UPDATE playlists SET last_updated = ? WHERE id = ?", (now, row["id"]))
+                changed = True
+
+        if viewed:
+            conn.execute("UPDATE playlists SET last_viewed = ? WHERE id = ?", (now, row["id"]))
+            changed = True
+        return changed
+
+    @staticmethod
+    def _set_video_status(conn: sqlite3.Connection, url: str, status: str) -> bool:
+        last_viewed = datetime.now().astimezone().isoformat() if status == "viewed" else None
+
+        row = conn.execute(
+            "SELECT v.id FROM videos v JOIN playlists p ON p.id = v.playlist_id"
+            " WHERE v.video_key = ? ORDER BY p.position, v.position LIMIT 1",
+            (UrlNormalizer.key(url),),
+        ).fetchone()
+        if row is None:
+            return False
+        conn.execute("UPDATE videos SET status = ?, last_viewed = ? WHERE id = ?", (status, last_viewed, row["id"]))
+        return True
+
+    @staticmethod
+    def _search(conn: sqlite3.Connection, curr_url: str) -> tuple[int, int]:
+        row = conn.execute(
+            "SELECT p.position AS p_idx, v.position AS v_idx FROM videos v JOIN playlists p ON p.id = v.playlist_id"
+            " WHERE v.video_key = ? ORDER BY p.position, v.position LIMIT 1",
+            (UrlNormalizer.key(curr_url),),
+        ).fetchone()
+        return (row["p_idx"], row["v_idx"]) if row else (-1, -1)
+
+    @staticmethod
+    def _playlist_row(conn: sqlite3.Connection, playlist_url: str) -> sqlite3.Row | None:
+        return conn.execute(
+            "SELECT * FROM playlists WHERE playlist_key = ? ORDER BY position LIMIT 1",
+            (UrlNormalizer.playlist_key(playlist_url),),
+        ).fetchone()
+
+    # HistoryHandler interface
+
+    def load(self) -> HistoryData:
+        if not self.is_history():
+            raise InvalidHistoryFile(self.filename)
+
+        with self._connect() as conn:
+            return self._load(conn)
+
+    def _write(self, content: HistoryData) -> None:
+        with self._connect() as conn:
+            self._import(conn, content)
+
+    def session(self, flush_delay: float | None = None) -> "SQLiteHistorySession":
+        return SQLiteHistorySession(self, flush_delay=flush_delay)
+
+    def import_json(self, filename: str) -> None:
+        """Replace the database content with a history file in the JSON format."""
+        content = Serializer.load_file(filename)
+        if not isinstance(content, dict) or not all(key in content for key in self.required_keys):
+            raise InvalidHistoryFile(filename)
+        self._write(cast(HistoryData, content))
+
+    def search(self, curr_url: str, history: HistoryData) -> tuple[int, int]:
+        if not isinstance(history, dict) or "playlists" not in history:
+            raise InvalidHistoryFile(self.filename)
+
+        with self._connect() as conn:
+            return self._search(conn, curr_url)
+
+    def delete_history(self):
+        # The imported JSON file would otherwise be imported again on next use
+        HistoryHandler().delete_history()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            OSManager.delete_file(f"{self.filename}{suffix}")
+
+    def clear_history(
+        self,
+        mode: Literal["playlist", "videos", "unwatched"] = "playlist",
+        keep_recent: int = 1,
+    ):
+        """Same behavior as `HistoryHandler.clear_history`, without loading any video."""
+        if not self.is_history():
+            print("No history file found.")
+            return
+
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, last_viewed FROM playlists ORDER BY position").fetchall()
+            sorted_ids = [row["id"] for row in sorted(rows, key=lambda r: self.last_viewed_key(dict(r)), reverse=True)]
+            old_ids = [(playlist_id,) for playlist_id in sorted_ids[keep_recent:]]
+
+            if mode == "playlist":
+                conn.executemany("DELETE FROM playlists WHERE id = ?", old_ids)
+            elif mode == "videos":
+                conn.executemany("DELETE FROM videos WHERE playlist_id = ?", old_ids)
+                conn.executemany("UPDATE playlists SET last_updated = NULL, last_viewed = NULL WHERE id = ?", old_ids)
+            elif mode == "unwatched":
+                for (playlist_id,) in old_ids:
+                    kept = self._load_videos(conn, playlist_id)
+                    conn.execute("DELETE FROM videos WHERE playlist_id = ?", (playlist_id,))
+                    self._insert_videos(conn, playlist_id, [v for v in kept if v.get("status")])
+
+            # Playlists end up ordered by recency, like the JSON backend
+            conn.executemany(
+                "UPDATE playlists SET position = ? WHERE id = ?",
+                ((position, playlist_id) for position, playlist_id in enumerate(sorted_ids)),
+            )
+
+        print(f"History cleared. Mode: {mode}\nKept {keep_recent} most recent playlists.")
+
+
+class SQLiteHistorySession(HistorySession):
+    """
+    Session on the SQLite backend: changes are applied to the rows directly,
+    inside a single transaction that is committed once.
+    """
+
+    handler: SQLiteHistoryHandler
+
+    def __init__(self, handler: SQLiteHistoryHandler, flush_delay: float | None = None):
+        super().__init__(handler, flush_delay=flush_delay)
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._conn is None:
+                # A flush_delay commit runs on a timer thread, access is serialized by the lock
+                self._conn = self.handler._open(check_same_thread=False)
+            return self._conn
+
+    @property
+    def history(self) -> HistoryData:
+        with self._lock:
+            if self._content is None:
+                self._content = self.handler._load(self.conn)
+            return self._content
+
+    @property
+    def current(self) -> Current:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'current'").fetchone()
+            return cast(Current, Serializer.loads(row["value"]) if row else {})
+
+    def get_playlist(self, playlist_url: str) -> Playlist | None:
+        with self._lock:
+            row = self.handler._playlist_row(self.conn, playlist_url)
+            if row is None:
+                return None
+            return self.handler._row_to_playlist(row, self.handler._load_videos(self.conn, row["id"]))
+
+    def update(
+        self,
+        curr: Current | dict | None = None,
+        playlists: list[Playlist] | None = None,
+        videos: list[Video] | None = None,
+        viewed: bool = False,
+        truncate: bool = True,
+    ) -> None:
+        with self._lock:
+            if self.handler._update(self.conn, curr, playlists, videos, viewed, truncate):
+                self._content = None
+                self._changed()
+
+    def set_video_status(self, url: str, status: str) -> bool:
+        with self._lock:
+            if not self.handler._set_video_status(self.conn, url, status):
+                return False
+            self._content = None
+            self._changed()
+            return True
+
+    def playlist_index(self, playlist_url: str) -> int:
+        with self._lock:
+            row = self.handler._playlist_row(self.conn, playlist_url)
+            return row["position"] if row else -1
+
+    def video_position(self, video_url: str) -> tuple[int, int]:
+        with self._lock:
+            return self.handler._search(self.conn, video_url)
+
+    def commit(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._conn is not None:
+                self._conn.commit()
+            self._reset_changes()
+
+    def rollback(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.rollback()
+            super().rollback()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import queue
+import threading
+from urllib.parse import urlparse
+
+from .common import Video
+from .os_manager import OSManager
+from .yt_dlp_handler import YT_DLP, YT_DLP_Options
+
+
+class ThumbnailHandler:
+    """
+    Local store of thumbnail images, limited to `max_bytes` with LRU eviction.
+
+    Thumbnail urls are taken from the flat playlist entries when available,
+    so only videos without one need a full extraction.
+    The file modification time doubles as the last access time.
+    Stored files are indexed by video id hash in memory, the directory is only listed once.
+    Their total size is kept up to date, so the directory is only scanned again to evict.
+    """
+
+    def __init__(self, ydl_options: YT_DLP_Options, max_bytes=50 * 1024 * 1024, timeout=10):
+        self.directory = "./data/thumbnails"
+        self.ydl_options = ydl_options
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+        self._queue: queue.Queue[tuple[str, str]] = queue.Queue()
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._local: dict[str, str] | None = None
+        self._sizes: dict[str, int] = {}
+        self._total = 0
+
+    @staticmethod
+    def _key(video_url: str) -> str:
+        return hashlib.sha1(video_url.encode()).hexdigest()
+
+    def _path(self, video_url: str, thumbnail_url: str) -> str:
+        ext = os.path.splitext(urlparse(thumbnail_url).path)[1] or ".jpg"
+        return os.path.join(self.directory, f"{self._key(video_url)}{ext}")
+
+    def _local_paths(self) -> dict[str, str]:
+        # Call with `_lock` held
+        if self._local is None:
+            self._local = {}
+            self._sizes = {}
+            self._total = 0
+            if OSManager.isdir(self.directory):
+                for entry in os.scandir(self.directory):
+                    if not entry.name.endswith(".tmp"):
+                        self._store(os.path.splitext(entry.name)[0], entry.path, entry.stat().st_size)
+        return self._local
+
+    def _store(self, key: str, path: str, size: int) -> None:
+        # Call with `_lock` held
+        self._forget(key)
+        self._local_paths()[key] = path
+        self._sizes[key] = size
+        self._total += size
+
+    def _forget(self, key: str) -> None:
+        # Call with `_lock` held
+        self._local_paths().pop(key, None)
+        self._total -= self._sizes.pop(key, 0)
+
+    def _find_local(self, video_url: str) -> str | None:
+        with self._lock:
+            return self._local_paths().get(self._key(video_url))
+
+    def resolve_url(self, video: Video) -> str:
+        thumbnail_url = video.get("thumbnail_url")
+        if thumbnail_url:
+            return thumbnail_url
+        return YT_DLP.standalone_get_thumbnail(video["video_url"], self.ydl_options.ydl_opts)
+
+    def _download(self, video_url: str, thumbnail_url: str) -> str | None:
+        import urllib.request
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(video_url, thumbnail_url)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        try:
+            with urllib.request.urlopen(thumbnail_url, timeout=self.timeout) as response:
+                data = response.read()
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except (OSError, ValueError):
+            OSManager.delete_file(temp_path)
+            return None
+
+        with self._lock:
+            self._store(self._key(video_url), path, len(data))
+
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        with self._lock:
+            self._local_paths()
+            if self._total <= self.max_bytes:
+                return
+
+        # Over the limit, the files on disk are the reference for sizes and access times
+        entries = [entry for entry in os.scandir(self.directory) if not entry.name.endswith(".tmp")]
+        total = sum(entry.stat().st_size for entry in entries)
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            OSManager.delete_file(entry.path)
+            with self._lock:
+                self._forget(os.path.splitext(entry.name)[0])
+
+    def get(self, video: Video) -> str:
+        """Return a local image path, or the remote url if it could not be stored."""
+        local = self._find_local(video["video_url"])
+        if local:
+            try:
+                # Mark as recently used
+                os.utime(local)
+                return local
+            except OSError:
+                # Removed behind our back, download it again
+                with self._lock:
+                    self._forget(self._key(video["video_url"]))
+
+        thumbnail_url = self.resolve_url(video)
+        if not thumbnail_url:
+            return ""
+        return self._download(video["video_url"], thumbnail_url) or thumbnail_url
+
+    def _run_worker(self) -> None:
+        while True:
+            video_url, thumbnail_url = self._queue.get()
+            try:
+                if not self._find_local(video_url):
+                    self._download(video_url, thumbnail_url)
+            finally:
+                with self._lock:
+                    self._pending.discard(video_url)
+
+    def prefetch(self, videos: list[Video]) -> None:
+        """Download the thumbnails of `videos` in the background, only for videos with a known url."""
+        with self._lock:
+            local = self._local_paths()
+            for video in videos:
+                video_url, thumbnail_url = video["video_url"], video.get("thumbnail_url")
+                if not thumbnail_url or video_url in self._pending or self._key(video_url) in local:
+                    continue
+                self._pending.add(video_url)
+                self._queue.put((video_url, thumbnail_url))
+
+            # Daemon thread, an unfinished prefetch never delays exit
+            if self._worker is None and self._pending:
+                self._worker = threading.Thread(target=self._run_worker, daemon=True)
+                self._worker.start()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local = None
+        if not OSManager.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            OSManager.delete_file(entry.path)
@@ -0,0 +1,92 @@
+import functools
+import re
+from urllib.parse import parse_qs, urlparse
+
+
+class UrlNormalizer:
+    """
+    Video and playlist ids of YouTube urls, and one canonical url for each.
+
+    The same video can come as watch?v=, youtu.be/, /shorts/ or /embed/, with or
+    without extra parameters. Stores index videos by their 11-char id and playlists
+    by their list id, so every form of a url finds the same entry, and urls are
+    written back in the canonical form. Urls of other sites are their own key.
+    """
+
+    VIDEO_URL = "https://www.youtube.com/watch?v={}"
+    PLAYLIST_URL = "https://www.youtube.com/playlist?list={}"
+
+    _VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{11}")
+    _PLAYLIST_ID = re.compile(r"[A-Za-z0-9_-]+")
+    _HOSTS = {
+        "youtube.com",
+        "www.youtube.com",
+        "m.youtube.com",
+        "music.youtube.com",
+        "youtube-nocookie.com",
+        "www.youtube-nocookie.com",
+    }
+    _SHORT_HOSTS = {"youtu.be", "www.youtu.be"}
+    _PATH_PREFIXES = {"shorts", "embed", "live", "v", "e"}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1 << 16)
+    def parse(url: str) -> tuple[str | None, str | None]:
+        """Return (video_id, playlist_id) of `url`, None for what it does not contain."""
+        try:
+            parsed = urlparse(url)
+            host = (parsed.hostname or "").lower()
+        except ValueError:
+            return (None, None)
+
+        query = parse_qs(parsed.query)
+        parts = [part for part in parsed.path.split("/") if part]
+        video_id = None
+
+        if host in UrlNormalizer._SHORT_HOSTS:
+            video_id = parts[0] if parts else None
+        elif host in UrlNormalizer._HOSTS:
+            if parts == ["watch"]:
+                video_id = query.get("v", [None])[0]
+            elif len(parts) >= 2 and parts[0] in UrlNormalizer._PATH_PREFIXES:
+                video_id = parts[1]
+        else:
+            return (None, None)
+
+        if video_id is not None and not UrlNormalizer._VIDEO_ID.fullmatch(video_id):
+            video_id = None
+
+        playlist_id = query.get("list", [None])[0]
+        if playlist_id is not None and not UrlNormalizer._PLAYLIST_ID.fullmatch(playlist_id):
+            playlist_id = None
+
+        return (video_id, playlist_id)
+
+    @staticmethod
+    def video_id(url: str) -> str | None:
+        return UrlNormalizer.parse(url)[0]
+
+    @staticmethod
+    def playlist_id(url: str) -> str | None:
+        return UrlNormalizer.parse(url)[1]
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Key of a video url: its video id, else its playlist id, else the url itself."""
+        video_id, playlist_id = UrlNormalizer.parse(url)
+        return video_id or playlist_id or url
+
+    @staticmethod
+    def playlist_key(url: str) -> str:
+        """Key of a playlist url: its playlist id, else the url itself."""
+        return UrlNormalizer.parse(url)[1] or url
+
+    @staticmethod
+    def canonical(url: str) -> str:
+        """The canonical url of the video, or of the playlist if `url` names no video."""
+        video_id, playlist_id = UrlNormalizer.parse(url)
+        if video_id:
+            return UrlNormalizer.VIDEO_URL.format(video_id)
+        if playlist_id:
+            return UrlNormalizer.PLAYLIST_URL.format(playlist_id)
+        return url
@@ -1,13 +1,26 @@
+import atexit
+import bisect
+import hashlib
 import os
+import queue
+import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from typing import Any
 from urllib.parse import urljoin, urlparse
 
-import yt_dlp
-
+from .cache_handler import ExtractionCache
+from .common import Video
 from .data_processing import DataProcessing
 from .exceptions import MissingChannelUrl, PauseableException
-from .helper import SubprocessHelper
+from .helper import LazyModule, SubprocessHelper
+from .serializer import Serializer
+
+# Imported on first use, it dominates the startup time otherwise
+yt_dlp = LazyModule("yt_dlp")
 
 
 class YT_DLP_Options:
@@ -20,13 +33,92 @@ class YT_DLP_Options:
         }
 
 
+class YT_DLP_FetchOptions:
+    def __init__(self, jobs=4, timeout=180, split=False, chunk_size=200, socket_timeout=30):
+        self.jobs = jobs
+        self.timeout = timeout
+        self.socket_timeout = socket_timeout
+        self.split = split
+        self.chunk_size = chunk_size
+
+
+class YT_DLP_Pool:
+    """
+    Process-wide pool of warm YoutubeDL instances, keyed by their options.
+
+    Creating a YoutubeDL loads extractors and sets up cookie jars and HTTP
+    handlers, so instances are kept and reused between extractions instead.
+    """
+
+    max_idle = 8
+
+    _lock = threading.Lock()
+    _idle: dict[str, list[Any]] = {}
+    _closed = False
+
+    @staticmethod
+    def _key(opts: dict) -> str:
+        return repr(sorted(opts.items()))
+
+    @classmethod
+    def checkout(cls, opts: dict):
+        with cls._lock:
+            idle = cls._idle.get(cls._key(opts))
+            if idle:
+                return idle.pop()
+        return yt_dlp.YoutubeDL(dict(opts))  # type: ignore
+
+    @classmethod
+    def checkin(cls, opts: dict, ydl) -> None:
+        with cls._lock:
+            if not cls._closed:
+                idle = cls._idle.setdefault(cls._key(opts), [])
+                if len(idle) < cls.max_idle:
+                    idle.append(ydl)
+                    return
+        ydl.close()
+
+    @classmethod
+    @contextmanager
+    def borrow(cls, opts: dict):
+        ydl = cls.checkout(opts)
+        try:
+            yield ydl
+        except BaseException:
+            # Do not hand out an instance left in an unknown state
+            ydl.close()
+            raise
+        cls.checkin(opts, ydl)
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            cls._closed = True
+            idle, cls._idle = cls._idle, {}
+
+        for instances in idle.values():
+            for ydl in instances:
+                ydl.close()
+
+
+atexit.register(YT_DLP_Pool.shutdown)
+
+
 class YT_DLP:
-    def __init__(self, channel_url, ydl_options: YT_DLP_Options):
+    def __init__(
+        self,
+        channel_url,
+        ydl_options: YT_DLP_Options,
+        cache: ExtractionCache | None = None,
+        fetch_options: YT_DLP_FetchOptions | None = None,
+    ):
         self.channel_url = None
         if channel_url:
             self.channel_url = self._parse_channel_url(channel_url)
 
         self.ydl_options = ydl_options
+        self.cache = cache
+        self.fetch_options = fetch_options
 
     def _parse_channel_url(self, channel_url):
         parsed_url = urlparse(channel_url)
@@ -52,14 +144,17 @@ class YT_DLP:
     def _ensure_trailing_slash(self, channel_url):
         return channel_url.rstrip("/") + "/"
 
+    def extract_playlist(self):
+        # Same as get_playlist, but errors are raised instead of reported to the user.
+        if not self.channel_url:
+            raise MissingChannelUrl("No channel url specified.")
+
+        with YT_DLP_Pool.borrow(self.ydl_options.ydl_opts) as ydl:
+            return ydl.extract_info(self.channel_url, download=False)
+
     def get_playlist(self):
         try:
-            if not self.channel_url:
-                raise MissingChannelUrl("No channel url specified.")
-
-            with yt_dlp.YoutubeDL(self.ydl_options.ydl_opts) as ydl:  # type: ignore
-                result = ydl.extract_info(self.channel_url, download=False)
-            return result
+            return self.extract_playlist()
         except yt_dlp.DownloadError:  # type: ignore
             PauseableException(
                 "Failed to fetch playlist info. yt-dlp may be outdated or the URL may be invalid.",
@@ -70,7 +165,7 @@ class YT_DLP:
     @staticmethod
     def standalone_get_video(url, opts):
         try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
+            with YT_DLP_Pool.borrow(opts) as ydl:
                 info = ydl.extract_info(url, download=False)
             return info
         except yt_dlp.DownloadError:  # type: ignore
@@ -80,8 +175,88 @@ class YT_DLP:
             )
             return None
 
-    def get_video(self, url):
-        return YT_DLP.standalone_get_video(url, self.ydl_options.ydl_opts)
+    def get_video(self, url, refresh=False):
+        opts = self.ydl_options.ydl_opts
+
+        if self.cache is not None and not refresh:
+            info = self.cache.get(url, opts)
+            if info is not None:
+                return info
+
+        if self.fetch_options is not None and self.fetch_options.split:
+            info = self.get_video_split(url)
+        else:
+            info = YT_DLP.standalone_get_video(url, opts)
+
+        # Only flat playlist results are cached, single videos carry expiring stream urls
+        if self.cache is not None and info is not None and info.get("_type") == "playlist":
+            self.cache.set(url, opts, yt_dlp.YoutubeDL.sanitize_info(dict(info)))  # type: ignore
+        return info
+
+    @staticmethod
+    def _split_ranges(start, chunk_size, count):
+        return [(i, i + chunk_size) for i in range(start, start + chunk_size * count, chunk_size)]
+
+    def get_video_split(self, url):
+        """
+        Fetch the entries of a playlist in ranges of `chunk_size`, `jobs` ranges at a time.
+
+        Only extractors that give random access to their pages (yt-dlp PagedList) can be split.
+        Other playlists, like YouTube, are a continuation chain and are read in a single pass.
+        """
+        fetch_options = self.fetch_options or YT_DLP_FetchOptions()
+        chunk_size = fetch_options.chunk_size
+
+        try:
+            # The pages are requested through the extractor of this instance, keep it until they are all in
+            with YT_DLP_Pool.borrow(self.ydl_options.ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False, process=False)
+                if info.get("_type") in ("url", "url_transparent"):
+                    info = ydl.extract_info(info["url"], download=False, process=False)
+
+                entries = info.get("entries")
+                if not isinstance(entries, yt_dlp.utils.PagedList):  # type: ignore
+                    return ydl.process_ie_result(info, download=False)
+
+                count = info.get("playlist_count")
+                chunks = []
+                with ThreadPoolExecutor(max_workers=max(1, fetch_options.jobs)) as executor:
+                    if isinstance(count, int):
+                        # Entry count is known, every range can be requested at once
+                        ranges = self._split_ranges(0, chunk_size, -(-count // chunk_size))
+                        chunks = list(executor.map(lambda r: entries.getslice(*r), ranges))
+                    else:
+                        # Unknown count, request `jobs` ranges at a time until one comes back short
+                        start = 0
+                        while not chunks or len(chunks[-1]) == chunk_size:
+                            ranges = self._split_ranges(start, chunk_size, fetch_options.jobs)
+                            chunks += list(executor.map(lambda r: entries.getslice(*r), ranges))
+                            start = ranges[-1][1]
+
+            return {**info, "_type": "playlist", "entries": [entry for chunk in chunks for entry in chunk]}
+        except yt_dlp.utils.YoutubeDLError:  # type: ignore
+            PauseableException(
+                "Failed to fetch playlist videos. yt-dlp may be outdated or the URL may be invalid.",
+                delay=-1,
+            )
+            return None
+
+    def stream_video(self, url):
+        return YT_DLP_Stream(url, self.ydl_options, cache=self.cache).start()
+
+    def get_video_incremental(self, url, known_urls: list[str], known_run=3):
+        # Without processing, yt-dlp returns the playlist entries as a lazy generator
+        # that only requests the next page when iterated.
+        try:
+            with YT_DLP_Pool.borrow(self.ydl_options.ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False, process=False)
+                return DataProcessing.omit_until_known(info.get("entries") or [], known_urls, known_run)
+        except yt_dlp.utils.YoutubeDLError:  # type: ignore
+            PauseableException(
+                "Failed to fetch playlist videos. yt-dlp may be outdated or the URL may be invalid.",
+                delay=-1,
+            )
+            return None
 
     @staticmethod
     def standalone_get_thumbnail(url, opts):
@@ -91,15 +266,22 @@ class YT_DLP:
         info_d: Any = info
         return info_d["thumbnails"][-1]["url"]
 
+    @staticmethod
+    def parse_stream(info) -> tuple[str, str]:
+        # -> (video_url, audio_url), audio_url is empty when a single format was selected
+        requested_formats = info.get("requested_formats")
+        if requested_formats:
+            return (
+                requested_formats[0]["url"],
+                requested_formats[1]["url"] if len(requested_formats) > 1 else "",
+            )
+        return info.get("url", ""), ""
+
     def get_stream(self, url):
         formats = self.get_video(url)
         if formats is None:
             return "", ""
-        formats_d: Any = formats
-        return (
-            formats_d["requested_formats"][0]["url"],
-            formats_d["requested_formats"][1]["url"],
-        )
+        return YT_DLP.parse_stream(formats)
 
     @staticmethod
     def download(url, cats="all", extra_args=None, args=None, capture_output=False):
@@ -131,3 +313,243 @@ class YT_DLP:
         SubprocessHelper.require_app("yt-dlp", check_only=True)
         result = subprocess.run(command, capture_output=capture_output)
         return result.stdout
+
+
+class YT_DLP_Stream:
+    """
+    Fetch the videos of a playlist in a background thread.
+
+    Videos are available through `snapshot()` as soon as each page arrives,
+    kept sorted by title so the final order matches a regular fetch.
+    """
+
+    def __init__(self, url, ydl_options: YT_DLP_Options, cache: ExtractionCache | None = None):
+        self.url = url
+        self.ydl_options = ydl_options
+        self.cache = cache
+
+        self.videos: list[Video] = []
+        self.error: Exception | None = None
+        self.done = threading.Event()
+
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        opts = self.ydl_options.ydl_opts
+        cached = self.cache.get(self.url, opts) if self.cache is not None else None
+
+        if cached is not None:
+            self.videos = DataProcessing.sort(DataProcessing.omit(cached), key=lambda x: x["video_title"])
+            self.done.set()
+        else:
+            self._thread.start()
+        return self
+
+    def _run(self):
+        opts = self.ydl_options.ydl_opts
+        entries = []
+
+        try:
+            with YT_DLP_Pool.borrow(opts) as ydl:
+                # Without processing, the entries are a generator that fetches pages as it is iterated
+                info = ydl.extract_info(self.url, download=False, process=False)
+                if info.get("_type") in ("url", "url_transparent"):
+                    info = ydl.extract_info(info["url"], download=False, process=False)
+
+                for entry in info.get("entries") or []:
+                    entries.append(entry)
+                    for video in DataProcessing.iter_omit([entry]):
+                        with self._changed:
+                            bisect.insort(self.videos, video, key=lambda x: x["video_title"])
+                            self._changed.notify_all()
+
+            if self.cache is not None:
+                info = {**info, "_type": "playlist", "entries": entries}
+                self.cache.set(self.url, opts, yt_dlp.YoutubeDL.sanitize_info(info))  # type: ignore
+        except yt_dlp.utils.YoutubeDLError as e:  # type: ignore
+            self.error = e
+        finally:
+            with self._changed:
+                self.done.set()
+                self._changed.notify_all()
+
+    @property
+    def complete(self) -> bool:
+        return self.done.is_set() and self.error is None
+
+    def snapshot(self) -> list[Video]:
+        with self._changed:
+            return list(self.videos)
+
+    def wait_for(self, count: int) -> None:
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.videos) >= count or self.done.is_set())
+
+    def join(self) -> None:
+        self.done.wait()
+
+
+class YT_DLP_Prefetcher:
+    """
+    Extract videos in the background, so the next one starts without waiting for yt-dlp.
+
+    The info is written as an info json that mpv's yt-dlp hook loads instead of extracting again,
+    mpv still opens the watch url and picks its own format from it.
+    Results are kept until the `expire` time signed into the stream url.
+    """
+
+    fallback_ttl = 300
+    expire_margin = 60
+
+    def __init__(self, ydl_options: YT_DLP_Options):
+        self.directory = "./data/prefetch"
+        self.ydl_options = ydl_options
+
+        self._resolved: dict[str, tuple[str, float]] = {}
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_expire(stream_url: str) -> float | None:
+        # Appears as a query parameter or as a path segment depending on the format
+        match = re.search(r"[/?&]expire[=/](\d+)", stream_url)
+        return float(match.group(1)) if match else None
+
+    def _path(self, url) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha1(url.encode()).hexdigest()}.info.json")
+
+    def _resolve(self, url):
+        try:
+            with YT_DLP_Pool.borrow(self.ydl_options.ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+
+            video_url, _ = YT_DLP.parse_stream(info)
+            if video_url:
+                expire = self.parse_expire(video_url) or time.time() + self.fallback_ttl
+                path = self._path(url)
+                os.makedirs(self.directory, exist_ok=True)
+                Serializer.dump_file(path, yt_dlp.YoutubeDL.sanitize_info(info))  # type: ignore
+                with self._lock:
+                    self._resolved[url] = (path, expire)
+        except (yt_dlp.utils.YoutubeDLError, OSError):  # type: ignore
+            # Nothing to report, the player extracts the video itself
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def prefetch(self, url) -> None:
+        with self._lock:
+            if url in self._pending or self._get_valid(url):
+                return
+            self._pending.add(url)
+
+        threading.Thread(target=self._resolve, args=(url,), daemon=True).start()
+
+    def _get_valid(self, url) -> str | None:
+        resolved = self._resolved.get(url)
+        if resolved is None:
+            return None
+
+        path, expire = resolved
+        if expire - time.time() < self.expire_margin or not os.path.exists(path):
+            del self._resolved[url]
+            with suppress(OSError):
+                os.remove(path)
+            return None
+        return path
+
+    def get(self, url) -> str | None:
+        """Return the path of the info json of `url`, if it was extracted and is still valid."""
+        with self._lock:
+            return self._get_valid(url)
+
+
+class YT_DLP_Fetcher:
+    """
+    Fetch the playlists of several channels on a bounded worker pool.
+
+    Results are always returned in the order of the given channel urls,
+    so merging them gives the same output as fetching one by one.
+    """
+
+    def __init__(self, ydl_options: YT_DLP_Options, fetch_options: YT_DLP_FetchOptions):
+        self.fetch_options = fetch_options
+
+        # Let yt-dlp give up on stalled connections instead of holding a worker forever
+        self.ydl_options = YT_DLP_Options()
+        self.ydl_options.ydl_opts = {**ydl_options.ydl_opts, "socket_timeout": fetch_options.socket_timeout}
+
+    def _worker(self, tasks: queue.Queue, finished: queue.Queue) -> None:
+        while True:
+            try:
+                idx, channel_url = tasks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                finished.put((idx, YT_DLP(channel_url, self.ydl_options).extract_playlist(), None))
+            except Exception as e:
+                finished.put((idx, None, e))
+
+    def fetch_playlists(self, channel_urls: list[str]) -> list[dict | None]:
+        total = len(channel_urls)
+        results: list[dict | None] = [None] * total
+        errors: dict[int, str] = {}
+        # One deadline for the whole call, channels still queued behind slow ones count against it too
+        deadline = time.monotonic() + self.fetch_options.timeout
+
+        tasks: queue.Queue = queue.Queue()
+        for idx, ch_url in enumerate(channel_urls):
+            tasks.put((idx, ch_url))
+        finished: queue.Queue = queue.Queue()
+
+        # Daemon workers, so a channel that never answers doesn't keep the interpreter from exiting
+        for _ in range(max(1, min(self.fetch_options.jobs, total or 1))):
+            threading.Thread(target=self._worker, args=(tasks, finished), daemon=True).start()
+
+        pending = set(range(total))
+        count = 0
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise queue.Empty
+                    idx, result, error = finished.get(timeout=remaining)
+                except queue.Empty:
+                    # Abandon every channel not fetched yet, whether running or still queued
+                    for idx in pending:
+                        errors[idx] = "Timed out"
+                    break
+
+                pending.discard(idx)
+                count += 1
+                if error is None:
+                    results[idx] = result
+                    print(f"[{count}/{total}] Fetched: {channel_urls[idx]}")
+                elif isinstance(error, MissingChannelUrl):
+                    errors[idx] = "Channel not found"
+                elif isinstance(error, yt_dlp.DownloadError):  # type: ignore
+                    errors[idx] = "Failed to fetch playlist info"
+                else:
+                    raise error
+        finally:
+            # Don't start channels that are still queued if we leave early
+            while True:
+                try:
+                    tasks.get_nowait()
+                except queue.Empty:
+                    break
+
+        for idx in sorted(errors):
+            print(f"{errors[idx]}: {channel_urls[idx]}")
+
+        failed = sum(1 for error in errors.values() if error != "Channel not found")
+        if failed:
+            PauseableException(
+                f"Failed to fetch {failed} of {total} channels. yt-dlp may be outdated or the URL may be invalid.",
+                delay=-1,
+            )
+
+        return results
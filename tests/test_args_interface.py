@@ -19,6 +19,13 @@ class TestArgsHandler:
                     handler = ArgsHandler()
                     assert handler.parser is not None
 
+    def test_bench_requires_benchmark(self, capsys):
+        with patch("sys.argv", ["ani-yt", "bench"]):
+            with pytest.raises(SystemExit) as exc_info:
+                ArgsHandler()
+        assert exc_info.value.code == 2
+        assert "benchmark" in capsys.readouterr().err
+
     def test_run_main_valid_action(self):
         with patch("sys.argv", ["ani-yt"]):
             with patch("ani_yt.args_interface.ArgsHandler._args_wrapping"):
@@ -4,6 +4,7 @@ from unittest.mock import patch
 import pytest
 
 from ani_yt.bookmarking_handler import BookmarkingHandler
+from ani_yt.common import VideoRecord
 from ani_yt.exceptions import CategoryNotExist
 
 
@@ -35,6 +36,20 @@ class TestBookmarkingHandler:
         bh.update_item(["EP 1", "https://youtube.com/1"], category="bookmark")
         assert bh.is_item_exist("https://youtube.com/1", "bookmark")
 
+    def test_update_item_from_record(self):
+        bh = BookmarkingHandler()
+        bh.update_item(VideoRecord("EP 1", "https://youtube.com/1"), category="bookmark")
+        assert bh.is_item_exist("https://youtube.com/1", "bookmark")
+
+    def test_url_forms_share_bookmarks(self):
+        bh = BookmarkingHandler()
+        bh.update_item(["EP 1", "https://youtu.be/dQw4w9WgXcQ?t=5"], category="bookmark")
+        assert bh.get_category("bookmark")["EP 1"] == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        assert bh.is_item_exist("https://www.youtube.com/shorts/dQw4w9WgXcQ", "bookmark")
+
+        bh.remove_item("https://m.youtube.com/watch?v=dQw4w9WgXcQ", category="bookmark")
+        assert not bh.is_item_exist("https://youtu.be/dQw4w9WgXcQ", "bookmark")
+
     def test_update_item_new_category(self):
         bh = BookmarkingHandler()
         video = {"video_title": "EP 1", "video_url": "https://youtube.com/1", "status": ""}
@@ -77,3 +92,38 @@ class TestBookmarkingHandler:
         assert os.path.exists(bh.filename)
         bh.delete_file()
         assert not os.path.exists(bh.filename)
+
+    def test_get_categories(self):
+        bh = BookmarkingHandler()
+        bh.update_item(["EP 1", "https://youtube.com/1"], category="bookmark")
+        bh.update_item(["EP 1", "https://youtube.com/1"], category="completed")
+        assert bh.get_categories("https://youtube.com/1") == {"bookmark", "completed"}
+        assert bh.get_categories("https://youtube.com/x") == set()
+
+    def test_lookups_do_not_read_file(self):
+        bh = BookmarkingHandler()
+        bh.update_item(["EP 1", "https://youtube.com/1"], category="bookmark")
+
+        with patch("builtins.open") as mock_open, patch("os.stat") as mock_stat:
+            for _ in range(24):
+                assert bh.is_item_exist("https://youtube.com/1", "bookmark")
+        mock_open.assert_not_called()
+        mock_stat.assert_not_called()
+
+    def test_reloads_on_external_change(self):
+        bh = BookmarkingHandler(stat_interval=0)
+        bh.update_item(["EP 1", "https://youtube.com/1"], category="bookmark")
+
+        other = BookmarkingHandler()
+        other.remove_item("https://youtube.com/1", "bookmark")
+        # Make sure the modification time differs even on coarse clocks
+        stat = os.stat(bh.filename)
+        os.utime(bh.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert not bh.is_item_exist("https://youtube.com/1", "bookmark")
+
+    def test_remove_updates_index(self):
+        bh = BookmarkingHandler()
+        bh.update_item(["EP 1", "https://youtube.com/1"], category="bookmark")
+        bh.remove_item("https://youtube.com/1", "bookmark")
+        assert bh.get_categories("https://youtube.com/1") == set()
@@ -0,0 +1,68 @@
+import os
+import time
+
+from ani_yt.cache_handler import ExtractionCache
+
+
+class TestExtractionCache:
+    URL = "https://youtube.com/p"
+    OPTS = {"extract_flat": True, "quiet": True}
+
+    def test_miss_then_hit(self):
+        cache = ExtractionCache()
+        assert cache.get(self.URL, self.OPTS) is None
+        cache.set(self.URL, self.OPTS, {"entries": []})
+        assert cache.get(self.URL, self.OPTS) == {"entries": []}
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_key_depends_on_opts(self):
+        cache = ExtractionCache()
+        cache.set(self.URL, self.OPTS, {"entries": []})
+        assert cache.get(self.URL, {"extract_flat": False}) is None
+
+    def test_expired_entry(self):
+        cache = ExtractionCache(ttl=0)
+        cache.set(self.URL, self.OPTS, {"entries": []})
+        time.sleep(0.01)
+        assert cache.get(self.URL, self.OPTS) is None
+        assert not os.listdir(cache.directory)
+
+    def test_disabled(self):
+        cache = ExtractionCache(enabled=False)
+        cache.set(self.URL, self.OPTS, {"entries": []})
+        assert cache.get(self.URL, self.OPTS) is None
+        assert not os.path.exists(cache.directory)
+
+    def test_refresh_skips_read(self):
+        ExtractionCache().set(self.URL, self.OPTS, {"entries": []})
+        cache = ExtractionCache(refresh=True)
+        assert cache.get(self.URL, self.OPTS) is None
+        cache.set(self.URL, self.OPTS, {"entries": [1]})
+        assert ExtractionCache().get(self.URL, self.OPTS) == {"entries": [1]}
+
+    def test_lru_eviction(self):
+        cache = ExtractionCache(max_entries=2)
+        cache.set("https://youtube.com/1", self.OPTS, {"id": 1})
+        cache.set("https://youtube.com/2", self.OPTS, {"id": 2})
+
+        # Make entry 1 the most recently used
+        old = time.time() - 100
+        os.utime(cache._path(cache.make_key("https://youtube.com/2", self.OPTS)), (old, old))
+        cache.get("https://youtube.com/1", self.OPTS)
+
+        cache.set("https://youtube.com/3", self.OPTS, {"id": 3})
+        assert len(os.listdir(cache.directory)) == 2
+        assert cache.get("https://youtube.com/2", self.OPTS) is None
+        assert cache.get("https://youtube.com/1", self.OPTS) == {"id": 1}
+
+    def test_clear(self):
+        cache = ExtractionCache()
+        cache.set(self.URL, self.OPTS, {"entries": []})
+        cache.clear()
+        assert cache.get(self.URL, self.OPTS) is None
+
+    def test_stats(self):
+        cache = ExtractionCache()
+        cache.get(self.URL, self.OPTS)
+        assert cache.stats() == "[Cache] hits: 0, misses: 1"
@@ -1,4 +1,10 @@
-from ani_yt.common import BookmarkData, Current, HistoryData, Playlist, Video
+import sys
+import tracemalloc
+
+import pytest
+import ujson as json
+
+from ani_yt.common import BookmarkData, Current, HistoryData, Playlist, Video, VideoRecord
 
 
 class TestVideo:
@@ -18,6 +24,83 @@ class TestVideo:
         assert v["last_viewed"] == "2024-01-01T12:00:00"
 
 
+class TestVideoRecord:
+    def test_reads_like_a_video(self):
+        r = VideoRecord("EP 1", "https://youtube.com/1", thumbnail_url="https://i.ytimg.com/1.jpg")
+        assert r["video_url"] == "https://youtube.com/1"
+        assert r.get("status") == ""
+        assert r.get("last_viewed") is None
+        assert "thumbnail_url" in r
+        assert "last_viewed" not in r
+        with pytest.raises(KeyError):
+            r["last_viewed"]
+
+    def test_round_trip(self):
+        v: Video = {
+            "video_title": "EP 2",
+            "video_url": "https://youtube.com/2",
+            "status": "viewed",
+            "last_viewed": "2024-01-01T12:00:00",
+        }
+        r = VideoRecord.from_video(v)
+        assert r.to_video() == v
+        assert r == v
+        assert VideoRecord.from_video(r) is r
+
+    def test_write_like_a_video(self):
+        r = VideoRecord("EP 1", "https://youtube.com/1", last_viewed="2024-01-01T12:00:00")
+        r["video_title"] = "EP 1 (new)"
+        r["status"] = "".join(["view", "ed"])
+        assert r["video_title"] == "EP 1 (new)"
+        assert r.status is sys.intern("viewed")
+        assert r.pop("last_viewed") == "2024-01-01T12:00:00"
+        assert "last_viewed" not in r
+        assert r.pop("last_viewed") is None
+        with pytest.raises(KeyError):
+            r["playlist_url"] = "https://youtube.com/p"
+        with pytest.raises(KeyError):
+            r.pop("video_url")
+
+    def test_interns_url(self):
+        url = "".join(["https://youtube.com/", "3"])
+        assert VideoRecord("EP 3", url).video_url is sys.intern("https://youtube.com/3")
+
+
+class TestVideoRecordMemory:
+    """tracemalloc benchmark: memory held by 10k videos as dicts and as records."""
+
+    COUNT = 10_000
+
+    def _measure(self, build) -> int:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            videos = build()
+            used = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        assert len(videos) == self.COUNT
+        return used
+
+    def test_records_use_less_memory_than_dicts(self):
+        # Built from the JSON text, as the menu gets its videos, so the strings are counted too
+        text = json.dumps(
+            [
+                {"video_title": f"EP {i}", "video_url": f"https://youtube.com/watch?v={i:011d}", "status": ""}
+                for i in range(self.COUNT)
+            ]
+        )
+        # Grow the interpreter's intern table up front, whether its one-off resize lands
+        # inside the measurement depends on what earlier tests interned
+        warm = [sys.intern(f"warm-up {i}") for i in range(4 * self.COUNT)]
+        del warm
+
+        as_dicts = self._measure(lambda: [dict(v) for v in json.loads(text)])
+        as_records = self._measure(lambda: [VideoRecord.from_video(v) for v in json.loads(text)])
+        report = f"per {self.COUNT} videos: dicts {as_dicts / 1024:.0f} KiB, records {as_records / 1024:.0f} KiB"
+        assert as_records < as_dicts * 0.7, report
+
+
 class TestCurrent:
     def test_empty(self):
         c: Current = {}
@@ -16,6 +16,24 @@ class TestOmit:
         assert result[0]["video_url"] == "https://youtube.com/1"
         assert result[0]["status"] == ""
 
+    def test_omit_canonical_url(self):
+        data = {"entries": [{"_type": "url", "title": "V1", "url": "https://youtu.be/dQw4w9WgXcQ?t=1"}]}
+        assert dp.omit(data)[0]["video_url"] == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+    def test_omit_keeps_thumbnail(self):
+        data = {
+            "entries": [
+                {
+                    "_type": "url",
+                    "title": "V1",
+                    "url": "https://youtube.com/1",
+                    "thumbnails": [{"url": "https://i.ytimg.com/s.jpg"}, {"url": "https://i.ytimg.com/l.jpg"}],
+                }
+            ]
+        }
+        result = dp.omit(data)
+        assert result[0]["thumbnail_url"] == "https://i.ytimg.com/l.jpg"
+
     def test_omit_with_status(self):
         data = {"entries": [{"_type": "url", "title": "V1", "url": "https://youtube.com/1"}]}
         result = dp.omit(data, status="viewed")
@@ -32,6 +50,51 @@ class TestOmit:
         assert len(result) == 1
 
 
+class TestIterOmit:
+    def test_lazy(self):
+        entries = iter([{"_type": "url", "title": "V1", "url": "https://youtube.com/1"}])
+        result = dp.iter_omit(entries)
+        assert next(result)["video_title"] == "V1"
+
+
+class TestOmitUntilKnown:
+    @staticmethod
+    def _entries(n, consumed):
+        for i in range(n):
+            consumed.append(i)
+            yield {"_type": "url", "title": f"V{i}", "url": f"https://youtube.com/{i}"}
+
+    def test_stops_after_known_run(self):
+        consumed = []
+        known = [f"https://youtube.com/{i}" for i in reversed(range(2, 100))]
+        result = dp.omit_until_known(self._entries(100, consumed), known, known_run=3)
+        assert [v["video_title"] for v in result] == ["V0", "V1", "V2", "V3", "V4"]
+        assert consumed == [0, 1, 2, 3, 4]
+
+    def test_newest_first_without_new_videos_stops_at_known_run(self):
+        consumed = []
+        known = [f"https://youtube.com/{i}" for i in reversed(range(500))]
+        result = dp.omit_until_known(self._entries(500, consumed), known, known_run=3)
+        assert len(result) == 3
+        assert consumed == [0, 1, 2]
+
+    def test_run_resets_on_new_video(self):
+        known = ["https://youtube.com/2", "https://youtube.com/0"]
+        result = dp.omit_until_known(self._entries(4, []), known, known_run=2)
+        assert len(result) == 4
+
+    def test_oldest_first_reads_to_the_end(self):
+        consumed = []
+        known = [f"https://youtube.com/{i}" for i in range(10)]
+        result = dp.omit_until_known(self._entries(12, consumed), known, known_run=3)
+        assert [v["video_title"] for v in result][-2:] == ["V10", "V11"]
+        assert consumed == list(range(12))
+
+    def test_skips_non_url(self):
+        entries = [{"_type": "playlist", "title": "P", "url": "https://youtube.com/p"}]
+        assert dp.omit_until_known(entries, []) == []
+
+
 class TestSplitList:
     def test_split_even(self):
         assert dp.split_list([1, 2, 3, 4], 2) == [[1, 2], [3, 4]]
@@ -80,6 +143,17 @@ class TestMergeList:
         result = dp.merge_list(old, new, truncate=True)
         assert len(result) == 1
 
+    def test_merge_matches_url_forms(self):
+        old = [{"video_title": "A", "video_url": "https://youtu.be/dQw4w9WgXcQ", "status": "viewed"}]
+        new = [
+            {"video_title": "A", "video_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "status": ""},
+            {"video_title": "A", "video_url": "https://www.youtube.com/shorts/dQw4w9WgXcQ", "status": ""},
+        ]
+        result = dp.merge_list(old, new, truncate=True)
+        assert len(result) == 1
+        assert result[0]["status"] == "viewed"
+        assert result[0]["video_url"] == "https://www.youtube.com/shorts/dQw4w9WgXcQ"
+
 
 class TestMergeListPreserveOrder:
     def test_preserve_order(self):
@@ -95,6 +169,11 @@ class TestMergeListPreserveOrder:
         result = dp.merge_list_preserve_order(old, new)
         assert len(result) == 2
 
+    def test_no_duplicates_across_url_forms(self):
+        old = [("P", "https://www.youtube.com/playlist?list=PLabc")]
+        new = [("P", "https://youtube.com/playlist?list=PLabc&si=share")]
+        assert dp.merge_list_preserve_order(old, new) == old
+
 
 class TestMergeArgs:
     def test_merge_extra_first(self):
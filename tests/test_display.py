@@ -1,4 +1,9 @@
-from ani_yt.display import BACK_SENTINEL, Display_Options
+from ani_yt.bookmarking_handler import BookmarkingHandler
+from ani_yt.display import BACK_SENTINEL, Display_Options, DisplayMenu
+from ani_yt.helper import LegacyCompatibility
+from ani_yt.history_handler import HistoryHandler
+from ani_yt.thumbnail_handler import ThumbnailHandler
+from ani_yt.yt_dlp_handler import YT_DLP_Options, YT_DLP_Stream
 
 
 class TestDisplayOptions:
@@ -22,3 +27,197 @@ class TestBackSentinel:
         title, url = BACK_SENTINEL
         assert title == "__BACK__"
         assert url == ""
+
+
+class TestDisplayMenuStream:
+    def _make_menu(self):
+        return DisplayMenu(
+            Display_Options(),
+            extra_opts={
+                "yt-dlp": YT_DLP_Options(),
+                "mode": "auto",
+                "bookmark": BookmarkingHandler(),
+                "history": HistoryHandler(),
+                "thumbnail": ThumbnailHandler(YT_DLP_Options()),
+            },
+        )
+
+    def test_sync_stream_keeps_selected_video(self):
+        menu = self._make_menu()
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options())
+        stream.videos = [{"video_title": "EP 2", "video_url": "https://youtube.com/2", "status": ""}]
+        menu.stream = stream
+        menu.sync_stream()
+        menu.choosed_item = 0
+
+        stream.videos = [
+            {"video_title": "EP 1", "video_url": "https://youtube.com/1", "status": ""},
+            {"video_title": "EP 2", "video_url": "https://youtube.com/2", "status": ""},
+        ]
+        menu.sync_stream()
+        assert menu.loading
+        assert len(menu.data) == 2
+        assert menu.choosed_item == 1
+
+    def test_stream_changed(self):
+        menu = self._make_menu()
+        assert not menu.stream_changed()
+
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options())
+        stream.videos = [{"video_title": "EP 1", "video_url": "https://youtube.com/1", "status": ""}]
+        menu.stream = stream
+        menu.sync_stream()
+        assert not menu.stream_changed()
+
+        stream.videos = stream.videos + [{"video_title": "EP 2", "video_url": "https://youtube.com/2", "status": ""}]
+        assert menu.stream_changed()
+        menu.sync_stream()
+        stream.done.set()
+        assert menu.stream_changed()
+
+    def test_sync_stream_done(self):
+        menu = self._make_menu()
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options())
+        stream.done.set()
+        menu.stream = stream
+        menu.sync_stream()
+        assert not menu.loading
+
+
+class TestDisplayMenuPredictNext:
+    def test_predict_next_video(self):
+        menu = TestDisplayMenuStream()._make_menu()
+        menu.data = [
+            {"video_title": "EP 1", "video_url": "https://youtube.com/1", "status": ""},
+            {"video_title": "EP 2", "video_url": "https://youtube.com/2", "status": ""},
+        ]
+        menu.choosed_item = 1
+        assert menu.predict_next_video("https://youtube.com/1")["video_url"] == "https://youtube.com/2"
+        assert menu.predict_next_video("https://youtube.com/2") is None
+
+        menu.history_map["https://youtube.com/2"] = "viewed"
+        assert menu.predict_next_video("https://youtube.com/1") is None
+
+
+class TestDisplayMenuHistory:
+    def test_toggles_are_written_on_flush(self):
+        history = HistoryHandler()
+        history.update(
+            curr={"playlist_url": "https://youtube.com/p"},
+            videos=[{"video_title": "EP 1", "video_url": "https://youtube.com/1", "status": ""}],
+        )
+        menu = TestDisplayMenuStream()._make_menu()
+        menu.history_handler = history
+
+        menu.toggle_viewed_status("https://youtube.com/1")
+        menu.toggle_viewed_status("https://youtube.com/1")
+        menu.toggle_viewed_status("https://youtube.com/1")
+        assert menu.history_map["https://youtube.com/1"] == "viewed"
+        assert history.load()["playlists"][0]["videos"][0]["status"] == ""
+
+        menu.flush_history()
+        assert menu.history_session is None
+        assert history.load()["playlists"][0]["videos"][0]["status"] == "viewed"
+
+
+class TestDisplayMenuFilter:
+    TITLES = ["One Piece EP 1", "One Piece EP 2", "Naruto EP 1", "Naruto EP 2", "One Punch Man EP 1"]
+
+    def _make_menu(self, keys=()):
+        menu = TestDisplayMenuStream()._make_menu()
+        menu.data = LegacyCompatibility.normalize_playlist(
+            [(title, f"https://youtube.com/{i}") for i, title in enumerate(self.TITLES)]
+        )
+        menu.opts.items_per_list = 2
+        menu.pagination()
+        menu.choosed_item = 0
+        menu.clscr = lambda: None
+        keys = iter(keys)
+        menu.read_key = lambda: next(keys)
+        return menu
+
+    def _titles(self, menu):
+        return [video["video_title"] for video in menu.data]
+
+    def test_push_refines_and_pop_restores(self):
+        menu = self._make_menu()
+        menu.start_filter()
+        for char in "one p":
+            menu.filter_push(char)
+        wide = menu.data
+        assert self._titles(menu) == ["One Piece EP 1", "One Piece EP 2", "One Punch Man EP 1"]
+
+        menu.filter_push("i")
+        assert self._titles(menu) == ["One Piece EP 1", "One Piece EP 2"]
+        assert menu.filter_pop()
+        assert menu.data == wide
+        assert menu.filter_query == "one p"
+
+    def test_every_word_must_match(self):
+        menu = self._make_menu()
+        menu.start_filter()
+        for char in "ep 2 naruto":
+            menu.filter_push(char)
+        assert self._titles(menu) == ["Naruto EP 2"]
+
+    def test_refines_only_previous_result(self):
+        menu = self._make_menu()
+        menu.start_filter()
+        menu.filter_push("r")
+        checked = []
+        titles = menu._filter_titles
+        menu._filter_titles = type("Spy", (), {"__getitem__": lambda _, row: checked.append(row) or titles[row]})()
+        menu.filter_push("u")
+        assert checked == [2, 3]
+        assert self._titles(menu) == ["Naruto EP 1", "Naruto EP 2"]
+
+    def test_filter_menu_keeps_result(self):
+        menu = self._make_menu(keys=["n", "a", "r", "\x7f", "r", "\x1b[A", "\r"])
+        menu.filter_menu()
+        assert menu.filter_query == "nar"
+        assert not menu.filter_editing
+        assert self._titles(menu) == ["Naruto EP 1", "Naruto EP 2"]
+        # Pages and the cursor cover the filtered videos only
+        assert menu.len_data == 1
+        assert menu.total_items == 2
+        assert menu.choosed_item == 0
+
+    def test_unviewed_cursor_in_filtered_view(self):
+        menu = self._make_menu(keys=["n", "a", "r", "\r"])
+        menu.history_map = {"https://youtube.com/2": "viewed"}
+        menu.filter_menu()
+        assert menu.data[menu.choosed_item]["video_title"] == "Naruto EP 2"
+
+    def test_backspace_on_empty_filter_clears_it(self):
+        menu = self._make_menu(keys=["n", "\x7f", "\x7f"])
+        menu.filter_menu()
+        assert not menu.filter_active
+        assert self._titles(menu) == self.TITLES
+
+    def test_enter_without_match_clears_filter(self):
+        menu = self._make_menu(keys=["x", "y", "z", "\r"])
+        menu.filter_menu()
+        assert not menu.filter_active
+        assert len(menu.data) == len(self.TITLES)
+
+    def test_clear_keeps_selected_video(self):
+        menu = self._make_menu(keys=["n", "a", "r", "\r"])
+        menu.filter_menu()
+        menu.choosed_item = 1
+        menu.clear_filter()
+        assert menu.data[menu.choosed_item]["video_title"] == "Naruto EP 2"
+        assert menu.filter_query == ""
+
+    def test_stream_update_is_filtered(self):
+        menu = self._make_menu()
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options())
+        stream.videos = [{"video_title": t, "video_url": f"https://youtube.com/{i}"} for i, t in enumerate(self.TITLES)]
+        menu.stream = stream
+        menu.start_filter()
+        for char in "naruto":
+            menu.filter_push(char)
+
+        stream.videos.append({"video_title": "Naruto EP 3", "video_url": "https://youtube.com/9"})
+        menu.sync_stream()
+        assert self._titles(menu) == ["Naruto EP 1", "Naruto EP 2", "Naruto EP 3"]
+        assert len(menu.filter_base()) == 6
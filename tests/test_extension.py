@@ -0,0 +1,97 @@
+import time
+from unittest.mock import patch
+
+import pytest
+import ujson as json
+
+from ani_yt.extension import Extension
+
+
+@pytest.fixture(autouse=True)
+def reset_extension():
+    yield
+    Extension.check_update_enabled = True
+    Extension.check_interval = 24 * 60 * 60
+    Extension._update_info = None
+    Extension._thread = None
+
+
+class TestCheckModuleUpdate:
+    def test_is_up_to_date(self):
+        assert Extension.CheckModuleUpdate.is_up_to_date("2024.3.10", "2024.3.10")
+        assert Extension.CheckModuleUpdate.is_up_to_date("2024.4.9", "2024.3.10")
+        assert not Extension.CheckModuleUpdate.is_up_to_date("2024.3.10", "2024.3.10.1")
+
+    def test_normalize_version(self):
+        assert Extension.CheckModuleUpdate.normalize_version("2024.03.01") == "2024.3.1"
+        assert Extension.CheckModuleUpdate.normalize_version("1.0.dev0") == "1.0.dev0"
+
+    @patch.object(Extension.CheckModuleUpdate, "installed_version", return_value="2024.3.10")
+    @patch.object(Extension.CheckModuleUpdate, "fetch_latest_version", return_value="2024.04.09")
+    def test_fetches_and_caches(self, mock_fetch, mock_installed):
+        result = Extension.CheckModuleUpdate.check_yt_dlp()
+        assert result == (False, "yt-dlp", "2024.3.10", "2024.4.9")
+
+        with open(Extension.cache_filename, encoding="utf-8") as f:
+            assert json.load(f)["yt-dlp"]["latest"] == "2024.04.09"
+
+        # A second check within the interval reuses the cached result
+        Extension.CheckModuleUpdate.check_yt_dlp()
+        mock_fetch.assert_called_once()
+
+    @patch.object(Extension.CheckModuleUpdate, "installed_version", return_value="2024.3.10")
+    @patch.object(Extension.CheckModuleUpdate, "fetch_latest_version", return_value="2024.3.10")
+    def test_expired_cache_fetches_again(self, mock_fetch, mock_installed):
+        with open(Extension.cache_filename, "w", encoding="utf-8") as f:
+            json.dump({"yt-dlp": {"checked_at": time.time() - 10, "latest": "2024.1.1"}}, f)
+
+        Extension.check_interval = 5
+        assert Extension.CheckModuleUpdate.check_yt_dlp()[0]
+        mock_fetch.assert_called_once()
+
+    @patch.object(Extension.CheckModuleUpdate, "installed_version", return_value="2024.3.10")
+    @patch.object(Extension.CheckModuleUpdate, "fetch_latest_version", return_value=None)
+    def test_unreachable_is_not_cached(self, mock_fetch, mock_installed):
+        assert Extension.CheckModuleUpdate.check_yt_dlp()[0]
+        assert Extension.CheckModuleUpdate.load_cache("yt-dlp") is None
+
+    @pytest.mark.parametrize("payload", [[], None, {"yt-dlp": "2024.1.1"}])
+    @patch.object(Extension.CheckModuleUpdate, "installed_version", return_value="2024.3.10")
+    @patch.object(Extension.CheckModuleUpdate, "fetch_latest_version", return_value="2024.3.10")
+    def test_malformed_cache_is_reset(self, mock_fetch, mock_installed, payload):
+        with open(Extension.cache_filename, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+        assert Extension.CheckModuleUpdate.check_yt_dlp()[0]
+        mock_fetch.assert_called_once()
+        assert Extension.CheckModuleUpdate.load_cache("yt-dlp") == "2024.3.10"
+
+
+class TestCheckModuleUpdateWrapper:
+    def test_exit_does_not_wait_for_check(self):
+        calls = []
+        wrapped = Extension.check_module_update(lambda: calls.append(True))
+
+        with patch.object(Extension.CheckModuleUpdate, "print_notice") as mock_notice:
+            wrapped()
+        assert calls == [True]
+        mock_notice.assert_not_called()
+
+    def test_exit_prints_ready_result(self):
+        Extension._update_info = (False, "yt-dlp", "1.0", "2.0")
+        wrapped = Extension.check_module_update(lambda: None)
+
+        with patch.object(Extension.CheckModuleUpdate, "print_notice") as mock_notice:
+            wrapped()
+        mock_notice.assert_called_once_with(Extension._update_info)
+
+    @patch.object(Extension.CheckModuleUpdate, "check_yt_dlp", return_value=(True, "yt-dlp", "1.0", "1.0"))
+    def test_start_update_check_runs_in_background(self, mock_check):
+        Extension.start_update_check()
+        Extension._thread.join(timeout=5)
+        assert Extension._update_info == (True, "yt-dlp", "1.0", "1.0")
+
+    def test_start_update_check_disabled(self):
+        Extension.check_update_enabled = False
+        Extension.start_update_check()
+        assert Extension._thread is None
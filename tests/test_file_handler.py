@@ -1,22 +1,56 @@
 import os
 
-from ani_yt.file_handler import FileHandler, FileSourceHandler
+import pytest
+import ujson as json
+
+from ani_yt.file_handler import FileHandler, FileSourceHandler, PlaylistSearchIndex
 
 
 class TestFileHandler:
     def test_dump_and_load(self):
         fh = FileHandler()
-        data = [["Title1", "https://youtube.com/1"], ["Title2", "https://youtube.com/2"]]
+        data = [["Title1", "https://youtube.com/1"], ["Tiêu đề 2", "https://youtube.com/2"]]
         fh.dump(data)
-        loaded = fh.load()
-        assert loaded == data
+        with fh.load() as loaded:
+            assert [list(item) for item in loaded] == data
+            assert len(loaded) == 2
+            assert loaded[-1] == ("Tiêu đề 2", "https://youtube.com/2")
+            assert list(loaded.titles()) == ["Title1", "Tiêu đề 2"]
+            with pytest.raises(IndexError):
+                loaded[2]
 
     def test_load_empty_file(self):
         fh = FileHandler()
         os.makedirs("data", exist_ok=True)
-        with open(fh.filename, "w") as f:
+        with open(fh.json_filename, "w") as f:
             f.write("[]")
-        assert fh.load() == []
+        assert len(fh.load()) == 0
+
+    def test_migrates_json_cache(self):
+        fh = FileHandler()
+        data = [["Title1", "https://youtube.com/1"]]
+        with open(fh.json_filename, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        with fh.load() as loaded:
+            assert [list(item) for item in loaded] == data
+        assert os.path.exists(fh.filename)
+        assert not os.path.exists(fh.json_filename)
+
+    def test_invalid_cache_is_dropped(self):
+        fh = FileHandler()
+        with open(fh.filename, "wb") as f:
+            f.write(b"[]")
+        with pytest.raises(FileNotFoundError):
+            fh.load()
+        assert not os.path.exists(fh.filename)
+
+    def test_export_json(self):
+        fh = FileHandler()
+        data = [["Title1", "https://youtube.com/1"]]
+        fh.dump(data)
+        fh.export_json("export.json")
+        with open("export.json", encoding="utf-8") as f:
+            assert json.load(f) == data
 
     def test_clear_cache(self):
         fh = FileHandler()
@@ -24,6 +58,74 @@ class TestFileHandler:
         assert os.path.exists(fh.filename)
         fh.clear_cache()
         assert not os.path.exists(fh.filename)
+        assert not os.path.exists(fh.index_filename)
+
+
+class TestPlaylistSearchIndex:
+    DATA = [
+        ["One Piece EP 1", "https://youtube.com/1"],
+        ["Naruto Shippuden", "https://youtube.com/2"],
+        ["ONE PUNCH MAN", "https://youtube.com/3"],
+    ]
+
+    def test_dump_writes_index(self):
+        fh = FileHandler()
+        fh.dump(self.DATA)
+        with fh.load() as view:
+            assert view.index is not None
+            assert view.index.count == 3
+
+    def test_candidates(self):
+        fh = FileHandler()
+        fh.dump(self.DATA)
+        with fh.load() as view:
+            assert view.candidates({"one"}) == [0, 2]
+            assert view.candidates({"pie"}) == [0]
+            assert view.candidates({"ippu"}) == [1]
+            assert view.candidates({"n"}) == [0, 1, 2]
+            assert view.candidates({"piece", "naruto"}) == [0, 1]
+            assert view.candidates({"bleach"}) == []
+            assert view.candidates(set()) == []
+
+    def test_missing_index_is_rebuilt(self):
+        fh = FileHandler()
+        fh.dump(self.DATA)
+        os.remove(fh.index_filename)
+        with fh.load() as view:
+            assert view.candidates({"naruto"}) == [1]
+        assert os.path.exists(fh.index_filename)
+
+    def test_stale_index_is_rebuilt(self):
+        fh = FileHandler()
+        fh.dump(self.DATA)
+        with open(fh.index_filename, "rb") as f:
+            stale = f.read()
+        fh.dump(self.DATA[:1])
+        with open(fh.index_filename, "wb") as f:
+            f.write(stale)
+        with fh.load() as view:
+            assert view.candidates({"naruto"}) == []
+            assert view.candidates({"piece"}) == [0]
+
+    def test_invalid_index_is_rebuilt(self):
+        fh = FileHandler()
+        fh.dump(self.DATA)
+        with open(fh.index_filename, "wb") as f:
+            f.write(b"garbage")
+        with fh.load() as view:
+            assert view.candidates({"naruto"}) == [1]
+
+    def test_invalid_file(self):
+        with open("data/bad.idx", "wb") as f:
+            f.write(b"AYTI")
+        with pytest.raises(ValueError):
+            PlaylistSearchIndex("data/bad.idx")
+
+    def test_empty_cache(self):
+        fh = FileHandler()
+        fh.dump([])
+        with fh.load() as view:
+            assert view.candidates({"one"}) == []
 
 
 class TestFileSourceHandler:
@@ -1,4 +1,7 @@
-from ani_yt.helper import FormatHelper, LegacyCompatibility
+import pytest
+
+from ani_yt.common import VideoRecord
+from ani_yt.helper import FormatHelper, LazyModule, LegacyCompatibility
 
 
 class TestLegacyCompatibility:
@@ -21,6 +24,7 @@ class TestLegacyCompatibility:
         inp = [{"video_title": "Title", "video_url": "https://youtube.com/v", "status": "viewed"}]
         result = LegacyCompatibility.normalize_playlist(inp)
         assert result[0]["status"] == "viewed"
+        assert isinstance(result[0], VideoRecord)
 
     def test_normalize_empty(self):
         assert LegacyCompatibility.normalize_playlist([]) == []
@@ -37,3 +41,14 @@ class TestFormatHelper:
         result = FormatHelper.beautify_json({"a": 1, "b": [2]})
         assert "a" in result
         assert "b" in result
+
+
+class TestLazyModule:
+    def test_resolves_attribute_on_access(self):
+        lazy = LazyModule("json")
+        assert lazy.dumps([1]) == "[1]"
+
+    def test_missing_module_raises_on_access(self):
+        lazy = LazyModule("ani_yt_missing_module")
+        with pytest.raises(ModuleNotFoundError):
+            lazy.anything
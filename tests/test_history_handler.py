@@ -1,7 +1,11 @@
 import os
+import time
+from unittest.mock import patch
 
 import pytest
+import ujson as json
 
+from ani_yt.common import VideoRecord
 from ani_yt.history_handler import HistoryHandler
 
 
@@ -57,6 +61,19 @@ class TestHistoryHandler:
         data = h.load()
         assert len(data["playlists"][0]["videos"]) == 2
 
+    def test_videos_loaded_as_records(self):
+        h = self._make_handler()
+        curr = {"playlist_url": "https://youtube.com/p"}
+        h.update(curr=curr, videos=[{"video_title": "E1", "video_url": "https://youtube.com/1", "status": ""}])
+        h.set_video_status("https://youtube.com/1", "viewed")
+        # Merged into the loaded records in place
+        h.update(curr=curr, videos=[{"video_title": "E1 (new)", "video_url": "https://youtube.com/1", "status": ""}])
+
+        videos = h.load()["playlists"][0]["videos"]
+        assert all(isinstance(v, VideoRecord) for v in videos)
+        assert videos[0]["video_title"] == "E1 (new)"
+        assert videos[0]["status"] == "viewed"
+
     def test_replace_playlists(self):
         h = self._make_handler()
         playlists = [
@@ -86,6 +103,12 @@ class TestHistoryHandler:
         assert p_idx == 0
         assert v_idx == 1
 
+    def test_get_playlist(self):
+        h = self._make_handler()
+        history = {"current": {}, "playlists": [{"playlist_url": "https://youtube.com/p", "videos": []}]}
+        assert h.get_playlist("https://youtube.com/p", history)["playlist_url"] == "https://youtube.com/p"
+        assert h.get_playlist("https://youtube.com/x", history) is None
+
     def test_search_not_found(self):
         h = self._make_handler()
         history = {"current": {}, "playlists": []}
@@ -120,3 +143,252 @@ class TestHistoryHandler:
         assert h.is_history()
         h.delete_history()
         assert not h.is_history()
+
+    def test_set_video_status(self):
+        h = self._make_handler()
+        videos = [{"video_title": "E1", "video_url": "https://youtube.com/1", "status": ""}]
+        h.update(curr={"playlist_url": "https://youtube.com/p"}, videos=videos)
+
+        assert h.set_video_status("https://youtube.com/1", "viewed")
+        video = h.load()["playlists"][0]["videos"][0]
+        assert video["status"] == "viewed"
+        assert "last_viewed" in video
+
+        assert h.set_video_status("https://youtube.com/1", "")
+        video = h.load()["playlists"][0]["videos"][0]
+        assert video["status"] == ""
+        assert "last_viewed" not in video
+
+    def test_set_video_status_not_found(self):
+        h = self._make_handler()
+        h.update(curr={"playlist_url": "https://youtube.com/p"})
+        assert not h.set_video_status("https://youtube.com/x", "viewed")
+
+    def test_export_json(self):
+        h = self._make_handler()
+        videos = [{"video_title": "E1", "video_url": "https://youtube.com/1", "status": ""}]
+        h.update(curr={"playlist_title": "P", "playlist_url": "https://youtube.com/p"}, videos=videos)
+        h.export_json("exported.json")
+
+        with open("exported.json", encoding="utf-8") as f:
+            exported = json.load(f)
+        assert exported == h.load()
+
+
+class TestHistorySession:
+    CURR = {"playlist_title": "P", "playlist_url": "https://youtube.com/p"}
+    VIDEOS = [
+        {"video_title": "E1", "video_url": "https://youtube.com/1", "status": ""},
+        {"video_title": "E2", "video_url": "https://youtube.com/2", "status": ""},
+    ]
+
+    def _make_handler(self):
+        h = HistoryHandler()
+        h.update(curr=self.CURR, videos=[dict(v) for v in self.VIDEOS])
+        return h
+
+    def test_batches_changes_into_one_write(self):
+        h = self._make_handler()
+        with patch.object(h, "_write", wraps=h._write) as mock_write:
+            with h.session() as session:
+                session.update(curr=self.CURR, viewed=True)
+                session.set_video_status("https://youtube.com/1", "viewed")
+                session.set_video_status("https://youtube.com/2", "viewed")
+        mock_write.assert_called_once()
+
+        videos = h.load()["playlists"][0]["videos"]
+        assert [v["status"] for v in videos] == ["viewed", "viewed"]
+
+    def test_unchanged_update_does_not_write(self):
+        h = self._make_handler()
+        with patch.object(h, "_write") as mock_write:
+            h.update(curr=self.CURR, videos=[dict(v) for v in self.VIDEOS])
+            h.set_video_status("https://youtube.com/1", "")
+        mock_write.assert_not_called()
+
+    def test_rollback_on_error(self):
+        h = self._make_handler()
+        with pytest.raises(RuntimeError):
+            with h.session() as session:
+                session.set_video_status("https://youtube.com/1", "viewed")
+                raise RuntimeError
+        assert h.load()["playlists"][0]["videos"][0]["status"] == ""
+
+    def test_write_is_atomic(self):
+        h = self._make_handler()
+        h.set_video_status("https://youtube.com/1", "viewed")
+        assert not os.path.exists(f"{h.filename}.tmp")
+
+    def test_flush_delay(self):
+        h = self._make_handler()
+        session = h.session(flush_delay=0.05)
+        session.set_video_status("https://youtube.com/1", "viewed")
+        assert session.dirty
+
+        session._timer.join(timeout=5)
+        assert not session.dirty
+        assert h.load()["playlists"][0]["videos"][0]["status"] == "viewed"
+
+    def test_index_lookups(self):
+        h = self._make_handler()
+        with h.session() as session:
+            assert session.playlist_index("https://youtube.com/p") == 0
+            assert session.playlist_index("https://youtube.com/missing") == -1
+            assert session.video_position("https://youtube.com/2") == (0, 1)
+            assert session.video_position("https://youtube.com/missing") == (-1, -1)
+
+    def test_lookup_by_other_url_form(self):
+        h = self._make_handler()
+        h.update(
+            curr={"playlist_title": "Y", "playlist_url": "https://www.youtube.com/playlist?list=PLabc"},
+            videos=[{"video_title": "Y1", "video_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "status": ""}],
+        )
+        with h.session() as session:
+            assert session.playlist_index("https://youtube.com/playlist?list=PLabc&si=x") != -1
+            assert session.set_video_status("https://youtu.be/dQw4w9WgXcQ", "viewed")
+        with h.session() as session:
+            p_idx, v_idx = session.video_position("https://www.youtube.com/shorts/dQw4w9WgXcQ")
+            assert session.history["playlists"][p_idx]["videos"][v_idx]["status"] == "viewed"
+
+    def test_index_follows_update(self):
+        h = self._make_handler()
+        other = {"playlist_title": "Q", "playlist_url": "https://youtube.com/q"}
+        with h.session() as session:
+            assert session.video_position("https://youtube.com/1") == (0, 0)
+
+            session.update(
+                curr=self.CURR,
+                videos=[{"video_title": "E3", "video_url": "https://youtube.com/3", "status": ""}],
+            )
+            assert session.video_position("https://youtube.com/3") == (0, 0)
+            assert session.video_position("https://youtube.com/1") == (-1, -1)
+
+            session.update(
+                curr=other,
+                videos=[
+                    {"video_title": "E3", "video_url": "https://youtube.com/3", "status": ""},
+                    {"video_title": "F1", "video_url": "https://youtube.com/f1", "status": ""},
+                ],
+            )
+            assert session.playlist_index("https://youtube.com/q") == 1
+            assert session.video_position("https://youtube.com/f1") == (1, 1)
+            # The first playlist holding a url wins, as with a linear search
+            assert session.video_position("https://youtube.com/3") == (0, 0)
+
+        with h.session() as session:
+            assert session.video_position("https://youtube.com/f1") == (1, 1)
+
+    def test_session_without_history_file(self):
+        h = HistoryHandler()
+        with h.session() as session:
+            assert session.history == {"current": {}, "playlists": []}
+        assert not h.is_history()
+
+
+class TestHistoryJournal:
+    def _make_handler(self):
+        h = HistoryHandler()
+        h.update(curr=TestHistorySession.CURR, videos=[dict(v) for v in TestHistorySession.VIDEOS])
+        return h
+
+    def test_status_change_is_appended(self):
+        h = self._make_handler()
+        with patch.object(h, "_write") as mock_write:
+            h.set_video_status("https://youtube.com/1", "viewed")
+            h.set_video_status("https://youtube.com/2", "viewed")
+        mock_write.assert_not_called()
+
+        with open(h.journal_filename, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        assert [(e["video_url"], e["status"]) for e in events] == [
+            ("https://youtube.com/1", "viewed"),
+            ("https://youtube.com/2", "viewed"),
+        ]
+
+    def test_load_replays_journal(self):
+        h = self._make_handler()
+        h.set_video_status("https://youtube.com/1", "viewed")
+        h.set_video_status("https://youtube.com/2", "viewed")
+        h.set_video_status("https://youtube.com/1", "")
+
+        videos = HistoryHandler().load()["playlists"][0]["videos"]
+        assert [v["status"] for v in videos] == ["", "viewed"]
+        assert "last_viewed" not in videos[0]
+        assert "last_viewed" in videos[1]
+
+    def test_truncated_line_is_skipped(self):
+        h = self._make_handler()
+        h.set_video_status("https://youtube.com/1", "viewed")
+        with open(h.journal_filename, "a", encoding="utf-8") as f:
+            f.write('{"playlist_url": "https://youtube.com/p", "video_url"')
+        assert h.load()["playlists"][0]["videos"][0]["status"] == "viewed"
+
+    def test_compact(self):
+        h = self._make_handler()
+        h.set_video_status("https://youtube.com/1", "viewed")
+        h.compact()
+        assert not os.path.exists(h.journal_filename)
+        with open(h.filename, encoding="utf-8") as f:
+            assert json.load(f)["playlists"][0]["videos"][0]["status"] == "viewed"
+
+    def test_compacts_past_threshold(self):
+        h = self._make_handler()
+        h.journal_max_bytes = 0
+        h.set_video_status("https://youtube.com/1", "viewed")
+        h._compactor.join(timeout=5)
+        assert not os.path.exists(h.journal_filename)
+        with open(h.filename, encoding="utf-8") as f:
+            assert json.load(f)["playlists"][0]["videos"][0]["status"] == "viewed"
+
+    def test_structural_write_clears_journal(self):
+        h = self._make_handler()
+        h.set_video_status("https://youtube.com/1", "viewed")
+        h.update(curr=TestHistorySession.CURR, viewed=True)
+        assert not os.path.exists(h.journal_filename)
+        with open(h.filename, encoding="utf-8") as f:
+            assert json.load(f)["playlists"][0]["videos"][0]["status"] == "viewed"
+
+    def test_delete_history_removes_journal(self):
+        h = self._make_handler()
+        h.set_video_status("https://youtube.com/1", "viewed")
+        h.delete_history()
+        assert not os.path.exists(h.journal_filename)
+
+
+class TestHistoryIndexBenchmark:
+    """Lookup cost must stay flat as the history grows, the indexes replace a scan of every video."""
+
+    PLAYLIST_SIZE = 100
+
+    def _lookup_time(self, total_videos: int) -> float:
+        playlists = [
+            {
+                "playlist_title": f"P{p}",
+                "playlist_url": f"https://youtube.com/p{p}",
+                "videos": [
+                    {"video_title": f"E{v}", "video_url": f"https://youtube.com/p{p}/{v}", "status": ""}
+                    for v in range(self.PLAYLIST_SIZE)
+                ],
+            }
+            for p in range(total_videos // self.PLAYLIST_SIZE)
+        ]
+        last = playlists[-1]
+        session = HistoryHandler().session()
+        session.update(playlists=playlists)
+        session.video_position(last["videos"][-1]["video_url"])  # builds the indexes
+
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(1000):
+                session.video_position(last["videos"][-1]["video_url"])
+                session.playlist_index(last["playlist_url"])
+            best = min(best, time.perf_counter() - start)
+        session.rollback()
+        return best
+
+    def test_lookup_cost_is_flat(self):
+        small = self._lookup_time(1_000)
+        large = self._lookup_time(100_000)
+        # A linear search would be ~100 times slower on the large history
+        assert large < small * 5
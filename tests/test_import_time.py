@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ani_yt
+
+# Modules only needed once the network is touched or a key is read
+HEAVY_MODULES = (
+    "yt_dlp",
+    "rapidfuzz",
+    "requests",
+    "urllib.request",
+    "readchar",
+    "ani_yt.readchar_posix",
+    "ani_yt.readchar_win",
+)
+# Cumulative import time of the CLI entry module in microseconds, wall-clock checks are opt-in
+STARTUP_BUDGET_US = int(os.environ.get("ANI_YT_STARTUP_BUDGET_US", "0"))
+
+
+def run_python(*args):
+    """Run python in a fresh interpreter that imports this checkout, return the completed process."""
+    env = dict(os.environ)
+    src = os.path.dirname(os.path.dirname(os.path.abspath(ani_yt.__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=True)
+
+
+def loaded_modules(module):
+    """Return the names in `sys.modules` after importing `module` in a fresh interpreter."""
+    result = run_python("-c", f"import sys, {module}; print('\\n'.join(sys.modules))")
+    return set(result.stdout.split())
+
+
+def import_times(module="ani_yt.args_interface"):
+    """Run `python -X importtime` in a fresh interpreter and return {module: cumulative us}."""
+    result = run_python("-X", "importtime", "-c", f"import {module}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime:
+    @pytest.mark.parametrize("module", ["ani_yt", "ani_yt.args_interface", "ani_yt.main"])
+    def test_heavy_modules_not_loaded(self, module):
+        modules = loaded_modules(module)
+        assert module in modules
+        for name in HEAVY_MODULES:
+            assert not {m for m in modules if m == name or m.startswith(f"{name}.")}
+
+    @pytest.mark.skipif(not STARTUP_BUDGET_US, reason="set ANI_YT_STARTUP_BUDGET_US to check the startup time")
+    def test_startup_budget(self):
+        # Best of a few runs, the first one may pay for a cold disk cache
+        best = min(import_times()["ani_yt.args_interface"] for _ in range(3))
+        assert best < STARTUP_BUDGET_US
@@ -1,4 +1,6 @@
-from ani_yt.input_handler import InputState, OnPressed, ReturnCode
+from unittest.mock import patch
+
+from ani_yt.input_handler import InputHandler, InputState, OnPressed, ReturnCode
 
 
 class TestInputState:
@@ -88,3 +90,28 @@ class TestOnPressed:
         ih = InputHandler()
         OnPressed(ih).default("x")
         assert ih.state.get_value() == "x"
+
+    def test_slash_starts_filter_on_empty_line(self):
+        from ani_yt.input_handler import InputHandler
+
+        ih = InputHandler()
+        assert OnPressed(ih).slash("/") == "FILTER"
+        ih.state.set_str("a")
+        assert OnPressed(ih).slash("/") == "CONTINUE"
+        assert ih.state.get_value() == "a/"
+
+
+class TestGetInput:
+    @patch("ani_yt.input_handler.readchar")
+    def test_idle_redraws_before_first_key(self, mock_readchar):
+        mock_readchar.key_ready.return_value = False
+        checks = iter([False, True])
+        assert InputHandler().get_input(idle=lambda: next(checks)) == ReturnCode.REDRAW
+        mock_readchar.readkey.assert_not_called()
+
+    @patch("ani_yt.input_handler.readchar")
+    def test_idle_not_checked_once_typing(self, mock_readchar):
+        mock_readchar.key_ready.return_value = True
+        mock_readchar.readkey.side_effect = ["1", "2", "\r"]
+        assert InputHandler().get_input(idle=lambda: True) == "12"
+        assert mock_readchar.key_ready.call_count == 1
@@ -2,7 +2,11 @@ from unittest.mock import patch
 
 import pytest
 
+from ani_yt.display import BACK_SENTINEL
+from ani_yt.file_handler import PlaylistCacheView
+from ani_yt.history_handler import HistorySession
 from ani_yt.main import Main
+from ani_yt.yt_dlp_handler import YT_DLP_Options, YT_DLP_Stream
 
 
 class TestMain:
@@ -49,18 +53,108 @@ class TestMain:
         with pytest.raises(SystemExit):
             m.search("")
 
+    def test_bench_search_without_cache(self, capsys):
+        m = Main(channel_url="")
+        m.bench_search()
+        assert "No cached playlists found." in capsys.readouterr().out
+
+    def test_bench_search(self, capsys):
+        m = Main(channel_url="")
+        m.file_handler.dump([["One Piece EP 1", "https://youtube.com/1"], ["Naruto EP 1", "https://youtube.com/2"]])
+        m.bench_search("piece", repeat=1)
+        out = capsys.readouterr().out
+        assert "python" in out
+        assert "active" in out
+
+    @pytest.mark.parametrize(("action", "args"), [("list", ()), ("search", ("piece",))])
+    def test_playlist_cache_closed(self, action, args):
+        m = Main(channel_url="")
+        m.file_handler.dump([["One Piece EP 1", "https://youtube.com/1"], ["Naruto EP 1", "https://youtube.com/2"]])
+        with (
+            patch.object(m, "menu") as mock_menu,
+            patch.object(PlaylistCacheView, "close", autospec=True, side_effect=PlaylistCacheView.close) as mock_close,
+        ):
+            getattr(m, action)(*args)
+        mock_menu.assert_called_once()
+        mock_close.assert_called_once()
+
     def test_menu_empty(self):
         m = Main(channel_url="")
         m.menu([])
 
+    def test_menu_play_is_one_commit(self):
+        m = Main(channel_url="")
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options())
+        stream.videos = [{"video_title": "EP 1", "video_url": "https://youtube.com/1", "status": ""}]
+        stream.done.set()
+        choices = iter(
+            [("P", "https://youtube.com/p"), ("EP 1", "https://youtube.com/1"), BACK_SENTINEL, BACK_SENTINEL]
+        )
+
+        with (
+            patch.object(m.dlp, "stream_video", return_value=stream),
+            patch.object(m.display_menu, "choose_menu", side_effect=lambda *args, **kwargs: next(choices)),
+            patch.object(m, "start_player"),
+            patch.object(m, "loop"),
+            patch.object(HistorySession, "commit", autospec=True, side_effect=HistorySession.commit) as mock_commit,
+        ):
+            m.menu([["P", "https://youtube.com/p"]])
+
+        # Once before playback, once after
+        assert mock_commit.call_count == 2
+        history = m.history_handler.load()
+        assert history["current"]["video_url"] == "https://youtube.com/1"
+        assert history["playlists"][0]["videos"][0]["status"] == "viewed"
+
+    def test_menu_interrupted_playback_keeps_current(self):
+        m = Main(channel_url="")
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options())
+        stream.videos = [{"video_title": "EP 1", "video_url": "https://youtube.com/1", "status": ""}]
+        choices = iter([("P", "https://youtube.com/p"), ("EP 1", "https://youtube.com/1")])
+
+        with (
+            patch.object(m.dlp, "stream_video", return_value=stream),
+            patch.object(m.display_menu, "choose_menu", side_effect=lambda *args, **kwargs: next(choices)),
+            patch.object(m, "start_player", side_effect=KeyboardInterrupt),
+            pytest.raises(SystemExit),
+        ):
+            m.menu([["P", "https://youtube.com/p"]])
+
+        history = m.history_handler.load()
+        assert history["current"]["video_url"] == "https://youtube.com/1"
+        assert history["playlists"][0]["videos"][0]["status"] == ""
+
     def test_playlist_from_url_no_videos(self):
         m = Main(channel_url="")
-        data = {"entries": []}
 
         class FakeDLP:
             @staticmethod
-            def get_video(url):
-                return data
+            def stream_video(url):
+                stream = YT_DLP_Stream(url, YT_DLP_Options())
+                stream.done.set()
+                return stream
 
         m.dlp = FakeDLP()
         m.playlist_from_url("https://youtube.com/p")
+
+    def test_update_incremental_keeps_old_videos(self):
+        m = Main(channel_url="https://youtube.com/@ch", incremental=True)
+        old = [{"video_title": "E1", "video_url": "https://youtube.com/1", "status": "viewed"}]
+        curr = {"playlist_title": "P", "playlist_url": "https://youtube.com/p"}
+        m.history_handler.update(curr=curr, videos=old)
+
+        # The channel playlist is not what this test is about, only keep update() offline
+        with (
+            patch.object(m.dlp, "get_playlist", return_value={"entries": []}),
+            patch.object(
+                m.dlp,
+                "get_video_incremental",
+                return_value=[{"video_title": "E2", "video_url": "https://youtube.com/2", "status": ""}],
+            ) as mock_incremental,
+        ):
+            m.update()
+
+        mock_incremental.assert_called_once_with("https://youtube.com/p", ["https://youtube.com/1"])
+        videos = m.history_handler.load()["playlists"][0]["videos"]
+        assert [v["video_title"] for v in videos] == ["E1", "E2"]
+        assert videos[0]["status"] == "viewed"
@@ -1,4 +1,6 @@
-from ani_yt.player import PlayerConfig, TermuxPlayerConfig
+import os
+
+from ani_yt.player import Player, PlayerConfig, TermuxPlayerConfig
 
 
 class TestPlayerConfig:
@@ -41,3 +43,18 @@ class TestTermuxPlayerConfig:
         settings = TermuxPlayerConfig.get_all_settings()
         assert "monitor" in settings
         assert "open_app" in settings
+
+
+class TestPlayer:
+    def test_command_with_url(self):
+        player = Player("https://youtube.com/v", args=[])
+        assert player.command[-1] == "https://youtube.com/v"
+
+    def test_command_with_info_json(self):
+        player = Player("https://youtube.com/v", args=[], info_json="data/prefetch/v.info.json", title="EP 1")
+        assert player.command[-3:] == [
+            f"--ytdl-raw-options-append=load-info-json={os.path.abspath('data/prefetch/v.info.json')}",
+            "--force-media-title=EP 1",
+            "https://youtube.com/v",
+        ]
+        assert player.android_command[-1] == "https://youtube.com/v"
@@ -1,3 +1,13 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ani_yt
+from ani_yt._internal import QUERY_BACKEND, _query, _query_py
+from ani_yt.benchmark import Benchmark
+from ani_yt.file_handler import FileHandler
 from ani_yt.query import Query
 
 
@@ -22,6 +32,26 @@ class TestQuery:
         result = q.search(data, "Bleach")
         assert result == []
 
+    def test_search_cache_view(self):
+        fh = FileHandler()
+        fh.dump([["One Piece EP 1", "https://youtube.com/1"], ["Naruto EP 1", "https://youtube.com/2"]])
+        with fh.load() as data:
+            assert Query().search(data, "piece") == [("One Piece EP 1", "https://youtube.com/1")]
+
+    def test_search_index_matches_scan(self):
+        data = Benchmark.sample_titles(500) + [
+            ("ΟΣΑ Σειρά", "https://youtube.com/g"),
+            ("Straße", "https://youtube.com/s"),
+        ]
+        fh = FileHandler()
+        fh.dump(data)
+        with fh.load() as view:
+            assert view.index is not None
+            for case_sensitive in (False, True):
+                q = Query(case_sensitive=case_sensitive)
+                for text in ("one piece", "pie", "an", "One", "ΟΣ", "σα", "stra", "77", "zzz"):
+                    assert q.search(view, text) == q.search(data, text), (case_sensitive, text)
+
     def test_fuzzysearch_basic(self):
         q = Query()
         data = [("One Piece", "https://youtube.com/1"), ("Naruto", "https://youtube.com/2")]
@@ -41,3 +71,133 @@ class TestQuery:
         data = [("One Piece", "https://youtube.com/1")]
         result = q.fuzzysearch(data, "xyzabc", score=100)
         assert result == []
+
+    def test_fuzzysearch_duplicate_titles_keep_their_url(self):
+        data = [("One Piece", "https://youtube.com/1"), ("one piece", "https://youtube.com/2")]
+        result = Query().fuzzysearch(data, "one piece", score=0)
+        assert sorted(url for _, url in result) == ["https://youtube.com/1", "https://youtube.com/2"]
+        assert ("one piece", "https://youtube.com/2") in result
+
+    def test_fuzzysearch_limit(self):
+        data = [("One Piece", "https://youtube.com/1"), ("One Pie", "https://youtube.com/2"), ("Naruto", "u3")]
+        assert Query().fuzzysearch(data, "one piece", score=0, limit=1) == [("One Piece", "https://youtube.com/1")]
+        assert len(Query().fuzzysearch(data, "one piece", score=0, limit=2)) == 2
+
+    def test_fuzzysearch_cutoff_is_exclusive(self):
+        data = [("One Piece", "https://youtube.com/1")]
+        assert Query().fuzzysearch(data, "one piece", score=99) == data
+        assert Query().fuzzysearch(data, "one piece", score=100) == []
+
+    def test_fuzzysearch_matches_legacy(self):
+        data = Benchmark.sample_titles(300)
+        assert Query().fuzzysearch(data, "one piece") == Benchmark.legacy_fuzzysearch(data, "one piece")
+
+    def test_fuzzysearch_cache_view(self):
+        fh = FileHandler()
+        fh.dump([["One Piece EP 1", "https://youtube.com/1"], ["Naruto EP 1", "https://youtube.com/2"]])
+        with fh.load() as data:
+            assert Query().fuzzysearch(data, "one piece ep 1", score=80) == [
+                ("One Piece EP 1", "https://youtube.com/1")
+            ]
+
+
+class TestScoreTitles:
+    QUERY = {"one", "piece"}
+
+    def test_matches_per_title_scores(self):
+        titles = [title.lower() for title, _ in Benchmark.sample_titles(300)]
+        expected = [(idx, _query.calculate_match_score(title, self.QUERY)) for idx, title in enumerate(titles)]
+        expected = sorted([item for item in expected if item[1] > 0], key=lambda x: x[1], reverse=True)
+        assert _query.score_titles(titles, self.QUERY) == expected
+
+    def test_pre_split_titles(self):
+        titles = ["one piece ep 1", "naruto", "one pie"]
+        assert _query.score_titles([t.split() for t in titles], self.QUERY) == _query.score_titles(titles, self.QUERY)
+
+    def test_best_first_ties_in_order(self):
+        assert _query.score_titles(["one", "naruto", "one piece", "piece"], self.QUERY) == [
+            (2, 2.0),
+            (0, 1.0),
+            (3, 1.0),
+        ]
+
+    def test_empty_title_scores_zero(self):
+        assert _query.score_titles(["", [], "one"], self.QUERY) == [(2, 1.0)]
+
+    def test_empty_query(self):
+        with pytest.raises(ValueError):
+            _query.score_titles(["one"], set())
+
+
+class TestPurePythonQuery:
+    QUERY = {"one", "piece"}
+
+    @pytest.mark.skipif(QUERY_BACKEND != "compiled", reason="needs the compiled extension to compare with")
+    def test_same_scores_as_extension(self):
+        titles = [title.lower() for title, _ in Benchmark.sample_titles(300)] + ["a bb ccc dddd eeeee", "σσ ς"]
+        for query in (self.QUERY, {"pie"}, {"an", "e"}, {"ccc", "dd", "b"}, {"σ"}):
+            assert _query_py.score_titles(titles, query) == _query.score_titles(titles, query)
+            for title in titles[:50]:
+                assert _query_py.calculate_match_score(title, query) == _query.calculate_match_score(title, query)
+
+    def test_partial_scores_are_single_precision(self):
+        # 1/3 as a C float, not as a double
+        assert _query_py.calculate_match_score("abc", {"a"}) == 0.3333333432674408
+
+    def test_errors(self):
+        with pytest.raises(ValueError):
+            _query_py.calculate_match_score("", self.QUERY)
+        with pytest.raises(ValueError):
+            _query_py.calculate_match_score("one", set())
+        with pytest.raises(ValueError):
+            _query_py.score_titles(["one"], set())
+        assert _query_py.score_titles(["", [], "one"], self.QUERY) == [(2, 1.0)]
+
+    def test_selected_without_extension(self):
+        # A fresh interpreter where the compiled module cannot be found
+        code = (
+            "import sys\n"
+            "class Block:\n"
+            "    def find_spec(self, name, path=None, target=None):\n"
+            "        if name == 'ani_yt._internal._query':\n"
+            "            raise ImportError(name)\n"
+            "sys.meta_path.insert(0, Block())\n"
+            "from ani_yt._internal import QUERY_BACKEND\n"
+            "from ani_yt.query import Query\n"
+            "print(QUERY_BACKEND, Query().search([('One Piece', 'u1'), ('Naruto', 'u2')], 'piece'))\n"
+        )
+        env = dict(os.environ)
+        src = os.path.dirname(os.path.dirname(os.path.abspath(ani_yt.__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+        assert result.stdout.strip() == "python [('One Piece', 'u1')]"
+
+
+class TestFuzzysearchBenchmark:
+    def test_indexed_beats_legacy(self):
+        (size, legacy, indexed, top), *_ = Benchmark.fuzzysearch(sizes=(2_000,), repeat=1)
+        assert size == 2_000
+        assert indexed < legacy
+        assert top < legacy
+
+    def test_legacy_skipped_above_max(self):
+        assert Benchmark.fuzzysearch(sizes=(50,), repeat=1, legacy_max=10)[0][1] is None
+
+    def test_scoring(self):
+        (size, loop, batch, split), *_ = Benchmark.scoring(sizes=(200,), repeat=1)
+        assert size == 200
+        assert min(loop, batch, split) >= 0
+
+    def test_search_backends(self):
+        results = Benchmark.search_backends(["One Piece EP 1", "Naruto EP 1"], "piece", repeat=1)
+        assert "python" in [name for name, *_ in results]
+        assert all(matches == 1 for _, matches, _ in results)
+
+    def test_report_search_backends_empty(self, capsys):
+        Benchmark.report_search_backends([], "piece", repeat=1)
+        assert "Nothing to search" in capsys.readouterr().out
+
+    def test_search_index(self):
+        results = Benchmark.search_index(sizes=(200,), queries=("777", "one"), repeat=1)
+        assert [(size, text) for size, text, *_ in results] == [(200, "777"), (200, "one")]
+        assert all(matches >= 0 and scan >= 0 and indexed >= 0 for *_, matches, scan, indexed in results)
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from ani_yt.benchmark import Benchmark
+from ani_yt.common import VideoRecord
+from ani_yt.serializer import Serializer
+
+DATA = {
+    "current": {"playlist_url": "https://www.youtube.com/playlist?list=PL1", "video_url": ""},
+    "playlists": [
+        {
+            "playlist_title": "Tiêu đề / タイトル",
+            "playlist_url": "https://www.youtube.com/playlist?list=PL1",
+            "videos": [
+                {"video_title": "EP 1", "video_url": "https://www.youtube.com/watch?v=aaaaaaaaaaa", "status": ""}
+            ],
+        }
+    ],
+}
+
+
+@pytest.fixture(params=Serializer.BACKENDS)
+def backend(request):
+    previous = Serializer.backend
+    Serializer.use(request.param)
+    yield request.param
+    Serializer.backend = previous
+
+
+class TestSerializer:
+    def test_round_trip(self, backend):
+        assert Serializer.loads(Serializer.dumps(DATA)) == DATA
+        assert Serializer.loads(Serializer.dumps(DATA, pretty=True)) == DATA
+
+    def test_compact_and_pretty(self, backend):
+        compact = Serializer.dumps(DATA)
+        pretty = Serializer.dumps(DATA, pretty=True)
+        assert "\n" not in compact
+        assert "\n" in pretty
+        # Non-ASCII text and slashes are written as is
+        assert "タイトル" in compact
+        assert "https://www.youtube.com" in compact
+
+    def test_pretty_same_on_every_backend(self):
+        previous = Serializer.backend
+        outputs = set()
+        try:
+            for name in Serializer.BACKENDS:
+                Serializer.use(name)
+                outputs.add(Serializer.dumps(DATA, pretty=True))
+        finally:
+            Serializer.backend = previous
+        assert len(outputs) == 1
+        assert '\n    "current": {' in outputs.pop()
+
+    def test_file_round_trip(self, backend):
+        Serializer.dump_file("data/out.json", DATA, pretty=True)
+        assert Serializer.load_file("data/out.json") == DATA
+        assert not os.path.exists("data/out.json.tmp")
+
+    def test_records_written_as_videos(self, backend):
+        video = DATA["playlists"][0]["videos"][0]
+        data = {**DATA, "playlists": [{**DATA["playlists"][0], "videos": [VideoRecord.from_video(video)]}]}
+        assert Serializer.loads(Serializer.dumps(data)) == DATA
+        assert Serializer.loads(Serializer.dumps(data, pretty=True)) == DATA
+
+    def test_decode_error(self, backend):
+        with pytest.raises(Serializer.DecodeError):
+            Serializer.loads("{not json")
+
+    def test_use_unknown_backend(self):
+        with pytest.raises(ValueError):
+            Serializer.use("pickle")
+
+    def test_json_fallback_is_always_available(self):
+        assert Serializer.BACKENDS[-1] == "json"
+
+    def test_msgpack_file_round_trip(self):
+        pytest.importorskip("msgpack")
+        Serializer.dump_file("data/out.msgpack", DATA, binary=True)
+        assert Serializer.load_file("data/out.msgpack", binary=True) == DATA
+
+
+class TestBenchmark:
+    def test_serializers(self):
+        data = Benchmark.sample_history(playlists=2, videos=5)
+        results = Benchmark.serializers(data, repeat=1)
+        backends = [name.split()[0] for name, *_ in results]
+        assert set(Serializer.BACKENDS) <= set(backends)
+        assert all(size > 0 and dump >= 0 and load >= 0 for _, size, dump, load in results)
+
+    def test_backend_restored(self):
+        previous = Serializer.backend
+        Benchmark.serializers(Benchmark.sample_history(1, 1), repeat=1)
+        assert Serializer.backend == previous
+
+    def test_main(self, capsys):
+        Benchmark.main(["--playlists", "1", "--videos", "2", "--repeat", "1"])
+        assert "json (compact)" in capsys.readouterr().out
@@ -0,0 +1,118 @@
+import os
+from unittest.mock import patch
+
+import test_history_handler
+import ujson as json
+
+from ani_yt.sharded_history_handler import ShardedHistoryHandler
+
+HISTORY = {
+    "current": {"playlist_title": "P2", "playlist_url": "https://youtube.com/p2"},
+    "playlists": [
+        {
+            "playlist_title": "P1",
+            "playlist_url": "https://youtube.com/p1",
+            "videos": [{"video_title": "A1", "video_url": "https://youtube.com/a1", "status": "viewed"}],
+            "last_viewed": "2024-01-01T00:00:00+00:00",
+        },
+        {
+            "playlist_title": "P2",
+            "playlist_url": "https://youtube.com/p2",
+            "videos": [
+                {"video_title": "B1", "video_url": "https://youtube.com/b1", "status": ""},
+                {"video_title": "B2", "video_url": "https://youtube.com/b2", "status": ""},
+            ],
+            "last_viewed": "2024-01-02T00:00:00+00:00",
+        },
+    ],
+}
+
+
+def make_history():
+    h = ShardedHistoryHandler()
+    h._write(json.loads(json.dumps(HISTORY)))
+    return h
+
+
+class TestShardedHistoryHandler(test_history_handler.TestHistoryHandler):
+    """Runs the JSON backend tests against the sharded layout, plus the layout specific ones."""
+
+    def _make_handler(self):
+        return ShardedHistoryHandler()
+
+    def test_layout(self):
+        h = make_history()
+        with open(h.filename, encoding="utf-8") as f:
+            manifest = json.load(f)
+        assert manifest["current"] == HISTORY["current"]
+        assert all("videos" not in p for p in manifest["playlists"])
+
+        shards = sorted(name for name in os.listdir(h.directory) if name != "manifest.json")
+        assert shards == sorted(h.shard_name(p["playlist_url"]) for p in HISTORY["playlists"])
+        assert h.load() == HISTORY
+
+    def test_imports_json_history_once(self):
+        with open("./data/history.json", "w", encoding="utf-8") as f:
+            json.dump(HISTORY, f)
+
+        h = self._make_handler()
+        assert h.is_history()
+        assert h.load() == HISTORY
+        assert os.path.exists(h.filename)
+
+    def test_clear_history_playlist_mode_does_not_read_shards(self):
+        h = make_history()
+        with patch.object(h, "load_videos") as mock_load_videos:
+            h.clear_history(mode="playlist", keep_recent=1)
+        mock_load_videos.assert_not_called()
+
+        assert not os.path.exists(h._shard_path("https://youtube.com/p1"))
+        assert [p["playlist_url"] for p in h.load()["playlists"]] == ["https://youtube.com/p2"]
+
+
+class TestShardedHistorySession(test_history_handler.TestHistorySession):
+    def _make_handler(self):
+        h = ShardedHistoryHandler()
+        h.update(curr=self.CURR, videos=[dict(v) for v in self.VIDEOS])
+        return h
+
+    def test_loads_only_used_shards(self):
+        h = make_history()
+        with patch.object(h, "load_videos", wraps=h.load_videos) as mock_load_videos:
+            with h.session() as session:
+                assert session.current == HISTORY["current"]
+                playlist = session.get_playlist("https://youtube.com/p2")
+                assert len(playlist["videos"]) == 2
+        mock_load_videos.assert_called_once_with("https://youtube.com/p2")
+
+    def test_status_change_is_journaled(self):
+        h = make_history()
+        with patch.object(h, "_dump", wraps=h._dump) as mock_dump:
+            h.set_video_status("https://youtube.com/b1", "viewed")
+        mock_dump.assert_not_called()
+        assert os.path.exists(h.journal_filename)
+        assert h.load()["playlists"][1]["videos"][0]["status"] == "viewed"
+
+    def test_compact_writes_only_journaled_shards(self):
+        h = make_history()
+        h.set_video_status("https://youtube.com/b1", "viewed")
+        with patch.object(h, "_dump", wraps=h._dump) as mock_dump:
+            h.compact()
+        assert [call.args[0] for call in mock_dump.call_args_list] == [h._shard_path("https://youtube.com/p2")]
+        assert not os.path.exists(h.journal_filename)
+        assert ShardedHistoryHandler().load_videos("https://youtube.com/p2")[0]["status"] == "viewed"
+
+    def test_manifest_write_folds_unloaded_journaled_shard(self):
+        h = make_history()
+        h.set_video_status("https://youtube.com/a1", "")
+        with h.session() as session:
+            session.update(curr=HISTORY["current"], viewed=True)
+        assert not os.path.exists(h.journal_filename)
+        with open(h._shard_path("https://youtube.com/p1"), encoding="utf-8") as f:
+            assert json.load(f)[0]["status"] == ""
+
+    def test_viewed_update_writes_only_manifest(self):
+        h = make_history()
+        with patch.object(h, "_dump", wraps=h._dump) as mock_dump:
+            h.update(curr=HISTORY["current"], viewed=True)
+        assert [call.args[0] for call in mock_dump.call_args_list] == [h.filename]
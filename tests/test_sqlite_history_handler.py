@@ -0,0 +1,149 @@
+import os
+import sqlite3
+
+import test_history_handler
+import ujson as json
+
+from ani_yt.history_handler import HistoryHandler
+from ani_yt.sqlite_history_handler import SQLiteHistoryHandler
+
+HISTORY = {
+    "current": {"playlist_title": "P2", "playlist_url": "https://youtube.com/p2"},
+    "playlists": [
+        {
+            "playlist_title": "P1",
+            "playlist_url": "https://youtube.com/p1",
+            "videos": [{"video_title": "A1", "video_url": "https://youtube.com/a1", "status": "viewed"}],
+            "last_viewed": "2024-01-01T00:00:00+00:00",
+        },
+        {
+            "playlist_title": "P2",
+            "playlist_url": "https://youtube.com/p2",
+            "videos": [
+                {"video_title": "B1", "video_url": "https://youtube.com/b1", "status": ""},
+                {"video_title": "B2", "video_url": "https://youtube.com/b2", "status": "", "thumbnail_url": "t"},
+            ],
+            "last_updated": "2024-01-02T00:00:00+00:00",
+        },
+    ],
+}
+
+
+class TestSQLiteHistoryHandler(test_history_handler.TestHistoryHandler):
+    """Runs the JSON backend tests against SQLite, plus the backend specific ones."""
+
+    def _make_handler(self):
+        return SQLiteHistoryHandler()
+
+    def test_search_existing(self):
+        h = self._make_handler()
+        h.update(playlists=HISTORY["playlists"])
+        assert h.search("https://youtube.com/b2", h.load()) == (1, 1)
+
+    def test_imports_json_history_once(self):
+        with open("./data/history.json", "w", encoding="utf-8") as f:
+            json.dump(HISTORY, f)
+
+        h = self._make_handler()
+        assert h.is_history()
+        assert h.load() == HISTORY
+        assert os.path.exists(h.filename)
+
+        # Later changes live only in the database
+        h.set_video_status("https://youtube.com/b1", "viewed")
+        assert HistoryHandler().load() == HISTORY
+        assert h.load()["playlists"][1]["videos"][0]["status"] == "viewed"
+
+    def test_import_and_export_round_trip(self):
+        with open("source.json", "w", encoding="utf-8") as f:
+            json.dump(HISTORY, f)
+
+        h = self._make_handler()
+        h.import_json("source.json")
+        h.export_json("exported.json")
+
+        with open("exported.json", encoding="utf-8") as f:
+            assert json.load(f) == HISTORY
+
+    def test_merge_only_touches_current_playlist(self):
+        h = self._make_handler()
+        h.update(playlists=HISTORY["playlists"])
+        videos = [{"video_title": "B3", "video_url": "https://youtube.com/b3", "status": ""}]
+        h.update(curr=HISTORY["current"], videos=videos, truncate=False)
+
+        data = h.load()
+        assert data["playlists"][0] == HISTORY["playlists"][0]
+        assert [v["video_url"] for v in data["playlists"][1]["videos"]] == [
+            "https://youtube.com/b1",
+            "https://youtube.com/b2",
+            "https://youtube.com/b3",
+        ]
+
+    def test_clear_history_unwatched_keeps_positions(self):
+        h = self._make_handler()
+        h.update(playlists=HISTORY["playlists"])
+        h.update(curr=HISTORY["current"], viewed=True)
+        h.clear_history(mode="unwatched", keep_recent=1)
+
+        data = h.load()
+        assert [p["playlist_url"] for p in data["playlists"]] == ["https://youtube.com/p2", "https://youtube.com/p1"]
+        assert h.search("https://youtube.com/a1", data) == (1, 0)
+
+    def test_delete_history_removes_imported_json(self):
+        with open("./data/history.json", "w", encoding="utf-8") as f:
+            json.dump(HISTORY, f)
+
+        h = self._make_handler()
+        assert h.is_history()
+        h.delete_history()
+        assert not h.is_history()
+
+    def test_migrates_database_without_key_columns(self):
+        with sqlite3.connect("./data/history.sqlite3") as conn:
+            conn.executescript(
+                """
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                CREATE TABLE playlists (
+                    id INTEGER PRIMARY KEY, position INTEGER NOT NULL, playlist_url TEXT NOT NULL UNIQUE,
+                    playlist_title TEXT NOT NULL DEFAULT '', last_viewed TEXT, last_updated TEXT
+                );
+                CREATE TABLE videos (
+                    id INTEGER PRIMARY KEY, playlist_id INTEGER NOT NULL, position INTEGER NOT NULL,
+                    video_title TEXT NOT NULL DEFAULT '', video_url TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT '', last_viewed TEXT, thumbnail_url TEXT
+                );
+                CREATE INDEX idx_videos_url ON videos(video_url);
+                INSERT INTO playlists VALUES (1, 0, 'https://www.youtube.com/playlist?list=PLabc', 'P', NULL, NULL);
+                INSERT INTO videos VALUES (1, 1, 0, 'V', 'https://youtu.be/dQw4w9WgXcQ', '', NULL, NULL);
+                """
+            )
+        conn.close()
+
+        h = SQLiteHistoryHandler()
+        with h.session() as session:
+            assert session.playlist_index("https://youtube.com/playlist?list=PLabc") == 0
+            assert session.video_position("https://www.youtube.com/watch?v=dQw4w9WgXcQ") == (0, 0)
+
+
+class TestSQLiteHistorySession(test_history_handler.TestHistorySession):
+    def _make_handler(self):
+        h = SQLiteHistoryHandler()
+        h.update(curr=self.CURR, videos=[dict(v) for v in self.VIDEOS])
+        return h
+
+    def test_batches_changes_into_one_write(self):
+        h = self._make_handler()
+        with h.session() as session:
+            session.update(curr=self.CURR, viewed=True)
+            session.set_video_status("https://youtube.com/1", "viewed")
+            # Nothing is visible outside the session before the commit
+            assert SQLiteHistoryHandler().load()["playlists"][0]["videos"][0]["status"] == ""
+            assert session.history["playlists"][0]["videos"][0]["status"] == "viewed"
+
+        assert h.load()["playlists"][0]["videos"][0]["status"] == "viewed"
+
+    def test_unchanged_update_does_not_write(self):
+        h = self._make_handler()
+        with h.session() as session:
+            session.update(curr=self.CURR, videos=[dict(v) for v in self.VIDEOS])
+            assert not session.dirty
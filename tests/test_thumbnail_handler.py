@@ -0,0 +1,111 @@
+import os
+import time
+from unittest.mock import patch
+
+from ani_yt.thumbnail_handler import ThumbnailHandler
+from ani_yt.yt_dlp_handler import YT_DLP_Options
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def read(self):
+        return self.data
+
+
+VIDEO = {"video_title": "E1", "video_url": "https://youtube.com/1", "status": "", "thumbnail_url": "https://i/1.webp"}
+
+
+class TestThumbnailHandler:
+    def _make_handler(self, **kwargs):
+        return ThumbnailHandler(YT_DLP_Options(), **kwargs)
+
+    @patch("urllib.request.urlopen")
+    def test_get_downloads_once(self, mock_urlopen):
+        mock_urlopen.return_value = FakeResponse(b"image")
+        h = self._make_handler()
+        path = h.get(VIDEO)
+        assert path.endswith(".webp")
+        assert open(path, "rb").read() == b"image"
+        assert h.get(VIDEO) == path
+        mock_urlopen.assert_called_once()
+
+    @patch("ani_yt.thumbnail_handler.YT_DLP.standalone_get_thumbnail")
+    @patch("urllib.request.urlopen")
+    def test_get_resolves_missing_url(self, mock_urlopen, mock_thumbnail):
+        mock_urlopen.return_value = FakeResponse(b"image")
+        mock_thumbnail.return_value = "https://i/2.jpg"
+        video = {"video_title": "E2", "video_url": "https://youtube.com/2", "status": ""}
+        assert self._make_handler().get(video).endswith(".jpg")
+        mock_thumbnail.assert_called_once()
+
+    @patch("urllib.request.urlopen")
+    def test_get_falls_back_to_remote_url(self, mock_urlopen):
+        mock_urlopen.side_effect = OSError()
+        assert self._make_handler().get(VIDEO) == "https://i/1.webp"
+
+    @patch("urllib.request.urlopen")
+    def test_evicts_least_recently_used(self, mock_urlopen):
+        mock_urlopen.return_value = FakeResponse(b"x" * 10)
+        h = self._make_handler(max_bytes=20)
+        first = h.get(VIDEO)
+        old = time.time() - 100
+        os.utime(first, (old, old))
+        h.get({**VIDEO, "video_url": "https://youtube.com/2"})
+        h.get({**VIDEO, "video_url": "https://youtube.com/3"})
+        assert not os.path.exists(first)
+        assert len(os.listdir(h.directory)) == 2
+
+    @patch("urllib.request.urlopen")
+    def test_download_under_limit_does_not_scan(self, mock_urlopen):
+        mock_urlopen.return_value = FakeResponse(b"x" * 10)
+        h = self._make_handler(max_bytes=25)
+        h.get(VIDEO)
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            h.get({**VIDEO, "video_url": "https://youtube.com/2"})
+            mock_scandir.assert_not_called()
+            # Over the limit, the directory is scanned to pick what to evict
+            h.get({**VIDEO, "video_url": "https://youtube.com/3"})
+            mock_scandir.assert_called_once()
+        assert h._total == 20
+        assert len(os.listdir(h.directory)) == 2
+
+    @patch("urllib.request.urlopen")
+    def test_prefetch(self, mock_urlopen):
+        mock_urlopen.return_value = FakeResponse(b"image")
+        h = self._make_handler()
+        h.prefetch([VIDEO, {"video_title": "E2", "video_url": "https://youtube.com/2", "status": ""}])
+        for _ in range(100):
+            if not h._pending:
+                break
+            time.sleep(0.01)
+        assert len(os.listdir(h.directory)) == 1
+
+    @patch("urllib.request.urlopen")
+    def test_directory_listed_once(self, mock_urlopen):
+        mock_urlopen.return_value = FakeResponse(b"image")
+        h = self._make_handler()
+        path = h.get(VIDEO)
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            assert h.get(VIDEO) == path
+            mock_scandir.assert_not_called()
+            # A new handler lists it once
+            assert self._make_handler().get(VIDEO) == path
+            assert mock_scandir.call_count == 1
+        assert mock_urlopen.call_count == 1
+
+    @patch("urllib.request.urlopen")
+    def test_prefetch_skips_stored(self, mock_urlopen):
+        mock_urlopen.return_value = FakeResponse(b"image")
+        h = self._make_handler()
+        h.get(VIDEO)
+        h.prefetch([VIDEO])
+        assert not h._pending
+        assert mock_urlopen.call_count == 1
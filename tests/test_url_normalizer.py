@@ -0,0 +1,53 @@
+import pytest
+
+from ani_yt.url_normalizer import UrlNormalizer
+
+VIDEO_ID = "dQw4w9WgXcQ"
+CANONICAL = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+
+class TestUrlNormalizer:
+    @pytest.mark.parametrize(
+        "url",
+        [
+            f"https://www.youtube.com/watch?v={VIDEO_ID}",
+            f"https://youtube.com/watch?v={VIDEO_ID}&list=PLabc&index=3",
+            f"https://m.youtube.com/watch?feature=share&v={VIDEO_ID}",
+            f"https://music.youtube.com/watch?v={VIDEO_ID}",
+            f"https://youtu.be/{VIDEO_ID}?t=42",
+            f"https://www.youtube.com/shorts/{VIDEO_ID}",
+            f"https://www.youtube.com/embed/{VIDEO_ID}",
+            f"https://www.youtube.com/live/{VIDEO_ID}",
+        ],
+    )
+    def test_video_forms(self, url):
+        assert UrlNormalizer.video_id(url) == VIDEO_ID
+        assert UrlNormalizer.key(url) == VIDEO_ID
+        assert UrlNormalizer.canonical(url) == CANONICAL
+
+    def test_playlist(self):
+        url = "https://www.youtube.com/playlist?list=PLabc_-123&si=xyz"
+        assert UrlNormalizer.video_id(url) is None
+        assert UrlNormalizer.playlist_key(url) == "PLabc_-123"
+        assert UrlNormalizer.key(url) == "PLabc_-123"
+        assert UrlNormalizer.canonical(url) == "https://www.youtube.com/playlist?list=PLabc_-123"
+
+    def test_video_in_playlist_keys_by_video(self):
+        url = f"https://www.youtube.com/watch?v={VIDEO_ID}&list=PLabc"
+        assert UrlNormalizer.key(url) == VIDEO_ID
+        assert UrlNormalizer.playlist_key(url) == "PLabc"
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://example.com/watch?v=dQw4w9WgXcQ",
+            "https://youtube.com/1",
+            "https://www.youtube.com/watch?v=short",
+            "not a url",
+            "",
+        ],
+    )
+    def test_other_urls_are_their_own_key(self, url):
+        assert UrlNormalizer.key(url) == url
+        assert UrlNormalizer.playlist_key(url) == url
+        assert UrlNormalizer.canonical(url) == url
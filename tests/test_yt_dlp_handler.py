@@ -1,8 +1,24 @@
-from unittest.mock import patch
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
 
 import pytest
+import yt_dlp
 
-from ani_yt.yt_dlp_handler import YT_DLP, YT_DLP_Options
+from ani_yt.cache_handler import ExtractionCache
+from ani_yt.data_processing import DataProcessing
+from ani_yt.exceptions import MissingChannelUrl
+from ani_yt.serializer import Serializer
+from ani_yt.yt_dlp_handler import (
+    YT_DLP,
+    YT_DLP_Fetcher,
+    YT_DLP_FetchOptions,
+    YT_DLP_Options,
+    YT_DLP_Pool,
+    YT_DLP_Prefetcher,
+    YT_DLP_Stream,
+)
 
 
 class TestYTDLPOptions:
@@ -17,6 +33,70 @@ class TestYTDLPOptions:
         assert opts.ydl_opts["no_warnings"] is False
 
 
+class TestYTDLPPool:
+    @pytest.fixture(autouse=True)
+    def reset_pool(self):
+        YT_DLP_Pool._idle = {}
+        YT_DLP_Pool._closed = False
+        yield
+        YT_DLP_Pool._idle = {}
+        YT_DLP_Pool._closed = False
+
+    @patch("ani_yt.yt_dlp_handler.yt_dlp.YoutubeDL")
+    def test_borrow_reuses_instance(self, mock_ydl):
+        opts = {"quiet": True}
+        with YT_DLP_Pool.borrow(opts) as first:
+            pass
+        with YT_DLP_Pool.borrow(dict(opts)) as second:
+            pass
+        assert first is second
+        mock_ydl.assert_called_once()
+
+    @patch("ani_yt.yt_dlp_handler.yt_dlp.YoutubeDL")
+    def test_borrow_keyed_by_opts(self, mock_ydl):
+        mock_ydl.side_effect = lambda opts: MagicMock()
+        with YT_DLP_Pool.borrow({"quiet": True}) as first:
+            pass
+        with YT_DLP_Pool.borrow({"quiet": False}) as second:
+            pass
+        assert first is not second
+        assert mock_ydl.call_count == 2
+
+    @patch("ani_yt.yt_dlp_handler.yt_dlp.YoutubeDL")
+    def test_borrow_discards_on_error(self, mock_ydl):
+        with pytest.raises(RuntimeError):
+            with YT_DLP_Pool.borrow({"quiet": True}):
+                raise RuntimeError()
+        mock_ydl.return_value.close.assert_called_once()
+        assert YT_DLP_Pool._idle == {}
+
+    @patch("ani_yt.yt_dlp_handler.yt_dlp.YoutubeDL")
+    def test_extraction_paths_share_one_instance(self, mock_ydl):
+        entries = [{"_type": "url", "title": f"EP {i}", "url": f"https://youtube.com/{i}"} for i in range(3)]
+        ydl = mock_ydl.return_value
+        ydl.extract_info.side_effect = lambda *args, **kwargs: {"_type": "playlist", "entries": iter(entries)}
+        ydl.process_ie_result.return_value = {"_type": "playlist", "entries": entries}
+
+        options = YT_DLP_Options()
+        dlp = YT_DLP("https://youtube.com/@ch", options, fetch_options=YT_DLP_FetchOptions(split=True, chunk_size=2))
+        dlp.get_video("https://youtube.com/p")
+        dlp.get_video_split("https://youtube.com/p")
+        dlp.get_video_incremental("https://youtube.com/p", [])
+        YT_DLP.standalone_get_video("https://youtube.com/p", options.ydl_opts)
+        YT_DLP_Stream("https://youtube.com/p", options).start().join()
+
+        # Every extraction with the same options goes through the pool and reuses the warm instance
+        mock_ydl.assert_called_once()
+
+    @patch("ani_yt.yt_dlp_handler.yt_dlp.YoutubeDL")
+    def test_shutdown_closes_idle(self, mock_ydl):
+        with YT_DLP_Pool.borrow({"quiet": True}):
+            pass
+        YT_DLP_Pool.shutdown()
+        mock_ydl.return_value.close.assert_called_once()
+        assert YT_DLP_Pool._idle == {}
+
+
 class TestYTDLP:
     def test_init_no_url(self):
         dlp = YT_DLP(None, YT_DLP_Options())
@@ -38,6 +118,56 @@ class TestYTDLP:
         mock_get_video.assert_called_once()
         assert result == {"entries": []}
 
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.standalone_get_video")
+    def test_get_video_uses_cache(self, mock_get_video):
+        mock_get_video.return_value = {"_type": "playlist", "entries": []}
+        dlp = YT_DLP("https://youtube.com/@ch", YT_DLP_Options(), cache=ExtractionCache())
+        dlp.get_video("https://youtube.com/p")
+        assert dlp.get_video("https://youtube.com/p")["entries"] == []
+        mock_get_video.assert_called_once()
+        assert dlp.cache.hits == 1
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.standalone_get_video")
+    def test_get_video_refresh_bypasses_cache(self, mock_get_video):
+        mock_get_video.return_value = {"_type": "playlist", "entries": []}
+        dlp = YT_DLP("https://youtube.com/@ch", YT_DLP_Options(), cache=ExtractionCache())
+        dlp.get_video("https://youtube.com/p")
+        dlp.get_video("https://youtube.com/p", refresh=True)
+        assert mock_get_video.call_count == 2
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.standalone_get_video")
+    def test_get_video_does_not_cache_single_video(self, mock_get_video):
+        mock_get_video.return_value = {"_type": "video", "requested_formats": []}
+        dlp = YT_DLP("https://youtube.com/@ch", YT_DLP_Options(), cache=ExtractionCache())
+        dlp.get_video("https://youtube.com/v")
+        dlp.get_video("https://youtube.com/v")
+        assert mock_get_video.call_count == 2
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_get_video_incremental(self, mock_borrow):
+        ydl = mock_borrow.return_value.__enter__.return_value
+        ydl.extract_info.return_value = {
+            "entries": iter(
+                [
+                    {"_type": "url", "title": "New", "url": "https://youtube.com/new"},
+                    {"_type": "url", "title": "Old", "url": "https://youtube.com/old"},
+                ]
+            )
+        }
+        dlp = YT_DLP("https://youtube.com/@ch", YT_DLP_Options())
+        videos = dlp.get_video_incremental("https://youtube.com/p", ["https://youtube.com/old"], known_run=1)
+        assert [v["video_title"] for v in videos] == ["New", "Old"]
+        assert ydl.extract_info.call_args.kwargs["process"] is False
+
+    @patch("ani_yt.yt_dlp_handler.PauseableException")
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_get_video_incremental_error(self, mock_borrow, mock_pause):
+        ydl = mock_borrow.return_value.__enter__.return_value
+        ydl.extract_info.side_effect = yt_dlp.utils.ExtractorError("failed")
+        dlp = YT_DLP("https://youtube.com/@ch", YT_DLP_Options())
+        assert dlp.get_video_incremental("https://youtube.com/p", []) is None
+        mock_pause.assert_called_once()
+
     @patch("ani_yt.yt_dlp_handler.YT_DLP.standalone_get_video")
     def test_standalone_get_thumbnail_success(self, mock_get_video):
         mock_get_video.return_value = {
@@ -73,9 +203,265 @@ class TestYTDLP:
         assert v_url == ""
         assert a_url == ""
 
+    def test_parse_stream_single_format(self):
+        assert YT_DLP.parse_stream({"url": "https://stream.com/av"}) == ("https://stream.com/av", "")
+
     @patch("subprocess.run")
     def test_download_success(self, mock_run):
         mock_run.return_value.stdout = b"/path/to/video.mp4"
         result = YT_DLP.download("https://youtube.com/v", "all", capture_output=True)
         assert result == b"/path/to/video.mp4"
         mock_run.assert_called_once()
+
+
+class TestYTDLPSplit:
+    ENTRIES = [{"_type": "url", "title": f"EP {i}", "url": f"https://youtube.com/{i}"} for i in range(23)]
+
+    def _make_dlp(self, chunk_size=5, jobs=3):
+        fetch_options = YT_DLP_FetchOptions(jobs=jobs, split=True, chunk_size=chunk_size)
+        return YT_DLP("https://youtube.com/@ch", YT_DLP_Options(), fetch_options=fetch_options)
+
+    def _mock_info(self, mock_borrow, info):
+        mock_borrow.return_value.__enter__.return_value.extract_info.return_value = info
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_split_on_demand_matches_single_shot(self, mock_borrow):
+        pages = yt_dlp.utils.OnDemandPagedList(lambda n: self.ENTRIES[n * 4 : (n + 1) * 4], 4)
+        self._mock_info(mock_borrow, {"_type": "playlist", "entries": pages})
+        info = self._make_dlp().get_video_split("https://youtube.com/p")
+        assert DataProcessing.omit(info) == DataProcessing.omit({"entries": self.ENTRIES})
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_split_known_count_matches_single_shot(self, mock_borrow):
+        pages = yt_dlp.utils.InAdvancePagedList(lambda n: self.ENTRIES[n * 4 : (n + 1) * 4], 6, 4)
+        self._mock_info(mock_borrow, {"_type": "playlist", "playlist_count": 23, "entries": pages})
+        info = self._make_dlp(chunk_size=10).get_video_split("https://youtube.com/p")
+        assert info["entries"] == self.ENTRIES
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_split_generator_is_read_in_one_pass(self, mock_borrow):
+        info = {"_type": "playlist", "playlist_count": 23, "entries": iter(self.ENTRIES)}
+        self._mock_info(mock_borrow, info)
+        ydl = mock_borrow.return_value.__enter__.return_value
+        ydl.process_ie_result.return_value = {"_type": "playlist", "entries": self.ENTRIES}
+        assert self._make_dlp().get_video_split("https://youtube.com/p")["entries"] == self.ENTRIES
+        ydl.process_ie_result.assert_called_once_with(info, download=False)
+        mock_borrow.assert_called_once()
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_split_follows_url_result(self, mock_borrow):
+        ydl = mock_borrow.return_value.__enter__.return_value
+        pages = yt_dlp.utils.OnDemandPagedList(lambda n: self.ENTRIES[n * 4 : (n + 1) * 4], 4)
+        ydl.extract_info.side_effect = [
+            {"_type": "url", "url": "https://youtube.com/@ch/videos"},
+            {"_type": "playlist", "entries": pages},
+        ]
+        info = self._make_dlp().get_video_split("https://youtube.com/@ch")
+        assert info["entries"] == self.ENTRIES
+        assert ydl.extract_info.call_args.args == ("https://youtube.com/@ch/videos",)
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.get_video_split")
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.standalone_get_video")
+    def test_get_video_uses_split(self, mock_get_video, mock_split):
+        mock_split.return_value = {"_type": "playlist", "entries": []}
+        self._make_dlp().get_video("https://youtube.com/p")
+        mock_split.assert_called_once()
+        mock_get_video.assert_not_called()
+
+
+class TestYTDLPStream:
+    ENTRIES = [
+        {"_type": "url", "title": "EP 2", "url": "https://youtube.com/2"},
+        {"_type": "url", "title": "EP 1", "url": "https://youtube.com/1"},
+        {"_type": "url", "title": "EP 3", "url": "https://youtube.com/3"},
+    ]
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_stream_sorted_like_omit(self, mock_borrow):
+        ydl = mock_borrow.return_value.__enter__.return_value
+        ydl.extract_info.return_value = {"_type": "playlist", "entries": iter(self.ENTRIES)}
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options()).start()
+        stream.join()
+        expected = DataProcessing.sort(DataProcessing.omit({"entries": self.ENTRIES}), key=lambda x: x["video_title"])
+        assert stream.snapshot() == expected
+        assert stream.complete
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_stream_first_page_before_done(self, mock_borrow):
+        release = threading.Event()
+
+        def entries():
+            yield self.ENTRIES[0]
+            release.wait(5)
+            yield from self.ENTRIES[1:]
+
+        ydl = mock_borrow.return_value.__enter__.return_value
+        ydl.extract_info.return_value = {"_type": "playlist", "entries": entries()}
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options()).start()
+        stream.wait_for(1)
+        assert len(stream.snapshot()) == 1
+        assert not stream.done.is_set()
+        release.set()
+        stream.join()
+        assert len(stream.snapshot()) == 3
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_stream_error(self, mock_borrow):
+        ydl = mock_borrow.return_value.__enter__.return_value
+        ydl.extract_info.side_effect = yt_dlp.DownloadError("failed")
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options()).start()
+        stream.wait_for(1)
+        assert stream.snapshot() == []
+        assert not stream.complete
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_stream_uses_cache(self, mock_borrow):
+        ydl = mock_borrow.return_value.__enter__.return_value
+        ydl.extract_info.return_value = {"_type": "playlist", "entries": iter(self.ENTRIES)}
+        cache = ExtractionCache()
+        YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options(), cache=cache).start().join()
+
+        stream = YT_DLP_Stream("https://youtube.com/p", YT_DLP_Options(), cache=cache).start()
+        assert stream.complete
+        assert [v["video_title"] for v in stream.snapshot()] == ["EP 1", "EP 2", "EP 3"]
+        ydl.extract_info.assert_called_once()
+
+
+class TestYTDLPPrefetcher:
+    INFO = {
+        "requested_formats": [
+            {"url": "https://rr.googlevideo.com/videoplayback?expire=4102444800&itag=1"},
+            {"url": "https://rr.googlevideo.com/videoplayback?expire=4102444800&itag=2"},
+        ]
+    }
+
+    def test_parse_expire(self):
+        assert YT_DLP_Prefetcher.parse_expire("https://a.com/videoplayback?id=1&expire=123") == 123
+        assert YT_DLP_Prefetcher.parse_expire("https://a.com/videoplayback/expire/456/id/1") == 456
+        assert YT_DLP_Prefetcher.parse_expire("https://a.com/video") is None
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_prefetch_then_get(self, mock_borrow):
+        mock_borrow.return_value.__enter__.return_value.extract_info.return_value = self.INFO
+        prefetcher = YT_DLP_Prefetcher(YT_DLP_Options())
+        assert prefetcher.get("https://youtube.com/v") is None
+
+        prefetcher.prefetch("https://youtube.com/v")
+        for _ in range(100):
+            if prefetcher.get("https://youtube.com/v"):
+                break
+            time.sleep(0.01)
+
+        path = prefetcher.get("https://youtube.com/v")
+        assert Serializer.load_file(path) == self.INFO
+
+    def test_get_expired(self):
+        prefetcher = YT_DLP_Prefetcher(YT_DLP_Options())
+        path = "data/v.info.json"
+        Serializer.dump_file(path, self.INFO)
+        prefetcher._resolved["https://youtube.com/v"] = (path, time.time() + 10)
+        assert prefetcher.get("https://youtube.com/v") is None
+        assert not os.path.exists(path)
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP_Pool.borrow")
+    def test_prefetch_error_is_silent(self, mock_borrow):
+        mock_borrow.return_value.__enter__.return_value.extract_info.side_effect = yt_dlp.DownloadError("failed")
+        prefetcher = YT_DLP_Prefetcher(YT_DLP_Options())
+        prefetcher._resolve("https://youtube.com/v")
+        assert prefetcher.get("https://youtube.com/v") is None
+        assert not prefetcher._pending
+
+
+class TestYTDLPFetcher:
+    def _make_fetcher(self, jobs=4, timeout=180):
+        return YT_DLP_Fetcher(YT_DLP_Options(), YT_DLP_FetchOptions(jobs=jobs, timeout=timeout))
+
+    def test_socket_timeout_applied(self):
+        fetcher = YT_DLP_Fetcher(YT_DLP_Options(), YT_DLP_FetchOptions(timeout=180, socket_timeout=20))
+        assert fetcher.ydl_options.ydl_opts["socket_timeout"] == 20
+        assert fetcher.ydl_options.ydl_opts["extract_flat"] is True
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.extract_playlist", autospec=True)
+    def test_fetch_playlists_keeps_source_order(self, mock_extract):
+        def extract(self):
+            # Finish in reverse order of submission
+            time.sleep(0.05 if "ch1" in self.channel_url else 0)
+            return {"id": self.channel_url}
+
+        mock_extract.side_effect = extract
+        urls = ["https://youtube.com/@ch1", "https://youtube.com/@ch2", "https://youtube.com/@ch3"]
+        results = self._make_fetcher(jobs=3).fetch_playlists(urls)
+        assert [r["id"] for r in results] == [YT_DLP(u, YT_DLP_Options()).channel_url for u in urls]
+
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.extract_playlist", autospec=True)
+    def test_fetch_playlists_missing_channel(self, mock_extract):
+        mock_extract.side_effect = MissingChannelUrl("No channel url specified.")
+        results = self._make_fetcher().fetch_playlists([""])
+        assert results == [None]
+
+    @patch("ani_yt.yt_dlp_handler.PauseableException")
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.extract_playlist", autospec=True)
+    def test_fetch_playlists_download_error(self, mock_extract, mock_pause):
+        def extract(self):
+            if "bad" in self.channel_url:
+                raise yt_dlp.DownloadError("failed")
+            return {"entries": []}
+
+        mock_extract.side_effect = extract
+        results = self._make_fetcher().fetch_playlists(["https://youtube.com/@bad", "https://youtube.com/@good"])
+        assert results == [None, {"entries": []}]
+        mock_pause.assert_called_once()
+
+    def test_fetch_playlists_empty(self):
+        assert self._make_fetcher().fetch_playlists([]) == []
+
+    @patch("ani_yt.yt_dlp_handler.PauseableException")
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.extract_playlist", autospec=True)
+    def test_fetch_playlists_timeout(self, mock_extract, mock_pause):
+        def extract(self):
+            time.sleep(1)
+            return {"entries": []}
+
+        mock_extract.side_effect = extract
+        results = self._make_fetcher(timeout=0.1).fetch_playlists(["https://youtube.com/@slow"])
+        assert results == [None]
+        mock_pause.assert_called_once()
+
+    @patch("ani_yt.yt_dlp_handler.PauseableException")
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.extract_playlist", autospec=True)
+    def test_fetch_playlists_deadline_covers_queued_channels(self, mock_extract, mock_pause):
+        release = threading.Event()
+
+        def extract(self):
+            release.wait(5)
+            return {"entries": []}
+
+        mock_extract.side_effect = extract
+        urls = [f"https://youtube.com/@slow{i}" for i in range(3)]
+        start = time.monotonic()
+        try:
+            # One worker, the last two channels only start after the first one, never within the deadline
+            results = self._make_fetcher(jobs=1, timeout=0.2).fetch_playlists(urls)
+        finally:
+            release.set()
+        assert time.monotonic() - start < 1
+        assert results == [None, None, None]
+        assert "3 of 3" in mock_pause.call_args.args[0]
+
+    @patch("ani_yt.yt_dlp_handler.PauseableException")
+    @patch("ani_yt.yt_dlp_handler.YT_DLP.extract_playlist", autospec=True)
+    def test_timed_out_worker_does_not_block_exit(self, mock_extract, mock_pause):
+        release = threading.Event()
+
+        def extract(self):
+            release.wait(5)
+            return {"entries": []}
+
+        mock_extract.side_effect = extract
+        before = set(threading.enumerate())
+        try:
+            self._make_fetcher(timeout=0.1).fetch_playlists(["https://youtube.com/@stuck"])
+            stuck = [t for t in threading.enumerate() if t not in before]
+            assert stuck and all(t.daemon for t in stuck)
+        finally:
+            release.set()